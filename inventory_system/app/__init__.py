@@ -2,18 +2,21 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_migrate import Migrate
-from config import Config
+from config import config_from_env
 import os  # Add this import
 
-db = SQLAlchemy()
+from app.db_routing import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 migrate = Migrate()
 login_manager.login_view = 'auth.login'
 login_manager.login_message = 'Please log in to access this page.'
 
-def create_app(config_class=Config):
+def create_app(config_class=None):
+    # Without an explicit class the APP_CONFIG environment variable picks one
     app = Flask(__name__, instance_relative_config=True)
-    app.config.from_object(config_class)
+    app.config.from_object(config_class or config_from_env())
     
     # Ensure instance folder exists
     try:
@@ -34,6 +37,18 @@ def create_app(config_class=Config):
     from app.employee import bp as employee_bp
     app.register_blueprint(employee_bp, url_prefix='/employee')
     
+    from app.commands import register_commands
+    register_commands(app)
+    
+    from app.query_budget import init_query_budget
+    init_query_budget(app)
+    
+    from app.sqlite_profile import init_sqlite_profile
+    init_sqlite_profile(app)
+    
+    from app.db_routing import init_db_routing
+    init_db_routing(app)
+    
     @app.route('/')
     def index():
         from flask import redirect, url_for
@@ -28,9 +28,11 @@ from flask_wtf import FlaskForm
 from wtforms import StringField, IntegerField, FloatField, SelectField, DateField, SubmitField
 from wtforms.validators import DataRequired, NumberRange, Optional
 from app.models import Product
+from app.catalog import selected_choice, stock_label
 
 class StockAdditionForm(FlaskForm):
-    product_id = SelectField('Product', coerce=int, validators=[DataRequired()])
+    # Options are filled in by the typeahead lookup; the id is checked against the database
+    product_id = SelectField('Product', coerce=int, validators=[DataRequired()], validate_choice=False)
     quantity = IntegerField('Quantity to Add', validators=[DataRequired(), NumberRange(min=1)])
     cost_price = FloatField('New Cost Price (Optional)', validators=[Optional(), NumberRange(min=0)])
     selling_price = FloatField('New Selling Price (Optional)', validators=[Optional(), NumberRange(min=0)])
@@ -39,8 +41,11 @@ class StockAdditionForm(FlaskForm):
     
     def __init__(self, *args, **kwargs):
         super(StockAdditionForm, self).__init__(*args, **kwargs)
-        self.product_id.choices = [(p.id, f"{p.name} ({p.sku}) - Current: UGX{p.cost_price:.2f}/UGX{p.selling_price:.2f}") 
-                               for p in Product.query.order_by(Product.name).all()]
+        self.product_id.choices = selected_choice(self.product_id.data, stock_label)
+    
+    def validate_product_id(self, product_id):
+        if Product.query.get(product_id.data) is None:
+            raise ValidationError('Please choose a product from the list.')
 
 class ReportForm(FlaskForm):
     start_date = DateField('Start Date', validators=[DataRequired()])
@@ -1,120 +1,72 @@
-from flask import render_template, redirect, url_for, flash, request, jsonify, make_response
+from flask import render_template, redirect, url_for, flash, request, jsonify, send_file, \
+    abort, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
-from sqlalchemy import func, desc, and_
-from io import BytesIO
-import pandas as pd
-from reportlab.lib.pagesizes import letter, landscape, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Border, Side, Alignment, NamedStyle
-from openpyxl.utils import get_column_letter
-from openpyxl.formatting.rule import CellIsRule
-import tempfile
-import os
+from sqlalchemy import func, desc
 
 from app import db
-from app.models import Product, StockAddition, Sale, User
+from app.models import Product, StockAddition, Sale, DailySalesRollup, ReportJob
 from app.admin.forms import ProductForm, StockAdditionForm, ReportForm
+from app.stock_movement import compute_stock_movement
+from app.rollups import sales_totals
+from app.sales_ledger import sales_page, decode_cursor, page_size_arg
+from app.loading import ledger_row, product_card, audit_row
+from app.query_budget import query_budget
+from app.db_routing import replica_reads, primary_reads
+from app.catalog import bump_catalog_version, lookup_products
+from app.inventory_stats import adjust_stats, inventory_stats, stock_change, stock_state
+from app.stock_alerts import alert_cursor, alerts_since, low_stock_query, track_low_stock
+from app.inventory_ledger import record_movements
+from app.stock_valuation import closing_time, stock_valuation
+from app.margins import MarginError, check_summary, margin_summary, refresh_sale_margins, uncosted_sales
+from app.search import search_products as product_search
+from app.report_jobs import submit_report, job_path, report_filename, MIMETYPES, REPORT_BUILDERS
+from app.report_cache import report_cache_key, cached_report
+from app.bulk_export import DATASETS, FORMATS, ExportError, select_columns, export_chunks, csv_stream, parquet_stream
 from app.admin import bp
 
-# Create a custom PageTemplate for footer
-class FooterPageTemplate(canvas.Canvas):
-    def __init__(self, *args, **kwargs):
-        canvas.Canvas.__init__(self, *args, **kwargs)
-        
-    def footer(self, doc):
-        # Save the state
-        self.saveState()
-        
-        # Footer
-        footer = Paragraph("© Copyright CKS Tech | Contact: +256 755261254 | Email: kephacheps55@gmail.com", 
-                          getSampleStyleSheet()['Normal'])
-        footer.wrap(doc.width, doc.bottomMargin)
-        footer.drawOn(self, doc.leftMargin, doc.bottomMargin)
-        
-        # Page number
-        self.setFont('Helvetica', 9)
-        self.setFillColor(colors.black)
-        self.drawRightString(doc.pagesize[0] - doc.rightMargin, 
-                            doc.bottomMargin, 
-                            f"Page {self.getPageNumber()}")
-        
-        # Restore the state
-        self.restoreState()
-
-# Custom DocTemplate with footer
-class DocTemplateWithFooter(SimpleDocTemplate):
-    def __init__(self, *args, **kwargs):
-        SimpleDocTemplate.__init__(self, *args, **kwargs)
-        
-    def afterPage(self):
-        # Add footer to each page
-        canvas = self.canv
-        canvas.saveState()
-        
-        # Footer line
-        canvas.setStrokeColorRGB(0.8, 0.8, 0.8)
-        canvas.setLineWidth(1)
-        canvas.line(self.leftMargin, self.bottomMargin + 0.5 * inch, 
-                   self.pagesize[0] - self.rightMargin, self.bottomMargin + 0.5 * inch)
-        
-        # Footer text
-        canvas.setFont('Helvetica', 9)
-        canvas.setFillColorRGB(0.4, 0.4, 0.4)
-        canvas.drawString(self.leftMargin, self.bottomMargin + 0.2 * inch, 
-                          "© Copyright CKS Tech | Contact: +256 755261254 | Email: kephacheps55@gmail.com")
-        
-        # Page number
-        canvas.drawRightString(self.pagesize[0] - self.rightMargin, 
-                              self.bottomMargin + 0.2 * inch, 
-                              f"Page {self.page}")
-        
-        canvas.restoreState()
-
 @bp.before_request
 def admin_required():
     if not current_user.is_authenticated or not current_user.is_admin():
         flash('Admin access required!', 'danger')
         return redirect(url_for('auth.login'))
 
+# Pages only read, so they go to the read engine unless marked @primary_reads
+replica_reads(bp)
+
 @bp.route('/dashboard')
 @login_required
+@query_budget(9)
 def dashboard():
-    # Calculate statistics
-    total_products = Product.query.count()
-    total_stock_value = db.session.query(func.sum(Product.quantity_in_stock * Product.cost_price)).scalar() or 0
-    total_sales = db.session.query(func.sum(Sale.total_amount)).scalar() or 0
-    low_stock_products = Product.query.filter(Product.quantity_in_stock < 10).count()
+    # Headline figures come from the running counters rather than full scans
+    stats = inventory_stats()
+    total_products = stats.product_count
+    total_stock_value = stats.stock_value
+    total_sales = stats.revenue
+    low_stock_products = stats.low_stock_count
     
     # Sales summary for last 30 days
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    recent_sales = Sale.query.filter(Sale.timestamp >= thirty_days_ago).count()
+    thirty_days_ago = (datetime.utcnow() - timedelta(days=30)).date()
+    recent_sales = db.session.query(func.sum(DailySalesRollup.sale_count)).filter(DailySalesRollup.date >= thirty_days_ago).scalar() or 0
     
     # Best selling products
     best_sellers = db.session.query(
         Product.name,
-        func.sum(Sale.quantity_sold).label('total_sold')
-    ).join(Sale).group_by(Product.id).order_by(desc('total_sold')).limit(5).all()
+        func.sum(DailySalesRollup.quantity).label('total_sold')
+    ).join(DailySalesRollup).group_by(Product.id).order_by(desc('total_sold')).limit(5).all()
     
     # Recent sales activities
-    recent_activities = Sale.query.order_by(desc(Sale.timestamp)).limit(10).all()
+    recent_activities = Sale.query.options(*ledger_row()).order_by(desc(Sale.timestamp)).limit(10).all()
     
-    # Low stock products
-    low_stock = Product.query.filter(Product.quantity_in_stock < 10).all()
+    # Low stock products, each against its own threshold
+    low_stock = low_stock_query(Product.query.options(*product_card())).all()
     
     # Sales data for chart (last 7 days)
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
+    seven_days_ago = (datetime.utcnow() - timedelta(days=7)).date()
     sales_chart_data = db.session.query(
-        func.date(Sale.timestamp).label('date'),
-        func.sum(Sale.total_amount).label('total')
-    ).filter(Sale.timestamp >= seven_days_ago).group_by(func.date(Sale.timestamp)).all()
+        DailySalesRollup.date,
+        func.sum(DailySalesRollup.revenue).label('total')
+    ).filter(DailySalesRollup.date >= seven_days_ago).group_by(DailySalesRollup.date).order_by(DailySalesRollup.date).all()
     
     dates = [str(item.date) for item in sales_chart_data]
     amounts = [float(item.total) for item in sales_chart_data]
@@ -131,42 +83,42 @@ def dashboard():
                          dates=dates,
                          amounts=amounts)
 
+def _date_arg(name):
+    value = request.args.get(name, '').strip()
+    try:
+        return datetime.strptime(value, '%Y-%m-%d') if value else None
+    except ValueError:
+        return None
+
 @bp.route('/stock_movement')
 @login_required
+@query_budget(5)
 def stock_movement():
-    # Get all products
-    products = Product.query.all()
+    category = request.args.get('category', '').strip()
+    start_date = _date_arg('start_date')
+    end_date = _date_arg('end_date')
+    
+    # The end date is inclusive on the page, so the window runs to the next midnight
+    stock_data = compute_stock_movement(
+        start_date=start_date,
+        end_date=end_date + timedelta(days=1) if end_date else None,
+        category=category or None
+    )
     
-    stock_data = []
-    for product in products:
-        # Calculate opening stock (initial stock when product was first added)
-        opening_stock = 0
-        
-        # Get all stock additions for this product
-        stock_additions = StockAddition.query.filter_by(product_id=product.id).all()
-        total_added = sum([sa.quantity_added for sa in stock_additions])
-        
-        # Get all sales for this product
-        sales = Sale.query.filter_by(product_id=product.id).all()
-        total_sold = sum([s.quantity_sold for s in sales])
-        
-        # Calculate current balance
-        current_balance = opening_stock + total_added - total_sold
-        
-        stock_data.append({
-            'product': product,
-            'opening_stock': opening_stock,
-            'total_added': total_added,
-            'total_sold': total_sold,
-            'current_balance': current_balance
-        })
+    categories = [c for (c,) in db.session.query(Product.category).distinct().order_by(Product.category) if c]
     
-    return render_template('admin/stock_movement.html', stock_data=stock_data)
+    return render_template('admin/stock_movement.html',
+                         stock_data=stock_data,
+                         categories=categories,
+                         category=category,
+                         start_date=start_date,
+                         end_date=end_date)
 
 @bp.route('/products')
 @login_required
+@primary_reads
 def products():
-    products = Product.query.all()
+    products = Product.query.options(*product_card()).all()
     return render_template('admin/products.html', products=products)
 
 @bp.route('/add_product', methods=['GET', 'POST'])
@@ -186,12 +138,81 @@ def add_product():
             low_stock_threshold=form.low_stock_threshold.data
         )
         db.session.add(product)
+        db.session.flush()
+        bump_catalog_version()
+        track_low_stock([(product.id, None, stock_state(product))])
         db.session.commit()
         flash('Product added successfully!', 'success')
         return redirect(url_for('admin.products'))
     
     return render_template('admin/add_product.html', form=form)
 
+@bp.route('/product_lookup')
+@login_required
+def product_lookup():
+    # Typeahead for the product select: SKU prefix matches first, then name matches
+    limit = max(1, min(request.args.get('limit', 20, type=int), 50))
+    return jsonify(products=lookup_products(request.args.get('q', ''), limit=limit))
+
+@bp.route('/stock_alerts')
+@login_required
+@query_budget(4)
+def stock_alerts():
+    # Poll with the cursor from the previous reply to get only the products that
+    # went low or were restocked since. Without one, the reply lists the current
+    # low stock products and a cursor to start polling from.
+    limit = max(1, min(request.args.get('limit', 100, type=int), 500))
+    since = request.args.get('since', type=int)
+
+    if since is None:
+        # Cursor first: an alert written while the list is read is then
+        # replayed by the next poll rather than skipped
+        cursor = alert_cursor()
+        products = low_stock_query(Product.query).order_by(Product.name).all()
+        return jsonify(cursor=cursor, low_stock=[{
+            'product_id': p.id,
+            'name': p.name,
+            'sku': p.sku,
+            'quantity_in_stock': p.quantity_in_stock,
+            'low_stock_threshold': p.low_stock_threshold
+        } for p in products])
+
+    rows = alerts_since(since, limit)
+    return jsonify(cursor=rows[-1][0].id if rows else since, alerts=[{
+        'id': alert.id,
+        'product_id': alert.product_id,
+        'name': name,
+        'sku': sku,
+        'state': 'low' if alert.low else 'restocked',
+        'quantity_in_stock': alert.quantity,
+        'low_stock_threshold': alert.threshold,
+        'created_at': alert.created_at.isoformat()
+    } for alert, name, sku in rows], more=len(rows) == limit)
+
+@bp.route('/stock_valuation')
+@login_required
+@query_budget(3)
+def stock_valuation_as_of():
+    # Closing stock and its value at cost at the end of ?date=, or right now
+    day = _date_arg('date')
+    now = datetime.utcnow()
+    as_of = min(closing_time(day.date()), now) if day else now
+    rows = stock_valuation(as_of, category=request.args.get('category', '').strip() or None)
+    return jsonify(
+        as_of=as_of.isoformat(),
+        total_units=sum(quantity for _, quantity, _ in rows),
+        total_value=round(sum(quantity * (unit_cost or 0) for _, quantity, unit_cost in rows), 2),
+        products=[{
+            'product_id': product.id,
+            'name': product.name,
+            'sku': product.sku,
+            'category': product.category,
+            'quantity': quantity,
+            'unit_cost': unit_cost,
+            'value': round(quantity * (unit_cost or 0), 2)
+        } for product, quantity, unit_cost in rows]
+    )
+
 @bp.route('/add_stock', methods=['GET', 'POST'])
 @login_required
 def add_stock():
@@ -202,6 +223,7 @@ def add_stock():
         if product:
             # Track if prices were updated
             price_updated = False
+            before = stock_state(product)
             old_cost_price = product.cost_price
             old_selling_price = product.selling_price
             
@@ -227,8 +249,15 @@ def add_stock():
             )
             db.session.add(stock_addition)
             
-            # Update product quantity
-            product.quantity_in_stock += form.quantity.data
+            # Update product quantity through the inventory ledger
+            levels, movements = record_movements('restock', {product.id: form.quantity.data})
+            movements[product.id].stock_addition = stock_addition
+            if price_updated:
+                bump_catalog_version()
+            level = levels[product.id]
+            after = (level.quantity_in_stock, level.cost_price, level.low_stock_threshold)
+            adjust_stats(**stock_change((before, after)))
+            track_low_stock([(product.id, before, after)])
             db.session.commit()
             
             # Create appropriate success message
@@ -254,13 +283,8 @@ def search_products():
     if not query:
         return redirect(url_for('admin.products'))
     
-    # Search for products by name or SKU
-    products = Product.query.filter(
-        db.or_(
-            Product.name.contains(query),
-            Product.sku.contains(query)
-        )
-    ).all()
+    # Full-text search over name, SKU, category and description, best match first
+    products = product_search(query, Product.query.options(*product_card())).all()
     
     return render_template('admin/search_results.html', 
                          products=products, 
@@ -280,14 +304,6 @@ def advanced_search():
     # Build the query
     filters = []
     
-    if query:
-        filters.append(
-            db.or_(
-                Product.name.contains(query),
-                Product.sku.contains(query)
-            )
-        )
-    
     if category:
         filters.append(Product.category == category)
     
@@ -303,8 +319,11 @@ def advanced_search():
     if in_stock_only:
         filters.append(Product.quantity_in_stock > 0)
     
-    # Apply all filters
-    products = Product.query.filter(db.and_(*filters)).all() if filters else Product.query.all()
+    # Apply all filters, alongside the text match when there is one
+    products = Product.query.options(*product_card()).filter(*filters)
+    if query:
+        products = product_search(query, products)
+    products = products.all()
     
     return render_template('admin/advanced_search_results.html', 
                          products=products, 
@@ -317,29 +336,48 @@ def advanced_search():
 
 @bp.route('/stock_history/<int:product_id>')
 @login_required
+@query_budget(5)
 def stock_history(product_id):
     product = Product.query.get_or_404(product_id)
     
     # Get all stock additions for this product
-    stock_additions = StockAddition.query.filter_by(product_id=product_id).order_by(StockAddition.date_added.desc()).all()
+    stock_additions = StockAddition.query.options(*audit_row()).filter_by(product_id=product_id).order_by(StockAddition.date_added.desc()).all()
     
     return render_template('admin/stock_history.html', product=product, stock_additions=stock_additions)
 
 @bp.route('/sales')
 @login_required
+@query_budget(5)
 def sales():
-    sales = Sale.query.order_by(desc(Sale.timestamp)).all()
-    return render_template('admin/sales.html', sales=sales)
+    cursor = request.args.get('cursor')
+    per_page = page_size_arg()
+    sales, next_cursor = sales_page(cursor=decode_cursor(cursor), page_size=per_page)
+    
+    # Ledger totals come from the rollups rather than the rows on this page
+    total_amount, total_quantity, total_count = sales_totals()
+    
+    return render_template('admin/sales.html',
+                         sales=sales,
+                         cursor=cursor,
+                         next_cursor=next_cursor,
+                         per_page=per_page,
+                         total_amount=total_amount,
+                         total_quantity=total_quantity,
+                         total_count=total_count)
 
 @bp.route('/reports')
 @login_required
 def reports():
     form = ReportForm()
-    return render_template('admin/reports.html', form=form)
+    jobs = ReportJob.query.filter_by(requested_by=current_user.id) \
+        .order_by(ReportJob.created_at.desc()).limit(10).all()
+    return render_template('admin/reports.html', form=form, jobs=jobs)
 
 @bp.route('/generate_report/<report_type>', methods=['POST'])
 @login_required
+@query_budget(30)
 def generate_report(report_type):
+    # Budget covers the job cleanup on submit and, under TESTING, the inline build
     form = ReportForm()
     if not form.validate_on_submit():
         flash('Invalid date range selected', 'danger')
@@ -348,843 +386,119 @@ def generate_report(report_type):
     start_date = form.start_date.data
     end_date = form.end_date.data
     export_format = request.form.get('export_format', 'pdf')  # Get export format from form
+    export_format = 'excel' if export_format == 'excel' else 'pdf'
     
-    if report_type == 'sales':
-        if export_format == 'excel':
-            return generate_sales_excel(start_date, end_date)
-        else:
-            return generate_sales_report(start_date, end_date)
-    elif report_type == 'stock':
-        if export_format == 'excel':
-            return generate_stock_excel(start_date, end_date)
-        else:
-            return generate_stock_report(start_date, end_date)
-    else:
+    if (report_type, export_format) not in REPORT_BUILDERS:
         flash('Invalid report type', 'danger')
         return redirect(url_for('admin.reports'))
-
-def generate_sales_report(start_date, end_date):
-    # Query sales data
-    sales_data = db.session.query(
-        Sale.id,
-        Product.name.label('product_name'),
-        Product.sku,
-        Product.category,
-        Sale.quantity_sold,
-        Sale.price_per_unit,
-        Sale.total_amount,
-        Sale.timestamp,
-        User.username.label('employee')
-    ).join(Product).join(User).filter(
-        and_(Sale.timestamp >= start_date, Sale.timestamp <= end_date)
-    ).all()
-    
-    # Generate PDF
-    buffer = BytesIO()
-    doc = DocTemplateWithFooter(
-        buffer, 
-        pagesize=landscape(letter),
-        leftMargin=0.75*inch,
-        rightMargin=0.75*inch,
-        topMargin=1*inch,
-        bottomMargin=1*inch
-    )
-    
-    # Container for the 'Flowable' objects
-    elements = []
-    
-    # Get styles
-    styles = getSampleStyleSheet()
-    
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        textColor=colors.HexColor('#2E4057')
-    )
-    
-    subtitle_style = ParagraphStyle(
-        'CustomSubtitle',
-        parent=styles['Heading2'],
-        fontSize=16,
-        spaceAfter=20,
-        alignment=TA_CENTER,
-        textColor=colors.HexColor('#4A6572')
-    )
-    
-    # Company header
-    header_style = ParagraphStyle(
-        'Header',
-        parent=styles['Normal'],
-        fontSize=12,
-        alignment=TA_CENTER,
-        textColor=colors.HexColor('#546E7A')
-    )
-    
-    # Add company header
-    elements.append(Paragraph("CKS BUSINESS MANAGEMENT SYSTEM", header_style))
-    elements.append(Spacer(1, 0.1*inch))
-    
-    # Add title
-    elements.append(Paragraph("SALES REPORT", title_style))
-    elements.append(Paragraph(f"Period: {start_date.strftime('%B %d, %Y')} to {end_date.strftime('%B %d, %Y')}", subtitle_style))
-    elements.append(Spacer(1, 0.2*inch))
-    
-    # Report generation info
-    report_info_style = ParagraphStyle(
-        'ReportInfo',
-        parent=styles['Normal'],
-        fontSize=10,
-        alignment=TA_RIGHT,
-        textColor=colors.HexColor('#546E7A')
-    )
-    
-    elements.append(Paragraph(f"Generated on: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}", report_info_style))
-    elements.append(Paragraph(f"Generated by: {current_user.username}", report_info_style))
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Summary section
-    elements.append(Paragraph("REPORT SUMMARY", subtitle_style))
-    
-    # Calculate summary data
-    total_sales = sum([sale.total_amount for sale in sales_data])
-    total_quantity = sum([sale.quantity_sold for sale in sales_data])
-    total_transactions = len(sales_data)
-    
-    # Create summary table
-    summary_data = [
-        ['Total Sales Amount', f'UGX {total_sales:,.2f}'],
-        ['Total Units Sold', f'{total_quantity:,} units'],
-        ['Number of Transactions', f'{total_transactions:,}'],
-        ['Average Transaction Value', f'UGX {total_sales/total_transactions if total_transactions > 0 else 0:,.2f}']
-    ]
     
-    summary_table = Table(summary_data, colWidths=[3*inch, 2*inch])
-    summary_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#F5F5F5')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#424242')),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#FAFAFA')),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E0E0E0'))
-    ]))
-    
-    elements.append(summary_table)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Sales details section
-    elements.append(Paragraph("SALES DETAILS", subtitle_style))
-    
-    if sales_data:
-        # Create sales data table
-        headers = ['ID', 'Product', 'SKU', 'Category', 'Qty', 'Price/Unit', 'Total', 'Date', 'Employee']
-        data = [headers]
-        
-        for sale in sales_data:
-            data.append([
-                str(sale.id),
-                sale.product_name,
-                sale.sku,
-                sale.category,
-                str(sale.quantity_sold),
-                f'UGX {sale.price_per_unit:,.2f}',
-                f'UGX {sale.total_amount:,.2f}',
-                sale.timestamp.strftime('%Y-%m-%d %H:%M'),
-                sale.employee
-            ])
-        
-        # Create table with alternating row colors
-        table = Table(data, colWidths=[0.5*inch, 1.5*inch, 0.8*inch, 1*inch, 0.5*inch, 1*inch, 1*inch, 1.2*inch, 1*inch])
-        
-        # Style the table
-        row_colors = [colors.HexColor('#F5F5F5'), colors.white]
-        
-        table.setStyle(TableStyle([
-            # Header styling
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E4057')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            
-            # Data styling
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ('ALIGN', (0, 0), (0, -1), 'CENTER'),
-            ('ALIGN', (4, 0), (-1, -1), 'RIGHT'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E0E0E0')),
-            
-            # Alternating row colors
-            *([('ROWBACKGROUNDS', (0, 1), (-1, -1), row_colors)])
-        ]))
-        
-        elements.append(table)
-    else:
-        elements.append(Paragraph("No sales data found for the selected period.", styles["Normal"]))
-    
-    # Build the PDF
-    doc.build(elements)
-    
-    # Get the value of the BytesIO buffer
-    buffer.seek(0)
-    
-    # Create the response
-    response = make_response(buffer.getvalue())
-    response.headers['Content-Type'] = 'application/pdf'
-    response.headers['Content-Disposition'] = f'attachment; filename=sales_report_{start_date.strftime("%Y%m%d")}_to_{end_date.strftime("%Y%m%d")}.pdf'
+    # A report whose data has not changed since it was last built comes straight from the cache
+    cached = cached_report(report_cache_key(report_type, export_format, start_date, end_date, current_user.id),
+                           export_format)
+    if cached:
+        return send_file(cached, mimetype=MIMETYPES[export_format], as_attachment=True,
+                         download_name=report_filename(report_type, export_format, start_date, end_date))
+    
+    # Build the file in the background and send the user to its progress page
+    job = submit_report(report_type, export_format, start_date, end_date, current_user.id)
+    if job is None:
+        flash('Too many reports are being generated right now. Please try again in a minute.', 'warning')
+        return redirect(url_for('admin.reports'))
     
-    return response
+    return redirect(url_for('admin.report_job', job_id=job.id))
 
-def generate_stock_report(start_date, end_date):
-    # Query stock additions
-    stock_data = db.session.query(
-        StockAddition.id,
-        Product.name.label('product_name'),
-        Product.sku,
-        Product.category,
-        StockAddition.quantity_added,
-        StockAddition.date_added,
-        User.username.label('added_by'),
-        StockAddition.old_cost_price,
-        StockAddition.new_cost_price,
-        StockAddition.old_selling_price,
-        StockAddition.new_selling_price,
-        StockAddition.price_change_reason
-    ).join(Product).join(User).filter(
-        and_(StockAddition.date_added >= start_date, StockAddition.date_added <= end_date)
-    ).all()
-    
-    # Current stock levels
-    current_stock = Product.query.all()
-    
-    # Generate PDF
-    buffer = BytesIO()
-    doc = DocTemplateWithFooter(
-        buffer, 
-        pagesize=landscape(letter),
-        leftMargin=0.75*inch,
-        rightMargin=0.75*inch,
-        topMargin=1*inch,
-        bottomMargin=1*inch
-    )
-    
-    # Container for the 'Flowable' objects
-    elements = []
-    
-    # Get styles
-    styles = getSampleStyleSheet()
-    
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        textColor=colors.HexColor('#2E4057')
-    )
-    
-    subtitle_style = ParagraphStyle(
-        'CustomSubtitle',
-        parent=styles['Heading2'],
-        fontSize=16,
-        spaceAfter=20,
-        alignment=TA_CENTER,
-        textColor=colors.HexColor('#4A6572')
-    )
-    
-    # Company header
-    header_style = ParagraphStyle(
-        'Header',
-        parent=styles['Normal'],
-        fontSize=12,
-        alignment=TA_CENTER,
-        textColor=colors.HexColor('#546E7A')
-    )
-    
-    # Add company header
-    elements.append(Paragraph("CKS BUSINESS MANAGEMENT SYSTEM", header_style))
-    elements.append(Spacer(1, 0.1*inch))
-    
-    # Add title
-    elements.append(Paragraph("STOCK MOVEMENT REPORT", title_style))
-    elements.append(Paragraph(f"Period: {start_date.strftime('%B %d, %Y')} to {end_date.strftime('%B %d, %Y')}", subtitle_style))
-    elements.append(Spacer(1, 0.2*inch))
-    
-    # Report generation info
-    report_info_style = ParagraphStyle(
-        'ReportInfo',
-        parent=styles['Normal'],
-        fontSize=10,
-        alignment=TA_RIGHT,
-        textColor=colors.HexColor('#546E7A')
-    )
-    
-    elements.append(Paragraph(f"Generated on: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}", report_info_style))
-    elements.append(Paragraph(f"Generated by: {current_user.username}", report_info_style))
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Summary section
-    elements.append(Paragraph("REPORT SUMMARY", subtitle_style))
-    
-    # Calculate summary data
-    total_products = len(current_stock)
-    total_stock_value = sum([product.quantity_in_stock * product.cost_price for product in current_stock])
-    total_stock_units = sum([product.quantity_in_stock for product in current_stock])
-    total_additions = len(stock_data)
-    total_added_units = sum([stock.quantity_added for stock in stock_data])
-    
-    # Create summary table
-    summary_data = [
-        ['Total Products', f'{total_products:,}'],
-        ['Total Stock Value', f'UGX {total_stock_value:,.2f}'],
-        ['Total Stock Units', f'{total_stock_units:,}'],
-        ['Total Stock Additions', f'{total_additions:,}'],
-        ['Total Units Added', f'{total_added_units:,}']
-    ]
-    
-    summary_table = Table(summary_data, colWidths=[3*inch, 2*inch])
-    summary_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#F5F5F5')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#424242')),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#FAFAFA')),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E0E0E0'))
-    ]))
-    
-    elements.append(summary_table)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Stock additions section
-    elements.append(Paragraph("STOCK ADDITIONS", subtitle_style))
-    
-    if stock_data:
-        # Create stock additions table
-        headers = ['ID', 'Product', 'SKU', 'Category', 'Qty Added', 'Date', 'Added By', 'Price Changes']
-        data = [headers]
-        
-        for stock in stock_data:
-            price_changes = ""
-            if stock.old_cost_price != stock.new_cost_price and stock.new_cost_price is not None:
-                price_changes += f"Cost: UGX {stock.old_cost_price:.2f} → UGX {stock.new_cost_price:.2f}"
-            if stock.old_selling_price != stock.new_selling_price and stock.new_selling_price is not None:
-                if price_changes:
-                    price_changes += "<br/>"
-                price_changes += f"Sell: UGX {stock.old_selling_price:.2f} → UGX {stock.new_selling_price:.2f}"
-            
-            data.append([
-                str(stock.id),
-                stock.product_name,
-                stock.sku,
-                stock.category,
-                str(stock.quantity_added),
-                stock.date_added.strftime('%Y-%m-%d %H:%M'),
-                stock.added_by,
-                price_changes
-            ])
-        
-        # Create table with alternating row colors
-        table = Table(data, colWidths=[0.5*inch, 1.5*inch, 0.8*inch, 1*inch, 0.8*inch, 1.2*inch, 1*inch, 1.5*inch])
-        
-        # Style the table
-        row_colors = [colors.HexColor('#F5F5F5'), colors.white]
-        
-        table.setStyle(TableStyle([
-            # Header styling
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E4057')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            
-            # Data styling
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ('ALIGN', (0, 0), (0, -1), 'CENTER'),
-            ('ALIGN', (4, 0), (4, -1), 'RIGHT'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E0E0E0')),
-            
-            # Alternating row colors
-            *([('ROWBACKGROUNDS', (0, 1), (-1, -1), row_colors)])
-        ]))
-        
-        elements.append(table)
-        elements.append(Spacer(1, 0.3*inch))
-    
-    # Current stock levels section
-    elements.append(Paragraph("CURRENT STOCK LEVELS", subtitle_style))
-    
-    # Create current stock table
-    headers = ['Product', 'SKU', 'Category', 'Current Stock', 'Cost Price', 'Selling Price', 'Total Value', 'Status']
-    data = [headers]
-    
-    for product in current_stock:
-        # Determine stock status
-        if product.quantity_in_stock == 0:
-            status = "Out of Stock"
-            status_color = colors.HexColor('#FF5252')
-        elif product.quantity_in_stock <= product.low_stock_threshold:
-            status = "Low Stock"
-            status_color = colors.HexColor('#FFC107')
-        else:
-            status = "In Stock"
-            status_color = colors.HexColor('#4CAF50')
-        
-        data.append([
-            product.name,
-            product.sku,
-            product.category,
-            str(product.quantity_in_stock),
-            f'UGX {product.cost_price:,.2f}',
-            f'UGX {product.selling_price:,.2f}',
-            f'UGX {product.total_value:,.2f}',
-            status
-        ])
-    
-    # Create table with alternating row colors
-    table = Table(data, colWidths=[1.5*inch, 0.8*inch, 1*inch, 1*inch, 0.8*inch, 0.8*inch, 1*inch, 0.8*inch])
-    
-    # Style the table
-    row_colors = [colors.HexColor('#F5F5F5'), colors.white]
-    
-    table.setStyle(TableStyle([
-        # Header styling
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E4057')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        
-        # Data styling
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (3, 0), (-1, -1), 'RIGHT'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E0E0E0')),
-        
-        # Alternating row colors
-        *([('ROWBACKGROUNDS', (0, 1), (-1, -1), row_colors)])
-    ]))
-    
-    # Apply conditional formatting for stock status
-    for i, row in enumerate(data[1:], start=1):
-        if row[7] == "Out of Stock":
-            table.setStyle(TableStyle([
-                ('TEXTCOLOR', (7, i), (7, i), colors.HexColor('#FF5252')),
-                ('FONTNAME', (7, i), (7, i), 'Helvetica-Bold')
-            ]))
-        elif row[7] == "Low Stock":
-            table.setStyle(TableStyle([
-                ('TEXTCOLOR', (7, i), (7, i), colors.HexColor('#FFC107')),
-                ('FONTNAME', (7, i), (7, i), 'Helvetica-Bold')
-            ]))
-        else:
-            table.setStyle(TableStyle([
-                ('TEXTCOLOR', (7, i), (7, i), colors.HexColor('#4CAF50')),
-                ('FONTNAME', (7, i), (7, i), 'Helvetica-Bold')
-            ]))
-    
-    elements.append(table)
-    
-    # Build the PDF
-    doc.build(elements)
-    
-    # Get the value of the BytesIO buffer
-    buffer.seek(0)
-    
-    # Create the response
-    response = make_response(buffer.getvalue())
-    response.headers['Content-Type'] = 'application/pdf'
-    response.headers['Content-Disposition'] = f'attachment; filename=stock_report_{start_date.strftime("%Y%m%d")}_to_{end_date.strftime("%Y%m%d")}.pdf'
-    
-    return response
+def _job_status(job):
+    return {
+        'id': job.id,
+        'status': job.status,
+        'progress': job.progress,
+        'error': job.error,
+        'download_url': url_for('admin.report_job_download', job_id=job.id) if job.status == 'done' else None
+    }
 
-def generate_sales_excel(start_date, end_date):
-    # Query sales data
-    sales_data = db.session.query(
-        Sale.id,
-        Product.name.label('product_name'),
-        Product.sku,
-        Product.category,
-        Sale.quantity_sold,
-        Sale.price_per_unit,
-        Sale.total_amount,
-        Sale.timestamp,
-        User.username.label('employee')
-    ).join(Product).join(User).filter(
-        and_(Sale.timestamp >= start_date, Sale.timestamp <= end_date)
-    ).all()
-    
-    # Create a temporary file
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx')
-    temp_file.close()
-    
-    # Create a workbook and select the active sheet
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Sales Report"
-    
-    # Define styles
-    header_font = Font(name='Calibri', size=12, bold=True, color='FFFFFF')
-    header_fill = PatternFill(start_color='2E4057', end_color='2E4057', fill_type='solid')
-    title_font = Font(name='Calibri', size=16, bold=True, color='2E4057')
-    subtitle_font = Font(name='Calibri', size=12, bold=True, color='4A6572')
-    data_font = Font(name='Calibri', size=10)
-    currency_format = '#,##0.00'
-    date_format = 'YYYY-MM-DD HH:MM'
-    
-    # Define borders
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    
-    # Add company header
-    ws.merge_cells('A1:I1')
-    ws['A1'] = "CKS BUSINESS MANAGEMENT SYSTEM"
-    ws['A1'].font = Font(name='Calibri', size=14, bold=True, color='546E7A')
-    ws['A1'].alignment = Alignment(horizontal='center')
-    
-    # Add title
-    ws.merge_cells('A2:I2')
-    ws['A2'] = "SALES REPORT"
-    ws['A2'].font = title_font
-    ws['A2'].alignment = Alignment(horizontal='center')
-    
-    # Add period
-    ws.merge_cells('A3:I3')
-    ws['A3'] = f"Period: {start_date.strftime('%B %d, %Y')} to {end_date.strftime('%B %d, %Y')}"
-    ws['A3'].font = subtitle_font
-    ws['A3'].alignment = Alignment(horizontal='center')
-    
-    # Add report generation info
-    ws['G4'] = "Generated on:"
-    ws['G4'].font = Font(name='Calibri', size=10, color='546E7A')
-    ws['H4'] = datetime.now().strftime('%B %d, %Y at %I:%M %p')
-    ws['H4'].font = Font(name='Calibri', size=10)
-    
-    ws['G5'] = "Generated by:"
-    ws['G5'].font = Font(name='Calibri', size=10, color='546E7A')
-    ws['H5'] = current_user.username
-    ws['H5'].font = Font(name='Calibri', size=10)
-    
-    # Add summary section
-    ws['A7'] = "REPORT SUMMARY"
-    ws['A7'].font = subtitle_font
-    
-    # Calculate summary data
-    total_sales = sum([sale.total_amount for sale in sales_data])
-    total_quantity = sum([sale.quantity_sold for sale in sales_data])
-    total_transactions = len(sales_data)
-    
-    # Create summary table
-    summary_data = [
-        ['Total Sales Amount', f'UGX {total_sales:,.2f}'],
-        ['Total Units Sold', f'{total_quantity:,} units'],
-        ['Number of Transactions', f'{total_transactions:,}'],
-        ['Average Transaction Value', f'UGX {total_sales/total_transactions if total_transactions > 0 else 0:,.2f}']
-    ]
-    
-    # Add summary data to worksheet
-    for i, (label, value) in enumerate(summary_data, start=8):
-        ws[f'A{i}'] = label
-        ws[f'A{i}'].font = Font(name='Calibri', size=11, bold=True)
-        ws[f'B{i}'] = value
-        ws[f'B{i}'].font = Font(name='Calibri', size=11)
-        ws[f'B{i}'].number_format = currency_format if 'UGX' in value else 'General'
-    
-    # Add sales details section
-    start_row = 13
-    ws[f'A{start_row}'] = "SALES DETAILS"
-    ws[f'A{start_row}'].font = subtitle_font
-    
-    # Add headers
-    headers = ['ID', 'Product', 'SKU', 'Category', 'Qty', 'Price/Unit', 'Total', 'Date', 'Employee']
-    for i, header in enumerate(headers, start=1):
-        cell = ws.cell(row=start_row+1, column=i, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.border = thin_border
-        cell.alignment = Alignment(horizontal='center')
-    
-    # Add data
-    for i, sale in enumerate(sales_data, start=start_row+2):
-        ws.cell(row=i, column=1, value=sale.id).font = data_font
-        ws.cell(row=i, column=2, value=sale.product_name).font = data_font
-        ws.cell(row=i, column=3, value=sale.sku).font = data_font
-        ws.cell(row=i, column=4, value=sale.category).font = data_font
-        ws.cell(row=i, column=5, value=sale.quantity_sold).font = data_font
-        ws.cell(row=i, column=5).number_format = '#,##0'
-        ws.cell(row=i, column=6, value=sale.price_per_unit).font = data_font
-        ws.cell(row=i, column=6).number_format = currency_format
-        ws.cell(row=i, column=7, value=sale.total_amount).font = data_font
-        ws.cell(row=i, column=7).number_format = currency_format
-        ws.cell(row=i, column=8, value=sale.timestamp).font = data_font
-        ws.cell(row=i, column=8).number_format = date_format
-        ws.cell(row=i, column=9, value=sale.employee).font = data_font
-        
-        # Add borders to data cells
-        for j in range(1, 10):
-            ws.cell(row=i, column=j).border = thin_border
-    
-    # Adjust column widths
-    column_widths = [8, 20, 12, 15, 8, 12, 12, 18, 15]
-    for i, width in enumerate(column_widths, start=1):
-        ws.column_dimensions[get_column_letter(i)].width = width
-    
-    # Add footer
-    footer_row = ws.max_row + 2
-    ws.merge_cells(f'A{footer_row}:I{footer_row}')
-    ws[f'A{footer_row}'] = "© Copyright CKS Tech | Contact: +256 755261254 | Email: kephacheps55@gmail.com"
-    ws[f'A{footer_row}'].font = Font(name='Calibri', size=9, color='546E7A')
-    ws[f'A{footer_row}'].alignment = Alignment(horizontal='center')
-    
-    # Save the workbook
-    wb.save(temp_file.name)
-    
-    # Read the file and create response
-    with open(temp_file.name, 'rb') as f:
-        file_data = f.read()
-    
-    # Delete the temporary file
-    os.unlink(temp_file.name)
-    
-    # Create the response
-    response = make_response(file_data)
-    response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    response.headers['Content-Disposition'] = f'attachment; filename=sales_report_{start_date.strftime("%Y%m%d")}_to_{end_date.strftime("%Y%m%d")}.xlsx'
-    
-    return response
+@bp.route('/margins')
+@login_required
+@primary_reads
+@query_budget(12)
+def margins():
+    # Cost of goods and margin per product, category or employee; up to
+    # MARGIN_REFRESH_MAX_SALES sales made since the last view are costed first
+    # (app/margins.py), any beyond that are counted as uncosted
+    start_date = _date_arg('start_date')
+    end_date = _date_arg('end_date')
+    by = request.args.get('by', 'product')
+    method = request.args.get('method', 'cost')
+    
+    try:
+        check_summary(by, method)
+    except MarginError as exc:
+        return jsonify({'error': str(exc)}), 400
+    
+    limit = current_app.config['MARGIN_REFRESH_MAX_SALES']
+    uncosted = uncosted_sales() if refresh_sale_margins(max_sales=limit) >= limit else 0
+    # The end date is inclusive on the page, so the window runs to the next day
+    rows = margin_summary(by, method, start_date.date() if start_date else None,
+                          (end_date + timedelta(days=1)).date() if end_date else None)
+    
+    revenue = sum(row['revenue'] for row in rows)
+    cost = sum(row['cost'] for row in rows)
+    return jsonify(by=by, method=method, revenue=revenue, cost=cost, margin=revenue - cost, rows=rows,
+                   uncosted_sales=uncosted)
 
-def generate_stock_excel(start_date, end_date):
-    # Query stock additions
-    stock_data = db.session.query(
-        StockAddition.id,
-        Product.name.label('product_name'),
-        Product.sku,
-        Product.category,
-        StockAddition.quantity_added,
-        StockAddition.date_added,
-        User.username.label('added_by'),
-        StockAddition.old_cost_price,
-        StockAddition.new_cost_price,
-        StockAddition.old_selling_price,
-        StockAddition.new_selling_price,
-        StockAddition.price_change_reason
-    ).join(Product).join(User).filter(
-        and_(StockAddition.date_added >= start_date, StockAddition.date_added <= end_date)
-    ).all()
-    
-    # Current stock levels
-    current_stock = Product.query.all()
-    
-    # Create a temporary file
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx')
-    temp_file.close()
-    
-    # Create a workbook and select the active sheet
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Stock Movement Report"
-    
-    # Define styles
-    header_font = Font(name='Calibri', size=12, bold=True, color='FFFFFF')
-    header_fill = PatternFill(start_color='2E4057', end_color='2E4057', fill_type='solid')
-    title_font = Font(name='Calibri', size=16, bold=True, color='2E4057')
-    subtitle_font = Font(name='Calibri', size=12, bold=True, color='4A6572')
-    data_font = Font(name='Calibri', size=10)
-    currency_format = '#,##0.00'
-    date_format = 'YYYY-MM-DD HH:MM'
-    
-    # Define borders
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    
-    # Add company header
-    ws.merge_cells('A1:L1')
-    ws['A1'] = "CKS BUSINESS MANAGEMENT SYSTEM"
-    ws['A1'].font = Font(name='Calibri', size=14, bold=True, color='546E7A')
-    ws['A1'].alignment = Alignment(horizontal='center')
-    
-    # Add title
-    ws.merge_cells('A2:L2')
-    ws['A2'] = "STOCK MOVEMENT REPORT"
-    ws['A2'].font = title_font
-    ws['A2'].alignment = Alignment(horizontal='center')
-    
-    # Add period
-    ws.merge_cells('A3:L3')
-    ws['A3'] = f"Period: {start_date.strftime('%B %d, %Y')} to {end_date.strftime('%B %d, %Y')}"
-    ws['A3'].font = subtitle_font
-    ws['A3'].alignment = Alignment(horizontal='center')
-    
-    # Add report generation info
-    ws['J4'] = "Generated on:"
-    ws['J4'].font = Font(name='Calibri', size=10, color='546E7A')
-    ws['K4'] = datetime.now().strftime('%B %d, %Y at %I:%M %p')
-    ws['K4'].font = Font(name='Calibri', size=10)
-    
-    ws['J5'] = "Generated by:"
-    ws['J5'].font = Font(name='Calibri', size=10, color='546E7A')
-    ws['K5'] = current_user.username
-    ws['K5'].font = Font(name='Calibri', size=10)
-    
-    # Add summary section
-    ws['A7'] = "REPORT SUMMARY"
-    ws['A7'].font = subtitle_font
-    
-    # Calculate summary data
-    total_products = len(current_stock)
-    total_stock_value = sum([product.quantity_in_stock * product.cost_price for product in current_stock])
-    total_stock_units = sum([product.quantity_in_stock for product in current_stock])
-    total_additions = len(stock_data)
-    total_added_units = sum([stock.quantity_added for stock in stock_data])
-    
-    # Create summary table
-    summary_data = [
-        ['Total Products', f'{total_products:,}'],
-        ['Total Stock Value', f'UGX {total_stock_value:,.2f}'],
-        ['Total Stock Units', f'{total_stock_units:,}'],
-        ['Total Stock Additions', f'{total_additions:,}'],
-        ['Total Units Added', f'{total_added_units:,}']
-    ]
-    
-    # Add summary data to worksheet
-    for i, (label, value) in enumerate(summary_data, start=8):
-        ws[f'A{i}'] = label
-        ws[f'A{i}'].font = Font(name='Calibri', size=11, bold=True)
-        ws[f'B{i}'] = value
-        ws[f'B{i}'].font = Font(name='Calibri', size=11)
-        ws[f'B{i}'].number_format = currency_format if 'UGX' in value else 'General'
-    
-    # Add stock additions section
-    start_row = 14
-    ws[f'A{start_row}'] = "STOCK ADDITIONS"
-    ws[f'A{start_row}'].font = subtitle_font
-    
-    # Add headers
-    headers = ['ID', 'Product', 'SKU', 'Category', 'Qty Added', 'Date', 'Added By', 'Old Cost', 'New Cost', 'Old Sell', 'New Sell', 'Reason']
-    for i, header in enumerate(headers, start=1):
-        cell = ws.cell(row=start_row+1, column=i, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.border = thin_border
-        cell.alignment = Alignment(horizontal='center')
-    
-    # Add data
-    for i, stock in enumerate(stock_data, start=start_row+2):
-        ws.cell(row=i, column=1, value=stock.id).font = data_font
-        ws.cell(row=i, column=2, value=stock.product_name).font = data_font
-        ws.cell(row=i, column=3, value=stock.sku).font = data_font
-        ws.cell(row=i, column=4, value=stock.category).font = data_font
-        ws.cell(row=i, column=5, value=stock.quantity_added).font = data_font
-        ws.cell(row=i, column=5).number_format = '#,##0'
-        ws.cell(row=i, column=6, value=stock.date_added).font = data_font
-        ws.cell(row=i, column=6).number_format = date_format
-        ws.cell(row=i, column=7, value=stock.added_by).font = data_font
-        ws.cell(row=i, column=8, value=stock.old_cost_price).font = data_font
-        ws.cell(row=i, column=8).number_format = currency_format
-        ws.cell(row=i, column=9, value=stock.new_cost_price).font = data_font
-        ws.cell(row=i, column=9).number_format = currency_format
-        ws.cell(row=i, column=10, value=stock.old_selling_price).font = data_font
-        ws.cell(row=i, column=10).number_format = currency_format
-        ws.cell(row=i, column=11, value=stock.new_selling_price).font = data_font
-        ws.cell(row=i, column=11).number_format = currency_format
-        ws.cell(row=i, column=12, value=stock.price_change_reason).font = data_font
-        
-        # Add borders to data cells
-        for j in range(1, 13):
-            ws.cell(row=i, column=j).border = thin_border
-    
-    # Add current stock levels section
-    start_row = ws.max_row + 3
-    ws[f'A{start_row}'] = "CURRENT STOCK LEVELS"
-    ws[f'A{start_row}'].font = subtitle_font
-    
-    # Add headers
-    headers = ['Product', 'SKU', 'Category', 'Current Stock', 'Cost Price', 'Selling Price', 'Total Value', 'Status']
-    for i, header in enumerate(headers, start=1):
-        cell = ws.cell(row=start_row+1, column=i, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.border = thin_border
-        cell.alignment = Alignment(horizontal='center')
-    
-    # Add data
-    for i, product in enumerate(current_stock, start=start_row+2):
-        # Determine stock status
-        if product.quantity_in_stock == 0:
-            status = "Out of Stock"
-            status_color = 'FFFF5252'  # Red
-        elif product.quantity_in_stock <= product.low_stock_threshold:
-            status = "Low Stock"
-            status_color = 'FFFFC107'  # Yellow
+@bp.route('/export/<dataset>')
+@login_required
+def bulk_export(dataset):
+    # Raw CSV/Parquet export of sales or stock additions, for BI tools rather than people
+    export_format = request.args.get('format', 'csv')
+    if dataset not in DATASETS or export_format not in FORMATS:
+        abort(404)
+    
+    start_date = _date_arg('start_date')
+    end_date = _date_arg('end_date')
+    names = [name.strip() for name in request.args.get('columns', '').split(',') if name.strip()]
+    
+    try:
+        columns = select_columns(dataset, names)
+        # The end date is inclusive, so the window runs to the next midnight
+        chunks = export_chunks(dataset, columns, start_date, end_date + timedelta(days=1) if end_date else None,
+                               chunk_size=current_app.config['EXPORT_CHUNK_ROWS'])
+        if export_format == 'csv':
+            body = csv_stream(chunks, columns)
         else:
-            status = "In Stock"
-            status_color = 'FF4CAF50'  # Green
-        
-        ws.cell(row=i, column=1, value=product.name).font = data_font
-        ws.cell(row=i, column=2, value=product.sku).font = data_font
-        ws.cell(row=i, column=3, value=product.category).font = data_font
-        ws.cell(row=i, column=4, value=product.quantity_in_stock).font = data_font
-        ws.cell(row=i, column=4).number_format = '#,##0'
-        ws.cell(row=i, column=5, value=product.cost_price).font = data_font
-        ws.cell(row=i, column=5).number_format = currency_format
-        ws.cell(row=i, column=6, value=product.selling_price).font = data_font
-        ws.cell(row=i, column=6).number_format = currency_format
-        ws.cell(row=i, column=7, value=product.total_value).font = data_font
-        ws.cell(row=i, column=7).number_format = currency_format
-        ws.cell(row=i, column=8, value=status).font = Font(name='Calibri', size=10, bold=True)
-        ws.cell(row=i, column=8).fill = PatternFill(start_color=status_color, end_color=status_color, fill_type='solid')
-        
-        # Add borders to data cells
-        for j in range(1, 9):
-            ws.cell(row=i, column=j).border = thin_border
-    
-    # Adjust column widths
-    column_widths = [20, 12, 15, 12, 12, 12, 12, 15, 12, 12, 12, 20]
-    for i, width in enumerate(column_widths, start=1):
-        ws.column_dimensions[get_column_letter(i)].width = width
-    
-    # Add footer
-    footer_row = ws.max_row + 2
-    ws.merge_cells(f'A{footer_row}:L{footer_row}')
-    ws[f'A{footer_row}'] = "© Copyright CKS Tech | Contact: +256 755261254 | Email: kephacheps55@gmail.com"
-    ws[f'A{footer_row}'].font = Font(name='Calibri', size=9, color='546E7A')
-    ws[f'A{footer_row}'].alignment = Alignment(horizontal='center')
-    
-    # Save the workbook
-    wb.save(temp_file.name)
-    
-    # Read the file and create response
-    with open(temp_file.name, 'rb') as f:
-        file_data = f.read()
+            body = parquet_stream(chunks, dataset, columns)
+    except ExportError as exc:
+        return jsonify({'error': str(exc)}), 400
     
-    # Delete the temporary file
-    os.unlink(temp_file.name)
-    
-    # Create the response
-    response = make_response(file_data)
-    response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    response.headers['Content-Disposition'] = f'attachment; filename=stock_report_{start_date.strftime("%Y%m%d")}_to_{end_date.strftime("%Y%m%d")}.xlsx'
-    
-    return response
\ No newline at end of file
+    period = f"{start_date.strftime('%Y%m%d') if start_date else 'start'}_to_{end_date.strftime('%Y%m%d') if end_date else 'now'}"
+    return Response(stream_with_context(body), mimetype=FORMATS[export_format],
+                    headers={'Content-Disposition': f'attachment; filename={dataset}_{period}.{export_format}'})
+
+def _own_job(job_id):
+    # Jobs are private to the admin who asked for them; anyone else gets a 404
+    return ReportJob.query.filter_by(id=job_id, requested_by=current_user.id).first_or_404()
+
+@bp.route('/report_jobs/<job_id>')
+@login_required
+@primary_reads
+def report_job(job_id):
+    job = _own_job(job_id)
+    return render_template('admin/report_job.html', job=job, status=_job_status(job))
+
+@bp.route('/report_jobs/<job_id>/status')
+@login_required
+@primary_reads
+def report_job_status(job_id):
+    job = _own_job(job_id)
+    return jsonify(_job_status(job))
+
+@bp.route('/report_jobs/<job_id>/download')
+@login_required
+@primary_reads
+def report_job_download(job_id):
+    job = _own_job(job_id)
+    if job.status != 'done':
+        flash('This report is not ready yet.', 'warning')
+        return redirect(url_for('admin.report_job', job_id=job.id))
+    
+    return send_file(job_path(job), mimetype=MIMETYPES[job.export_format],
+                     as_attachment=True, download_name=job.filename)
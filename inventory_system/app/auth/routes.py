@@ -3,6 +3,7 @@ from flask_login import login_user, logout_user, login_required, current_user
 from app import db
 from app.models import User
 from app.auth.forms import LoginForm, RegistrationForm
+from app.passwords import LoginBusy, needs_rehash, rehash_password
 from app.auth import bp
 
 @bp.route('/login', methods=['GET', 'POST'])
@@ -16,7 +17,18 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(username=form.username.data).first()
-        if user and user.check_password(form.password.data):
+        try:
+            valid = user is not None and user.check_password(form.password.data)
+        except LoginBusy:
+            flash('A lot of people are signing in right now. Please try again in a moment.', 'warning')
+            return render_template('auth/login.html', form=form), 503
+        if valid:
+            # Bring hashes made under an older policy up to the current one
+            if needs_rehash(user.password_hash):
+                new_hash = rehash_password(form.password.data)
+                if new_hash:
+                    user.password_hash = new_hash
+                    db.session.commit()
             login_user(user, remember=form.remember_me.data)
             next_page = request.args.get('next')
             if not next_page or not next_page.startswith('/'):
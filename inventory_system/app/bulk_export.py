@@ -0,0 +1,189 @@
+import csv
+import io
+
+from sqlalchemy import and_, or_
+
+from app import db
+from app.models import Product, Sale, StockAddition, User
+
+# Raw, unstyled exports of the sales and stock addition history for machine use.
+# Rows are read in keyset-ordered chunks (each chunk is its own short query, so
+# a slow download never holds a read lock open against the tills) and written
+# out chunk by chunk, so the whole result is never in memory at once.
+
+DATASETS = {
+    'sales': {
+        'model': Sale,
+        'date': Sale.timestamp,
+        'joins': [(Product, True), (User, True)],
+        'columns': {
+            'id': Sale.id,
+            'timestamp': Sale.timestamp,
+            'product_id': Sale.product_id,
+            'product_name': Product.name,
+            'sku': Product.sku,
+            'category': Product.category,
+            'quantity_sold': Sale.quantity_sold,
+            'price_per_unit': Sale.price_per_unit,
+            'total_amount': Sale.total_amount,
+            'employee_id': Sale.employee_id,
+            'employee': User.username,
+        },
+    },
+    'stock_additions': {
+        'model': StockAddition,
+        'date': StockAddition.date_added,
+        'joins': [(Product, True), (User, False)],
+        'columns': {
+            'id': StockAddition.id,
+            'date_added': StockAddition.date_added,
+            'product_id': StockAddition.product_id,
+            'product_name': Product.name,
+            'sku': Product.sku,
+            'category': Product.category,
+            'quantity_added': StockAddition.quantity_added,
+            'added_by_id': StockAddition.added_by,
+            'added_by': User.username,
+            'old_cost_price': StockAddition.old_cost_price,
+            'new_cost_price': StockAddition.new_cost_price,
+            'old_selling_price': StockAddition.old_selling_price,
+            'new_selling_price': StockAddition.new_selling_price,
+            'price_change_reason': StockAddition.price_change_reason,
+        },
+    },
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def select_columns(dataset, names=None):
+    """The column names to export, in order; all of them when ``names`` is empty."""
+    available = DATASETS[dataset]['columns']
+    if not names:
+        return list(available)
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ExportError(f"Unknown columns for {dataset}: {', '.join(unknown)}")
+    return list(dict.fromkeys(names))
+
+
+def export_chunks(dataset, columns, start=None, end=None, chunk_size=5000):
+    """Yield lists of row tuples for ``columns``, oldest first, ``chunk_size`` rows at a time.
+
+    ``start`` and ``end`` bound the dataset's date column as a half-open window.
+    Without a window, rows with no date come first.
+    """
+    spec = DATASETS[dataset]
+    model, date_column = spec['model'], spec['date']
+    # The keyset (date, id) is always selected, after the requested columns
+    selected = [spec['columns'][name] for name in columns] + [date_column, model.id]
+
+    query = db.session.query(*selected).select_from(model)
+    for target, inner in spec['joins']:
+        query = query.join(target) if inner else query.outerjoin(target)
+    if start is not None:
+        query = query.filter(date_column >= start)
+    if end is not None:
+        query = query.filter(date_column < end)
+
+    last = None
+    while True:
+        chunk = query
+        if last is not None and last[0] is None:
+            # Still among the undated rows: the rest of them, then every dated row
+            chunk = chunk.filter(or_(date_column.isnot(None), model.id > last[1]))
+        elif last is not None:
+            # The plain >= bound is what lets the index seek straight to the chunk
+            chunk = chunk.filter(date_column >= last[0],
+                                 or_(date_column > last[0], and_(date_column == last[0], model.id > last[1])))
+        rows = chunk.order_by(date_column.asc().nulls_first(), model.id).limit(chunk_size).all()
+        if not rows:
+            return
+        last = rows[-1][-2:]
+        yield [row[:len(columns)] for row in rows]
+        if len(rows) < chunk_size:
+            return
+
+
+def csv_stream(chunks, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+class _Sink:
+    # Write-only file object that hands written bytes back to the response
+    # generator; tell() counts every byte so Parquet offsets stay correct
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def _arrow_schema(dataset, columns):
+    import pyarrow as pa
+
+    types = {int: pa.int64(), float: pa.float64(), str: pa.string()}
+    fields = []
+    for name in columns:
+        python_type = DATASETS[dataset]['columns'][name].type.python_type
+        if python_type.__name__ == 'datetime':
+            fields.append(pa.field(name, pa.timestamp('us')))
+        else:
+            fields.append(pa.field(name, types[python_type]))
+    return pa.schema(fields)
+
+
+def parquet_stream(chunks, dataset, columns):
+    """Write each chunk as a Parquet row group, yielding the bytes as they are produced."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError("Parquet export needs the pyarrow package (pip install pyarrow).")
+
+    schema = _arrow_schema(dataset, columns)
+
+    def generate():
+        sink = _Sink()
+        writer = pq.ParquetWriter(sink, schema)
+        for rows in chunks:
+            table = pa.Table.from_pydict({name: [row[i] for row in rows] for i, name in enumerate(columns)}, schema=schema)
+            writer.write_table(table)
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+    return generate()
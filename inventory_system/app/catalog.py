@@ -0,0 +1,138 @@
+from bisect import bisect_left
+from itertools import islice
+from types import SimpleNamespace
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import CatalogVersion, Product
+
+# Catalog-derived structures shared by every request in this process:
+# {(database url, name): (catalog version, value)}
+_catalog_cache = {}
+
+
+def catalog_version():
+    return db.session.query(CatalogVersion.version).filter(CatalogVersion.id == 1).scalar() or 0
+
+
+def bump_catalog_version():
+    """Invalidate cached catalog data in every worker.
+
+    Call this in the same transaction as the product or price change so the
+    new version becomes visible exactly when the change does. Stock changes
+    do not need it: cached structures leave stock out and read it live.
+    """
+    if CatalogVersion.query.filter(CatalogVersion.id == 1).update(
+            {CatalogVersion.version: CatalogVersion.version + 1}, synchronize_session=False):
+        return
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(CatalogVersion(id=1, version=1))
+    except IntegrityError:
+        CatalogVersion.query.filter(CatalogVersion.id == 1).update(
+            {CatalogVersion.version: CatalogVersion.version + 1}, synchronize_session=False)
+
+
+def cached_catalog(name, build):
+    # The version is read before building, so a cached entry is never older
+    # than the version it is stored under.
+    key = (str(db.engine.url), name)
+    version = catalog_version()
+    cached = _catalog_cache.get(key)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    value = build()
+    _catalog_cache[key] = (version, value)
+    return value
+
+
+def sale_label(product):
+    return f"{product.name} ({product.sku}) - Stock: {product.quantity_in_stock}"
+
+
+def stock_label(product):
+    return f"{product.name} ({product.sku}) - Current: UGX{product.cost_price:.2f}/UGX{product.selling_price:.2f}"
+
+
+class ProductIndex:
+    """In-memory typeahead index over the product catalog.
+
+    SKUs are kept in a sorted list so a prefix lookup is a binary search;
+    names are matched by substring over a prebuilt lower-cased list. Stock
+    levels are not indexed, so selling does not invalidate it.
+    """
+
+    def __init__(self, rows):
+        self.products = rows
+        self.skus = sorted((row.sku.lower(), i) for i, row in enumerate(rows))
+        self.names = [row.name.lower() for row in rows]
+
+    def search(self, query):
+        # Yields matches lazily, so callers take only as many as they keep
+        query = query.strip().lower()
+        if not query:
+            return
+
+        seen = set()
+
+        # SKU prefix matches first, they are what a scanner or cashier types
+        start = bisect_left(self.skus, (query,))
+        for sku, i in self.skus[start:]:
+            if not sku.startswith(query):
+                break
+            seen.add(i)
+            yield self.products[i]
+
+        for i, name in enumerate(self.names):
+            if query in name and i not in seen:
+                yield self.products[i]
+
+
+def product_index():
+    def build():
+        return ProductIndex(db.session.query(
+            Product.id, Product.name, Product.sku, Product.category,
+            Product.cost_price, Product.selling_price
+        ).order_by(Product.name).all())
+    return cached_catalog('index', build)
+
+
+def lookup_products(query, limit=20, in_stock_only=False):
+    # Matches come from the cached index; their stock is read live, ``limit``
+    # candidates at a time, until enough are kept
+    candidates = product_index().search(query)
+    results = []
+    while len(results) < limit:
+        batch = list(islice(candidates, limit))
+        if not batch:
+            break
+        stock = dict(db.session.query(Product.id, Product.quantity_in_stock)
+                     .filter(Product.id.in_([p.id for p in batch])).all())
+        for row in batch:
+            # Products deleted since the index was built are skipped
+            if row.id not in stock or (in_stock_only and (stock[row.id] or 0) <= 0) or len(results) >= limit:
+                continue
+            p = SimpleNamespace(**row._asdict(), quantity_in_stock=stock[row.id])
+            results.append({
+                'id': p.id,
+                'name': p.name,
+                'sku': p.sku,
+                'category': p.category,
+                'cost_price': p.cost_price,
+                'selling_price': p.selling_price,
+                'quantity_in_stock': p.quantity_in_stock,
+                'label': sale_label(p) if in_stock_only else stock_label(p)
+            })
+    return results
+
+
+def selected_choice(product_id, label):
+    # Product selects no longer embed the catalog; they carry only the
+    # submitted product so a re-rendered form keeps the cashier's choice.
+    if not product_id:
+        return []
+    product = Product.query.get(product_id)
+    return [(product.id, label(product))] if product else []
@@ -0,0 +1,143 @@
+import random
+import time
+
+from flask import current_app
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.models import Product, Sale
+from app.rollups import record_sale
+from app.inventory_stats import adjust_stats, stock_change
+from app.stock_alerts import track_low_stock
+from app.inventory_ledger import record_movements
+
+
+class InsufficientStock(Exception):
+    pass
+
+
+def _is_busy(exc):
+    message = str(exc.orig).lower()
+    return 'locked' in message or 'busy' in message
+
+
+def with_busy_retry(operation):
+    """Run ``operation`` and commit, retrying when SQLite reports the database busy.
+
+    Each retry rolls back and waits with exponential backoff plus jitter, so
+    tills that collided do not all retry in lockstep.
+    """
+    attempts = current_app.config.get('SALE_RETRY_ATTEMPTS', 5)
+    backoff = current_app.config.get('SALE_RETRY_BACKOFF', 0.05)
+
+    for attempt in range(attempts):
+        try:
+            result = operation()
+            db.session.commit()
+            return result
+        except OperationalError as exc:
+            db.session.rollback()
+            if not _is_busy(exc) or attempt == attempts - 1:
+                raise
+            time.sleep(backoff * (2 ** attempt) * (1 + random.random()))
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+def sell_product(product_id, quantity, employee_id):
+    """Record a sale of ``quantity`` units, raising InsufficientStock if there are not enough."""
+    def operation():
+        # A single guarded UPDATE: the stock check and the decrement happen
+        # atomically in the database, so two tills cannot both sell the last unit.
+        moved = record_movements('sale', {product_id: -quantity}, guard=True)
+        if moved is None:
+            raise InsufficientStock(product_id)
+
+        levels, movements = moved
+        level = levels[product_id]
+        sale = Sale(
+            product_id=product_id,
+            quantity_sold=quantity,
+            price_per_unit=level.selling_price,
+            employee_id=employee_id
+        )
+        db.session.add(sale)
+        movements[product_id].sale = sale
+        record_sale(sale, level.cost_price)
+
+        left, cost_price, threshold = level.quantity_in_stock, level.cost_price, level.low_stock_threshold
+        change = ((left + quantity, cost_price, threshold), (left, cost_price, threshold))
+        adjust_stats(revenue=sale.total_amount, sale_count=1, **stock_change(change))
+        track_low_stock([(product_id, *change)])
+        return sale
+
+    return with_busy_retry(operation)
+
+
+def checkout_basket(lines, employee_id):
+    """Sell a whole basket of (product_id, quantity) lines in one transaction.
+
+    Either every line is sold or none is. Returns a receipt with the new sale
+    ids and totals, or raises InsufficientStock with a list of
+    {product_id, requested, available} shortages when the basket cannot be filled.
+    """
+    # A product scanned twice is one line with the combined quantity
+    wanted = {}
+    for product_id, quantity in lines:
+        wanted[product_id] = wanted.get(product_id, 0) + quantity
+
+    def shortages(stock):
+        return [{'product_id': product_id, 'requested': quantity, 'available': stock.get(product_id, 0)}
+                for product_id, quantity in wanted.items() if stock.get(product_id, 0) < quantity]
+
+    # Check every line against stock in one query before taking the write lock;
+    # prices are only read once it is held, so a concurrent price change is not missed
+    short = shortages(dict(db.session.query(Product.id, Product.quantity_in_stock)
+                           .filter(Product.id.in_(list(wanted))).all()))
+    if short:
+        raise InsufficientStock(short)
+
+    def operation():
+        # One guarded UPDATE for the whole basket; if another till got there
+        # first, fewer rows match and the basket is refused as a whole.
+        moved = record_movements('sale', {pid: -quantity for pid, quantity in wanted.items()}, guard=True)
+        if moved is None:
+            db.session.rollback()
+            stock = dict(db.session.query(Product.id, Product.quantity_in_stock).filter(Product.id.in_(list(wanted))).all())
+            raise InsufficientStock(shortages(stock))
+
+        levels, movements = moved
+        sales = [Sale(
+            product_id=product_id,
+            quantity_sold=quantity,
+            price_per_unit=levels[product_id].selling_price,
+            employee_id=employee_id
+        ) for product_id, quantity in wanted.items()]
+        db.session.add_all(sales)
+
+        for sale in sales:
+            movements[sale.product_id].sale = sale
+            record_sale(sale, levels[sale.product_id].cost_price)
+
+        changes = [(
+            row.id,
+            (row.quantity_in_stock + wanted[row.id], row.cost_price, row.low_stock_threshold),
+            (row.quantity_in_stock, row.cost_price, row.low_stock_threshold)
+        ) for row in levels.values()]
+        adjust_stats(
+            revenue=sum(sale.total_amount for sale in sales),
+            sale_count=len(sales),
+            **stock_change(*((before, after) for _, before, after in changes))
+        )
+        track_low_stock(changes)
+
+        # Build the receipt before the commit expires the new rows
+        db.session.flush()
+        return {
+            'sale_ids': [sale.id for sale in sales],
+            'total_quantity': sum(sale.quantity_sold for sale in sales),
+            'total_amount': sum(sale.total_amount for sale in sales)
+        }
+
+    return with_busy_retry(operation)
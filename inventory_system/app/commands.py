@@ -0,0 +1,82 @@
+import click
+
+from app.inventory_stats import reconcile_stats
+from app.stock_alerts import reconcile_low_stock
+from app.inventory_ledger import reconcile_ledger
+from app.stock_valuation import snapshot_stock_levels
+from app.margins import refresh_sale_margins
+from app.rollups import rebuild_daily_rollups
+from app.search import rebuild_search_index
+from app.report_jobs import clean_report_jobs
+
+
+def register_commands(app):
+    @app.cli.command('rebuild-rollups')
+    def rebuild_rollups():
+        """Recompute the daily sales rollup table from the sales history."""
+        count = rebuild_daily_rollups()
+        click.echo(f'Rebuilt {count} daily sales rollup rows.')
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search():
+        """Recreate and repopulate the product full-text index (SQLite only)."""
+        if rebuild_search_index():
+            click.echo('Rebuilt the product full-text index.')
+        else:
+            click.echo('Not on SQLite; product search uses the in-process index.')
+
+    @app.cli.command('reconcile-stats')
+    @click.option('--dry-run', is_flag=True, help='Only report drift, leave the stored counters alone.')
+    def reconcile(dry_run):
+        """Recompute the dashboard counters and low stock flags from scratch and report any drift."""
+        drift = reconcile_stats(dry_run=dry_run)
+        stale_flags = reconcile_low_stock(dry_run=dry_run)
+        if not drift and not stale_flags:
+            click.echo('Inventory stats match the data.')
+            return
+        for name, (stored, actual) in drift.items():
+            click.echo(f'{name}: stored {stored}, actual {actual} (off by {stored - actual:+})')
+        if stale_flags:
+            click.echo(f'low_stock flag wrong on {stale_flags} products')
+        if not dry_run:
+            click.echo('Stored counters and flags replaced with the recomputed values.')
+
+    @app.cli.command('clean-report-jobs')
+    def clean_reports():
+        """Fail report jobs whose worker stopped responding and delete old reports and their files."""
+        failed, deleted = clean_report_jobs()
+        click.echo(f'Marked {failed} stuck report jobs failed, deleted {deleted} old ones.')
+
+    @app.cli.command('refresh-margins')
+    def refresh_margins():
+        """Work out the cost of goods of every sale made since the last refresh."""
+        count = refresh_sale_margins()
+        click.echo(f'Costed {count} new sales.')
+
+    @app.cli.command('snapshot-stock')
+    @click.option('--through', type=click.DateTime(formats=['%Y-%m-%d']),
+                  help='Last day to snapshot (default: yesterday).')
+    def snapshot_stock(through):
+        """Record closing stock levels for every day not yet snapshotted; run once a day after midnight UTC."""
+        days = snapshot_stock_levels(through.date() if through else None)
+        click.echo(f'Wrote closing stock for {days} days.')
+
+    @app.cli.command('reconcile-ledger')
+    @click.option('--dry-run', is_flag=True, help='Only report drift, change nothing.')
+    @click.option('--adopt-cache', is_flag=True,
+                  help='Keep the stored stock levels and record adjustment movements to match them.')
+    def reconcile_stock_ledger(dry_run, adopt_cache):
+        """Compare each product's stored stock level with its inventory ledger balance."""
+        drift = reconcile_ledger(adopt_cache=adopt_cache, dry_run=dry_run)
+        if not drift:
+            click.echo('Stock levels match the inventory ledger.')
+            return
+        for product_id, (stored, actual) in sorted(drift.items()):
+            click.echo(f'product {product_id}: stored {stored}, ledger {actual} (off by {stored - actual:+})')
+        if dry_run:
+            return
+        if adopt_cache:
+            click.echo('Recorded adjustment movements for the stored stock levels.')
+        else:
+            click.echo('Stored stock levels reset to the ledger balances.')
+        click.echo('Run flask reconcile-stats to bring the dashboard counters in line.')
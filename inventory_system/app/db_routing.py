@@ -0,0 +1,62 @@
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+# Read-only pages query a separate read engine so a heavy report or dashboard
+# does not hold connections and locks on the engine the tills commit through.
+# The read engine is SQLALCHEMY_REPLICA_URI, or by default a read-only
+# connection to the same SQLite file. Within a request, the first write sends
+# the rest of the request to the primary, so a view always sees its own writes.
+
+
+def primary_reads(view):
+    """Keep a GET view on the primary, for pages that must show a write just made."""
+    view.primary_reads = True
+    return view
+
+
+def replica_uri(app):
+    uri = app.config.get('SQLALCHEMY_REPLICA_URI')
+    if uri:
+        return uri
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() != 'sqlite' or not url.database or url.database == ':memory:':
+        return None
+    return f'sqlite:///file:{url.database}?mode=ro&uri=true'
+
+
+def init_db_routing(app):
+    """Create the app's read engine, if DB_READ_REPLICA is on and there is one to use."""
+    uri = replica_uri(app) if app.config.get('DB_READ_REPLICA', True) else None
+    if uri is None:
+        return
+    from app.sqlite_profile import apply_sqlite_profile
+    engine = create_engine(uri, **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    apply_sqlite_profile(engine, app.config, read_only=True)
+    app.extensions['db_replica'] = engine
+
+
+def replica_reads(bp):
+    """Send reads from the blueprint's GET views to the read engine, unless marked @primary_reads."""
+    @bp.before_request
+    def route_reads():
+        view = current_app.view_functions.get(request.endpoint)
+        if request.method in ('GET', 'HEAD') and not getattr(view, 'primary_reads', False):
+            g.db_reads = 'replica'
+
+
+def _is_write(clause):
+    return clause is not None and getattr(clause, 'is_dml', False)
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context() and g.get('db_reads') == 'replica':
+            if self._flushing or _is_write(clause):
+                g.db_reads = 'primary'
+            else:
+                replica = current_app.extensions.get('db_replica')
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -1,14 +1,19 @@
 from flask_wtf import FlaskForm
 from wtforms import SelectField, IntegerField, SubmitField
-from wtforms.validators import DataRequired, NumberRange
+from wtforms.validators import DataRequired, NumberRange, ValidationError
 from app.models import Product
+from app.catalog import selected_choice, sale_label
 
 class SaleForm(FlaskForm):
-    product_id = SelectField('Product', coerce=int, validators=[DataRequired()])
+    # Options are filled in by the typeahead lookup; the id is checked against the database
+    product_id = SelectField('Product', coerce=int, validators=[DataRequired()], validate_choice=False)
     quantity = IntegerField('Quantity', validators=[DataRequired(), NumberRange(min=1)])
     submit = SubmitField('Record Sale')
     
     def __init__(self, *args, **kwargs):
         super(SaleForm, self).__init__(*args, **kwargs)
-        self.product_id.choices = [(p.id, f"{p.name} ({p.sku}) - ${p.selling_price:.2f} - Stock: {p.quantity_in_stock}") 
-                               for p in Product.query.filter(Product.quantity_in_stock > 0).all()]
\ No newline at end of file
+        self.product_id.choices = selected_choice(self.product_id.data, sale_label)
+    
+    def validate_product_id(self, product_id):
+        if Product.query.get(product_id.data) is None:
+            raise ValidationError('Please choose a product from the list.')
\ No newline at end of file
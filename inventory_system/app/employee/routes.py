@@ -1,20 +1,33 @@
-from flask import render_template, redirect, url_for, flash, request
+from flask import render_template, redirect, url_for, flash, request, jsonify, current_app
 from flask_login import login_required, current_user
 from app import db
 from app.models import Product, Sale
 from app.employee.forms import SaleForm
 from app.employee import bp
+from app.rollups import sales_totals
+from app.checkout import sell_product, checkout_basket, InsufficientStock
+from app.sales_ledger import sales_page, decode_cursor, page_size_arg
+from app.loading import ledger_row, product_card
+from app.query_budget import query_budget
+from app.db_routing import replica_reads, primary_reads
+from app.catalog import lookup_products
+from app.search import search_products as product_search
 
 @bp.before_request
 def employee_required():
     if not current_user.is_authenticated:
         return redirect(url_for('auth.login'))
 
+# Pages only read, so they go to the read engine unless marked @primary_reads
+replica_reads(bp)
+
 @bp.route('/dashboard')
 @login_required
+@query_budget(8)
+@primary_reads
 def dashboard():
     # Employee's recent sales
-    recent_sales = Sale.query.filter_by(employee_id=current_user.id).order_by(Sale.timestamp.desc()).limit(10).all()
+    recent_sales = Sale.query.options(*ledger_row()).filter_by(employee_id=current_user.id).order_by(Sale.timestamp.desc()).limit(10).all()
     
     # Total sales for employee
     total_sales = db.session.query(db.func.sum(Sale.total_amount)).filter_by(employee_id=current_user.id).scalar() or 0
@@ -33,45 +46,76 @@ def dashboard():
 
 @bp.route('/products')
 @login_required
+@primary_reads
 def products():
-    products = Product.query.filter(Product.quantity_in_stock > 0).all()
+    products = Product.query.options(*product_card()).filter(Product.quantity_in_stock > 0).all()
     return render_template('employee/products.html', products=products)
 
+@bp.route('/product_lookup')
+@login_required
+def product_lookup():
+    # Typeahead for the product select: SKU prefix matches first, then name matches
+    limit = max(1, min(request.args.get('limit', 20, type=int), 50))
+    return jsonify(products=lookup_products(request.args.get('q', ''), limit=limit, in_stock_only=True))
+
 @bp.route('/add_sale', methods=['GET', 'POST'])
 @login_required
 def add_sale():
     form = SaleForm()
-    form.product_id.choices = [(p.id, f"{p.name} ({p.sku}) - Stock: {p.quantity_in_stock}") 
-                             for p in Product.query.filter(Product.quantity_in_stock > 0).all()]
     
     if form.validate_on_submit():
-        product = Product.query.get(form.product_id.data)
-        if product and product.quantity_in_stock >= form.quantity.data:
-            # Create sale
-            sale = Sale(
-                product_id=product.id,
-                quantity_sold=form.quantity.data,
-                price_per_unit=product.selling_price,
-                employee_id=current_user.id
-            )
-            db.session.add(sale)
-            
-            # Update product quantity
-            product.quantity_in_stock -= form.quantity.data
-            db.session.commit()
-            
-            flash(f'Sale recorded successfully! Sold {form.quantity.data} units of {product.name}.', 'success')
-            return redirect(url_for('employee.dashboard'))
-        else:
+        try:
+            # Stock is checked and decremented in one conditional UPDATE
+            sale = sell_product(form.product_id.data, form.quantity.data, current_user.id)
+        except InsufficientStock:
             flash('Insufficient stock available!', 'danger')
+        else:
+            flash(f'Sale recorded successfully! Sold {form.quantity.data} units of {sale.product.name}.', 'success')
+            return redirect(url_for('employee.dashboard'))
     
     return render_template('employee/add_sale.html', form=form)
 
+@bp.route('/checkout', methods=['POST'])
+@login_required
+def checkout():
+    # Basket checkout for tills: {"lines": [{"product_id": 1, "quantity": 2}, ...]}
+    data = request.get_json(silent=True) or {}
+    try:
+        lines = [(int(line['product_id']), int(line['quantity'])) for line in data.get('lines', [])]
+    except (KeyError, TypeError, ValueError):
+        return jsonify(error='Each line needs an integer product_id and quantity.'), 400
+    
+    if not lines or any(quantity < 1 for _, quantity in lines):
+        return jsonify(error='The basket must contain lines with a quantity of at least 1.'), 400
+    if len(lines) > current_app.config['BASKET_MAX_LINES']:
+        return jsonify(error=f"A basket can hold at most {current_app.config['BASKET_MAX_LINES']} lines."), 400
+    
+    try:
+        receipt = checkout_basket(lines, current_user.id)
+    except InsufficientStock as e:
+        return jsonify(error='Insufficient stock available!', shortages=e.args[0]), 409
+    
+    return jsonify(receipt), 201
+
 @bp.route('/sales')
 @login_required
+@query_budget(5)
 def sales():
-    sales = Sale.query.filter_by(employee_id=current_user.id).order_by(Sale.timestamp.desc()).all()
-    return render_template('employee/sales.html', sales=sales)
+    cursor = request.args.get('cursor')
+    per_page = page_size_arg()
+    sales, next_cursor = sales_page(employee_id=current_user.id, cursor=decode_cursor(cursor), page_size=per_page)
+    
+    # Ledger totals come from the rollups rather than the rows on this page
+    total_amount, total_quantity, total_count = sales_totals(employee_id=current_user.id)
+    
+    return render_template('employee/sales.html',
+                         sales=sales,
+                         cursor=cursor,
+                         next_cursor=next_cursor,
+                         per_page=per_page,
+                         total_amount=total_amount,
+                         total_quantity=total_quantity,
+                         total_count=total_count)
 @bp.route('/search_products')
 @login_required
 def search_products():
@@ -80,15 +124,10 @@ def search_products():
     if not query:
         return redirect(url_for('employee.products'))
     
-    # Search for products by name or SKU (only in-stock products)
-    products = Product.query.filter(
-        db.and_(
-            db.or_(
-                Product.name.contains(query),
-                Product.sku.contains(query)
-            ),
-            Product.quantity_in_stock > 0
-        )
+    # Full-text search over name, SKU, category and description (only in-stock products)
+    products = product_search(
+        query,
+        Product.query.options(*product_card()).filter(Product.quantity_in_stock > 0)
     ).all()
     
     return render_template('employee/search_results.html', 
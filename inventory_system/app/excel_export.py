@@ -0,0 +1,132 @@
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Border, Side, Alignment, NamedStyle
+from openpyxl.utils import get_column_letter
+
+# Write-only workbooks for the Excel reports. Rows go to disk as they are
+# appended, and every cell refers to one of the named styles below instead of
+# carrying its own font, fill and border, so memory stays flat however many
+# rows a report has.
+
+# Rows fetched from the database per round trip while streaming
+BATCH_ROWS = 1000
+
+CURRENCY_FORMAT = '#,##0.00'
+INTEGER_FORMAT = '#,##0'
+DATE_FORMAT = 'YYYY-MM-DD HH:MM'
+
+FOOTER_TEXT = "© Copyright CKS Tech | Contact: +256 755261254 | Email: kephacheps55@gmail.com"
+
+STATUS_STYLES = {
+    'Out of Stock': 'report_out_of_stock',
+    'Low Stock': 'report_low_stock',
+    'In Stock': 'report_in_stock',
+}
+
+
+def _named_styles():
+    thin = Side(style='thin')
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    center = Alignment(horizontal='center')
+
+    def style(name, **kwargs):
+        named = NamedStyle(name=name)
+        for key, value in kwargs.items():
+            setattr(named, key, value)
+        return named
+
+    def status(name, color):
+        return style(name, font=Font(name='Calibri', size=10, bold=True), border=border,
+                     fill=PatternFill(start_color=color, end_color=color, fill_type='solid'))
+
+    return [
+        style('report_company', font=Font(name='Calibri', size=14, bold=True, color='546E7A'), alignment=center),
+        style('report_title', font=Font(name='Calibri', size=16, bold=True, color='2E4057'), alignment=center),
+        style('report_period', font=Font(name='Calibri', size=12, bold=True, color='4A6572'), alignment=center),
+        style('report_section', font=Font(name='Calibri', size=12, bold=True, color='4A6572')),
+        style('report_info_label', font=Font(name='Calibri', size=10, color='546E7A')),
+        style('report_info', font=Font(name='Calibri', size=10)),
+        style('report_summary_label', font=Font(name='Calibri', size=11, bold=True)),
+        style('report_summary_value', font=Font(name='Calibri', size=11)),
+        style('report_summary_amount', font=Font(name='Calibri', size=11), number_format=CURRENCY_FORMAT),
+        style('report_header', font=Font(name='Calibri', size=12, bold=True, color='FFFFFF'), border=border,
+              fill=PatternFill(start_color='2E4057', end_color='2E4057', fill_type='solid'), alignment=center),
+        style('report_text', font=Font(name='Calibri', size=10), border=border),
+        style('report_integer', font=Font(name='Calibri', size=10), border=border, number_format=INTEGER_FORMAT),
+        style('report_currency', font=Font(name='Calibri', size=10), border=border, number_format=CURRENCY_FORMAT),
+        style('report_date', font=Font(name='Calibri', size=10), border=border, number_format=DATE_FORMAT),
+        status('report_out_of_stock', 'FFFF5252'),
+        status('report_low_stock', 'FFFFC107'),
+        status('report_in_stock', 'FF4CAF50'),
+        style('report_footer', font=Font(name='Calibri', size=9, color='546E7A'), alignment=center),
+    ]
+
+
+class ReportSheet:
+    """A single write-only worksheet laid out like the interactive reports.
+
+    Rows are written strictly top to bottom; ``row`` is the number of the
+    last row written, so sections can be placed relative to it.
+    """
+
+    def __init__(self, title, column_widths):
+        self.workbook = openpyxl.Workbook(write_only=True)
+        for style in _named_styles():
+            self.workbook.add_named_style(style)
+        self.sheet = self.workbook.create_sheet(title)
+        self.last_column = get_column_letter(len(column_widths))
+        # Column widths have to be set before the first row is written
+        for i, width in enumerate(column_widths, start=1):
+            self.sheet.column_dimensions[get_column_letter(i)].width = width
+        self.row = 0
+
+    def cell(self, value, style):
+        cell = WriteOnlyCell(self.sheet, value=value)
+        cell.style = style
+        return cell
+
+    def append(self, cells=(), at=None):
+        # Blank rows up to ``at`` keep sections on the same rows as before
+        while at is not None and self.row < at - 1:
+            self.sheet.append([])
+            self.row += 1
+        self.sheet.append(list(cells))
+        self.row += 1
+
+    def banner(self, text, style, at=None):
+        # A line of text centred across every report column
+        self.append([self.cell(text, style)], at=at)
+        self.sheet.merged_cells.add(f'A{self.row}:{self.last_column}{self.row}')
+
+    def header(self, title, period, generated_on, generated_by, info_column):
+        self.banner("CKS BUSINESS MANAGEMENT SYSTEM", 'report_company')
+        self.banner(title, 'report_title')
+        self.banner(period, 'report_period')
+        padding = [None] * (info_column - 1)
+        self.append(padding + [self.cell("Generated on:", 'report_info_label'), self.cell(generated_on, 'report_info')])
+        self.append(padding + [self.cell("Generated by:", 'report_info_label'), self.cell(generated_by, 'report_info')])
+
+    def summary(self, rows, at):
+        self.append([self.cell("REPORT SUMMARY", 'report_section')], at=at)
+        for label, value in rows:
+            self.append([
+                self.cell(label, 'report_summary_label'),
+                self.cell(value, 'report_summary_amount' if 'UGX' in value else 'report_summary_value')
+            ])
+
+    def table_header(self, section, headers, at):
+        self.append([self.cell(section, 'report_section')], at=at)
+        self.append([self.cell(header, 'report_header') for header in headers])
+
+    def rows(self, rows, styles):
+        # One styled cell per column, refilled for every row: the sheet writes
+        # each row out as soon as it is appended, so the cells can be reused
+        cells = [self.cell(None, style) for style in styles]
+        for values in rows:
+            for cell, value in zip(cells, values):
+                cell.value = value
+            self.append(cells)
+
+    def save(self, out):
+        self.banner(FOOTER_TEXT, 'report_footer', at=self.row + 2)
+        self.workbook.save(out)
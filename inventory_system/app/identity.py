@@ -0,0 +1,76 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event
+
+from app import db
+from app.models import User
+
+# Who is logged in, without a database round trip on every request. The user
+# loader keeps a bounded per-process cache of (id -> username, role) snapshots
+# that expire after IDENTITY_CACHE_TTL seconds. User changes flushed in this
+# process drop the entry straight away; other workers pick them up when their
+# entry expires, so a demoted or deleted user keeps access for at most the TTL.
+# With IDENTITY_CACHE_STRICT set, the full User row is loaded on every request.
+
+# {(database url, user id): (expires at, Identity)}, least recently used first
+_identities = OrderedDict()
+_lock = Lock()
+
+
+class Identity(UserMixin):
+    """The parts of a User that requests need, detached from any session."""
+
+    def __init__(self, id, username, role):
+        self.id = id
+        self.username = username
+        self.role = role
+
+    def is_admin(self):
+        return self.role == 'admin'
+
+
+def _key(user_id):
+    return (str(db.engine.url), user_id)
+
+
+def forget_user(user_id):
+    """Drop a cached identity so the next request loads it again."""
+    with _lock:
+        _identities.pop(_key(user_id), None)
+
+
+def load_identity(user_id):
+    config = current_app.config
+    if config.get('IDENTITY_CACHE_STRICT'):
+        return db.session.get(User, user_id)
+
+    key = _key(user_id)
+    now = time.monotonic()
+    with _lock:
+        cached = _identities.get(key)
+        if cached and cached[0] > now:
+            _identities.move_to_end(key)
+            return cached[1]
+
+    row = db.session.query(User.id, User.username, User.role).filter(User.id == user_id).first()
+    if row is None:
+        forget_user(user_id)
+        return None
+
+    identity = Identity(row.id, row.username, row.role)
+    with _lock:
+        _identities[key] = (now + config.get('IDENTITY_CACHE_TTL', 30), identity)
+        _identities.move_to_end(key)
+        while len(_identities) > config.get('IDENTITY_CACHE_SIZE', 1024):
+            _identities.popitem(last=False)
+    return identity
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    forget_user(target.id)
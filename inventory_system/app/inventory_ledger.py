@@ -0,0 +1,146 @@
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import case, event, func, select
+
+from app import db
+from app.models import InventoryMovement, Product, StockSnapshot
+
+# Stock levels as an append-only ledger. Every change to a product's stock is an
+# InventoryMovement row (its opening balance, sales, restocks and adjustments),
+# numbered per product, and Product.quantity_in_stock is a cache of their
+# running sum that the same statement keeps up to date. Every
+# INVENTORY_SNAPSHOT_EVERY movements the running balance is written to
+# StockSnapshot, so the stock at any past moment is the snapshot before it plus
+# a replay of at most that many movements.
+
+KINDS = ('opening', 'sale', 'restock', 'adjustment')
+
+
+def _snapshot_due(sequence):
+    return sequence % current_app.config.get('INVENTORY_SNAPSHOT_EVERY', 100) == 0
+
+
+@event.listens_for(Product, 'before_insert')
+def _number_opening(mapper, connection, target):
+    target.ledger_sequence = 1
+
+
+@event.listens_for(Product, 'after_insert')
+def _record_opening(mapper, connection, target):
+    # However a product is created, its initial stock is the ledger's first row
+    created_at = target.date_added or datetime.utcnow()
+    quantity = target.quantity_in_stock or 0
+    connection.execute(InventoryMovement.__table__.insert().values(
+        product_id=target.id, sequence=1, kind='opening', quantity=quantity,
+        unit_cost=target.cost_price, created_at=created_at
+    ))
+    if _snapshot_due(1):
+        connection.execute(StockSnapshot.__table__.insert().values(
+            product_id=target.id, sequence=1, balance=quantity, created_at=created_at
+        ))
+
+
+def record_movements(kind, deltas, guard=False):
+    """Move stock by the signed ``deltas`` ({product_id: quantity}), one ledger row per product.
+
+    The quantity_in_stock cache moves in the same UPDATE. With ``guard`` no
+    product may go below zero; if one would, nothing is recorded, None is
+    returned and the caller must roll back. Otherwise returns ``(levels,
+    movements)`` keyed by product id: each product's stock, prices and
+    threshold after the move, and its new InventoryMovement, for the caller to
+    link to the sale or stock addition behind it.
+    """
+    ids = list(deltas)
+    change = case(deltas, value=Product.id)
+    query = Product.query.filter(Product.id.in_(ids))
+    if guard:
+        query = query.filter(Product.quantity_in_stock + change >= 0)
+    updated = query.update({
+        Product.quantity_in_stock: Product.quantity_in_stock + change,
+        Product.ledger_sequence: Product.ledger_sequence + 1
+    }, synchronize_session=False)
+    if updated != len(ids):
+        return None
+
+    # Read back under the write lock the UPDATE just took
+    levels = {row.id: row for row in db.session.query(
+        Product.id, Product.quantity_in_stock, Product.ledger_sequence,
+        Product.cost_price, Product.selling_price, Product.low_stock_threshold
+    ).filter(Product.id.in_(ids)).all()}
+
+    now = datetime.utcnow()
+    movements = {}
+    for product_id, quantity in deltas.items():
+        level = levels[product_id]
+        movements[product_id] = InventoryMovement(
+            product_id=product_id, sequence=level.ledger_sequence, kind=kind,
+            quantity=quantity, unit_cost=level.cost_price, created_at=now
+        )
+        if _snapshot_due(level.ledger_sequence):
+            db.session.add(StockSnapshot(product_id=product_id, sequence=level.ledger_sequence,
+                                         balance=level.quantity_in_stock, created_at=now))
+    db.session.add_all(movements.values())
+    return levels, movements
+
+
+def level_at(when):
+    """SQL expression for a Product's stock just before ``when``, correlated to the product row.
+
+    The last snapshot taken before ``when`` plus the movements between it and
+    the next snapshot that are also before ``when``.
+    """
+    def snapshot(column, before):
+        if before:
+            condition, order = StockSnapshot.created_at < when, StockSnapshot.created_at.desc()
+        else:
+            condition, order = StockSnapshot.created_at >= when, StockSnapshot.created_at
+        return select(column).where(StockSnapshot.product_id == Product.id, condition) \
+            .order_by(order).limit(1).correlate(Product).scalar_subquery()
+
+    base = func.coalesce(snapshot(StockSnapshot.sequence, True), 0)
+    until = func.coalesce(snapshot(StockSnapshot.sequence, False), Product.ledger_sequence)
+    replay = select(func.coalesce(func.sum(InventoryMovement.quantity), 0)).where(
+        InventoryMovement.product_id == Product.id,
+        InventoryMovement.sequence > base,
+        InventoryMovement.sequence <= until,
+        InventoryMovement.created_at < when
+    ).correlate(Product).scalar_subquery()
+    return func.coalesce(snapshot(StockSnapshot.balance, True), 0) + replay
+
+
+def stock_at(product_id, when):
+    """A product's stock just before ``when``."""
+    return db.session.query(level_at(when)).select_from(Product).filter(Product.id == product_id).scalar()
+
+
+def ledger_drift():
+    """{product_id: (cached quantity, ledger balance)} for products whose cache disagrees with the ledger."""
+    ledger = db.session.query(
+        InventoryMovement.product_id.label('product_id'),
+        func.sum(InventoryMovement.quantity).label('balance')
+    ).group_by(InventoryMovement.product_id).subquery()
+    cached = func.coalesce(Product.quantity_in_stock, 0)
+    balance = func.coalesce(ledger.c.balance, 0)
+    rows = db.session.query(Product.id, cached, balance) \
+        .outerjoin(ledger, ledger.c.product_id == Product.id).filter(cached != balance).all()
+    return {product_id: (stored, actual) for product_id, stored, actual in rows}
+
+
+def reconcile_ledger(adopt_cache=False, dry_run=False):
+    """Bring quantity_in_stock and the ledger back into line; returns the drift found.
+
+    By default the cache is reset to the ledger balance. With ``adopt_cache``
+    the cached quantities are taken as right instead (stock edited by scripts
+    or by hand) and an adjustment movement is recorded for the difference.
+    """
+    drift = ledger_drift()
+    if dry_run or not drift:
+        return drift
+    for product_id, (stored, actual) in drift.items():
+        Product.query.filter(Product.id == product_id).update(
+            {Product.quantity_in_stock: actual}, synchronize_session=False)
+        if adopt_cache:
+            record_movements('adjustment', {product_id: stored - actual})
+    db.session.commit()
+    return drift
@@ -0,0 +1,144 @@
+from sqlalchemy import DDL, case, event, func, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import InventoryStats, Product, Sale
+
+# Dashboard totals kept as running counters in the single InventoryStats row.
+# Every write that moves them adds its own deltas in SQL, inside its own
+# transaction, so the row always agrees with the data it summarises; products
+# count themselves in on insert, so setup scripts adding them through the ORM
+# keep it current too. Edits made behind the app's back (manual SQL, bulk
+# updates) leave the counters stale until `flask reconcile-stats` is run.
+
+COUNTERS = ('stock_value', 'revenue', 'product_count', 'low_stock_count', 'sale_count')
+
+# Float totals are allowed to wander this far from a fresh sum before it counts as drift
+TOLERANCE = 0.005
+
+# A freshly created database starts with zeroed counters (migrations seed them from existing data)
+event.listen(InventoryStats.__table__, 'after_create', DDL(
+    'INSERT INTO inventory_stats (id, stock_value, revenue, product_count, low_stock_count, sale_count) '
+    'VALUES (1, 0, 0, 0, 0, 0)'
+))
+
+
+def _stats_row():
+    return InventoryStats.query.filter(InventoryStats.id == 1)
+
+
+def stock_state(product):
+    """(quantity, cost price, low stock threshold) of a product, as stock_change expects."""
+    return product.quantity_in_stock or 0, product.cost_price, product.low_stock_threshold
+
+
+def is_low(state):
+    quantity, cost_price, threshold = state
+    return threshold is not None and quantity <= threshold
+
+
+def _footprint(state):
+    # What one product adds to the stock value and low stock counters
+    if state is None:
+        return 0, 0, 0
+    return 1, state[0] * state[1], 1 if is_low(state) else 0
+
+
+def stock_change(*changes):
+    """Counter deltas for products going from one stock_state to another.
+
+    Each change is a ``(before, after)`` pair; ``before`` is None for a new
+    product.
+    """
+    deltas = dict(product_count=0, stock_value=0, low_stock_count=0)
+    for before, after in changes:
+        old, new = _footprint(before), _footprint(after)
+        deltas['product_count'] += new[0] - old[0]
+        deltas['stock_value'] += new[1] - old[1]
+        deltas['low_stock_count'] += new[2] - old[2]
+    return deltas
+
+
+@event.listens_for(Product, 'after_insert')
+def _count_new_product(mapper, connection, target):
+    # However a product is created, it joins the counters in its own
+    # transaction. Without a stats row there is nothing to move: the full
+    # count that builds the row on first use already includes it.
+    deltas = stock_change((None, stock_state(target)))
+    connection.execute(update(InventoryStats.__table__).where(InventoryStats.id == 1).values({
+        name: getattr(InventoryStats, name) + delta for name, delta in deltas.items()
+    }))
+
+
+def compute_stats():
+    """Every counter recomputed from the products and sales tables."""
+    product_count, stock_value, low_stock_count = db.session.query(
+        func.count(Product.id),
+        func.sum(Product.quantity_in_stock * Product.cost_price),
+        func.sum(case((Product.quantity_in_stock <= Product.low_stock_threshold, 1), else_=0))
+    ).one()
+    revenue, sale_count = db.session.query(func.sum(Sale.total_amount), func.count(Sale.id)).one()
+    return dict(
+        stock_value=stock_value or 0,
+        revenue=revenue or 0,
+        product_count=product_count,
+        low_stock_count=low_stock_count or 0,
+        sale_count=sale_count
+    )
+
+
+def _create_stats():
+    # First use on this database: start from a full count, which already
+    # includes whatever the current transaction has written
+    try:
+        with db.session.begin_nested():
+            db.session.add(InventoryStats(id=1, **compute_stats()))
+        return True
+    except IntegrityError:
+        return False
+
+
+def adjust_stats(**deltas):
+    """Add ``deltas`` (keyword per counter) to the stored counters.
+
+    Runs inside the caller's transaction; the increments are done in SQL so
+    concurrent tills do not lose each other's updates.
+    """
+    values = {getattr(InventoryStats, name): getattr(InventoryStats, name) + delta
+              for name, delta in deltas.items() if delta}
+    if not values:
+        return
+    if _stats_row().update(values, synchronize_session=False):
+        return
+    if not _create_stats():
+        _stats_row().update(values, synchronize_session=False)
+
+
+def inventory_stats():
+    """The stored counters, creating the row if this database has none yet."""
+    stats = _stats_row().first()
+    if stats is None:
+        _create_stats()
+        db.session.commit()
+        stats = _stats_row().one()
+    return stats
+
+
+def reconcile_stats(dry_run=False):
+    """Recompute the counters and return the drift as {counter: (stored, actual)}.
+
+    Unless ``dry_run`` is set the stored row is overwritten with the fresh values.
+    """
+    actual = compute_stats()
+    stats = _stats_row().first()
+    stored = {name: getattr(stats, name) for name in COUNTERS} if stats else dict.fromkeys(COUNTERS, 0)
+    drift = {name: (stored[name], actual[name]) for name in COUNTERS
+             if abs(stored[name] - actual[name]) > TOLERANCE}
+
+    if not dry_run:
+        if stats is None:
+            db.session.add(InventoryStats(id=1, **actual))
+        else:
+            _stats_row().update(actual, synchronize_session=False)
+        db.session.commit()
+    return drift
@@ -0,0 +1,30 @@
+from sqlalchemy.orm import joinedload, raiseload
+
+from app.models import Product, Sale, StockAddition, User
+
+# Named eager-loading profiles. Each returns the loader options a query needs to
+# render a given kind of row without lazy-loading relationships one row at a time.
+# They are functions because Sale.product and StockAddition.product are backrefs
+# that only exist once the mappers have been configured.
+
+
+def ledger_row():
+    # A sale with its product name/SKU and the cashier's username
+    return (
+        joinedload(Sale.product, innerjoin=True).load_only(Product.name, Product.sku),
+        joinedload(Sale.employee, innerjoin=True).load_only(User.username),
+    )
+
+
+def product_card():
+    # A product rendered from its own columns; touching a relationship is a bug
+    return (raiseload('*'),)
+
+
+def audit_row():
+    # A stock addition with the username of whoever recorded it
+    return (
+        joinedload(StockAddition.user).load_only(User.username),
+        raiseload(StockAddition.product),
+    )
+
@@ -0,0 +1,191 @@
+from datetime import datetime
+
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import InventoryMovement, Product, Sale, SaleMargin, StockAddition, User
+
+# Margin analytics. Sales only store what they were sold for, so their cost of
+# goods is worked out afterwards, in bulk with pandas, and kept per sale in
+# sale_margin, two ways:
+#   cost       quantity x the cost price in effect when the sale was made, from
+#              the price changes recorded on stock additions
+#   fifo_cost  the cost of the oldest units still in stock, taking the inventory
+#              ledger's opening balances, restocks and positive adjustments as
+#              layers that sales use up in order
+# refresh_sale_margins() only costs sales newer than the last one in the
+# table, so a view pays for what was sold since the previous one, not for the
+# whole history; `flask refresh-margins` does the initial backfill, and the
+# page itself costs at most MARGIN_REFRESH_MAX_SALES before answering. Two
+# refreshes running at once simply let the first to commit a chunk win. pandas
+# is imported there rather than here, so workers that never compute margins do
+# not load it.
+
+METHODS = {
+    'cost': SaleMargin.cost,
+    'fifo': SaleMargin.fifo_cost,
+}
+
+GROUPINGS = {
+    'product': (Product, SaleMargin.product_id == Product.id, (Product.id.label('product_id'), Product.name, Product.sku)),
+    'category': (Product, SaleMargin.product_id == Product.id, (Product.category,)),
+    'employee': (User, SaleMargin.employee_id == User.id, (User.id.label('employee_id'), User.username)),
+}
+
+
+class MarginError(ValueError):
+    pass
+
+
+def _frame(rows, columns):
+    import pandas as pd
+    return pd.DataFrame.from_records(rows, columns=columns)
+
+
+def _cost_in_effect(sales, product_ids):
+    # Each stock addition leaves the cost at its new cost price, or at the old
+    # one when it was not changed; a sale takes the latest before it
+    import pandas as pd
+
+    changes = _frame(db.session.query(
+        StockAddition.product_id, StockAddition.date_added, StockAddition.old_cost_price, StockAddition.new_cost_price
+    ).filter(StockAddition.product_id.in_(product_ids), StockAddition.date_added.isnot(None)).all(),
+        ['product_id', 'date_added', 'old_cost_price', 'new_cost_price'])
+    changes = changes.astype({'product_id': 'int64', 'old_cost_price': 'float64', 'new_cost_price': 'float64'})
+    changes['date_added'] = pd.to_datetime(changes.date_added).astype('datetime64[ns]')
+    changes['effective'] = changes.new_cost_price.fillna(changes.old_cost_price)
+    changes = changes.sort_values(['date_added', 'product_id'])
+
+    priced = pd.merge_asof(
+        sales.sort_values('timestamp'), changes[['product_id', 'date_added', 'effective']],
+        left_on='timestamp', right_on='date_added', by='product_id', direction='backward'
+    )
+    # Before a product's first stock addition the cost was that addition's old
+    # cost price; a product never restocked has only ever had its current one
+    first = changes.dropna(subset=['old_cost_price']).groupby('product_id').old_cost_price.first()
+    current = dict(db.session.query(Product.id, Product.cost_price).filter(Product.id.in_(product_ids)).all())
+    priced['unit_cost'] = priced.effective.fillna(priced.product_id.map(first)).fillna(priced.product_id.map(current))
+    return priced.drop(columns=['date_added', 'effective'])
+
+
+def _fifo_cost(sales, product_ids):
+    # Every product's layers are laid end to end on one axis of units received,
+    # with the running cost of those units, so a single np.interp prices where
+    # every sale starts and ends in its product's layers
+    import numpy as np
+
+    layers = _frame(db.session.query(
+        InventoryMovement.product_id, InventoryMovement.quantity, InventoryMovement.unit_cost
+    ).filter(
+        InventoryMovement.product_id.in_(product_ids), InventoryMovement.quantity > 0, InventoryMovement.kind != 'sale'
+    ).order_by(InventoryMovement.product_id, InventoryMovement.sequence).all(), ['product_id', 'quantity', 'unit_cost']) \
+        .astype({'product_id': 'int64', 'quantity': 'int64', 'unit_cost': 'float64'})
+    layers['unit_cost'] = layers.unit_cost.fillna(layers.product_id.map(
+        sales.groupby('product_id').unit_cost.first()))
+
+    received = layers.groupby('product_id').quantity.sum().reindex(product_ids, fill_value=0)
+    start = received.cumsum() - received
+    axis = np.concatenate([[0], start[layers.product_id].to_numpy() + layers.groupby('product_id').quantity.cumsum().to_numpy()])
+    cost = np.concatenate([[0], (layers.quantity * layers.unit_cost).cumsum().to_numpy()])
+
+    # Units of each product already sold by the sales costed earlier
+    sold = dict(db.session.query(SaleMargin.product_id, func.sum(SaleMargin.quantity))
+                .filter(SaleMargin.product_id.in_(product_ids)).group_by(SaleMargin.product_id).all())
+    sales = sales.sort_values(['product_id', 'timestamp', 'sale_id'])
+    after = sales.product_id.map(sold).fillna(0).to_numpy() + sales.groupby('product_id').quantity.cumsum().to_numpy()
+    before = after - sales.quantity.to_numpy()
+
+    total = received[sales.product_id].to_numpy()
+    offset = start[sales.product_id].to_numpy()
+    layered = np.interp(offset + np.minimum(after, total), axis, cost) - np.interp(offset + np.minimum(before, total), axis, cost)
+    # Units sold beyond everything the ledger received are costed at the price in effect
+    beyond = np.maximum(after - np.maximum(before, total), 0)
+    return sales.assign(fifo_cost=layered + beyond * sales.unit_cost.to_numpy())
+
+
+def refresh_sale_margins(chunk_size=50000, max_sales=None):
+    """Work out the cost of goods of sales not yet in sale_margin; returns how many were added.
+
+    Sales are taken in id order, ``chunk_size`` at a time, each chunk
+    committed on its own, stopping after ``max_sales`` when it is given.
+    """
+    import pandas as pd
+
+    added = 0
+    while max_sales is None or added < max_sales:
+        limit = chunk_size if max_sales is None else min(chunk_size, max_sales - added)
+        last = db.session.query(func.max(SaleMargin.sale_id)).scalar() or 0
+        rows = db.session.query(
+            Sale.id, Sale.timestamp, Sale.product_id, Sale.employee_id, Sale.quantity_sold, Sale.total_amount
+        ).filter(Sale.id > last).order_by(Sale.id).limit(limit).all()
+        if not rows:
+            return added
+
+        sales = _frame(rows, ['sale_id', 'timestamp', 'product_id', 'employee_id', 'quantity', 'revenue'])
+        sales['timestamp'] = pd.to_datetime(sales.timestamp.fillna(datetime.utcnow())).astype('datetime64[ns]')
+        product_ids = sorted(sales.product_id.unique().tolist())
+
+        sales = _fifo_cost(_cost_in_effect(sales, product_ids), product_ids)
+        sales['cost'] = sales.quantity * sales.unit_cost
+        sales['date'] = sales.timestamp.dt.date
+        try:
+            db.session.execute(insert(SaleMargin), sales[
+                ['sale_id', 'date', 'product_id', 'employee_id', 'quantity', 'revenue', 'cost', 'fifo_cost']
+            ].to_dict('records'))
+            db.session.commit()
+        except IntegrityError:
+            # Another refresh costed these sales first; go on from where it got to
+            db.session.rollback()
+            if (db.session.query(func.max(SaleMargin.sale_id)).scalar() or 0) <= last:
+                raise
+            continue
+
+        added += len(rows)
+        if len(rows) < limit:
+            return added
+    return added
+
+
+def uncosted_sales():
+    """How many sales refresh_sale_margins() has yet to cost."""
+    last = db.session.query(func.max(SaleMargin.sale_id)).scalar_subquery()
+    return db.session.query(func.count(Sale.id)).filter(Sale.id > func.coalesce(last, 0)).scalar()
+
+
+def check_summary(by, method):
+    """Raise MarginError unless ``by`` and ``method`` name a grouping and a cost method."""
+    if by not in GROUPINGS:
+        raise MarginError(f"Unknown grouping {by!r}; use one of {', '.join(GROUPINGS)}")
+    if method not in METHODS:
+        raise MarginError(f"Unknown cost method {method!r}; use one of {', '.join(METHODS)}")
+
+
+def margin_summary(by='product', method='cost', start_date=None, end_date=None):
+    """Units, revenue, cost of goods and margin per product, category or employee.
+
+    Covers sales dated ``start_date`` up to (not including) ``end_date``; either
+    bound may be omitted. Reads sale_margin only, so refresh it first.
+    """
+    check_summary(by, method)
+
+    target, on, columns = GROUPINGS[by]
+    revenue = func.sum(SaleMargin.revenue)
+    query = db.session.query(
+        *columns,
+        func.sum(SaleMargin.quantity).label('quantity'),
+        revenue.label('revenue'),
+        func.sum(METHODS[method]).label('cost')
+    ).select_from(SaleMargin).join(target, on)
+    if start_date:
+        query = query.filter(SaleMargin.date >= start_date)
+    if end_date:
+        query = query.filter(SaleMargin.date < end_date)
+
+    summary = []
+    for row in query.group_by(*columns).order_by(revenue.desc()).all():
+        entry = row._asdict()
+        entry['margin'] = entry['revenue'] - entry['cost']
+        entry['margin_pct'] = round(entry['margin'] / entry['revenue'] * 100, 2) if entry['revenue'] else None
+        summary.append(entry)
+    return summary
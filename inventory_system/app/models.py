@@ -1,12 +1,14 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 from app import db, login_manager
+from app.passwords import hash_password, verify_password
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Served from the identity cache; see app/identity.py
+    from app.identity import load_identity
+    return load_identity(int(user_id))
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -17,10 +19,11 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 #
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 #
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        # Runs on the bounded login pool and may raise LoginBusy
+        return verify_password(self.password_hash, password)
 #
     def is_admin(self):
         return self.role == 'admin'
@@ -33,6 +36,10 @@ class Product(db.Model):
     selling_price = db.Column(db.Float, nullable=False)
     quantity_in_stock = db.Column(db.Integer, default=0)
     low_stock_threshold = db.Column(db.Integer, default=10)  # Default threshold
+    # At or below its own threshold; kept current by the sale and stock writes (app/stock_alerts.py)
+    low_stock = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false(), index=True)
+    # Number of this product's InventoryMovement rows; quantity_in_stock is their running sum
+    ledger_sequence = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     category = db.Column(db.String(50), default='General')
     description = db.Column(db.Text, nullable=True)
     date_added = db.Column(db.DateTime, default=datetime.utcnow)
@@ -52,6 +59,11 @@ class Product(db.Model):
     def is_low_stock(self):
         return self.quantity_in_stock <= self.low_stock_threshold
 class StockAddition(db.Model):
+    __table_args__ = (
+        db.Index('ix_stock_addition_product_date', 'product_id', 'date_added'),
+        db.Index('ix_stock_addition_date_added', 'date_added'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     quantity_added = db.Column(db.Integer, nullable=False)
@@ -79,12 +91,18 @@ class StockAddition(db.Model):
     def any_price_changed(self):
         return self.cost_price_changed or self.selling_price_changed
 class Sale(db.Model):
+    __table_args__ = (
+        db.Index('ix_sale_employee_timestamp', 'employee_id', 'timestamp'),
+        db.Index('ix_sale_product_timestamp', 'product_id', 'timestamp'),
+        db.Index('ix_sale_timestamp', 'timestamp'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     quantity_sold = db.Column(db.Integer, nullable=False)
     price_per_unit = db.Column(db.Float, nullable=False)
     total_amount = db.Column(db.Float, nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     employee_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 #
     employee = db.relationship('User', backref='sales')
@@ -93,6 +111,131 @@ class Sale(db.Model):
         super(Sale, self).__init__(**kwargs)
         if self.quantity_sold and self.price_per_unit:
             self.total_amount = self.quantity_sold * self.price_per_unit
+
+class DailySalesRollup(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('date', 'product_id', 'employee_id', name='uq_daily_sales_rollup_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    employee_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    sale_count = db.Column(db.Integer, nullable=False, default=0)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    cost = db.Column(db.Float, nullable=False, default=0)
+
+class CatalogVersion(db.Model):
+    # Single row (id=1) bumped whenever a product or its prices change; stock
+    # levels are read live, so sales and restocks alone leave it alone
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class InventoryStats(db.Model):
+    # Single row (id=1) of running totals behind the admin dashboard, kept up to
+    # date by every sale and stock change; `flask reconcile-stats` recomputes it
+    id = db.Column(db.Integer, primary_key=True)
+    stock_value = db.Column(db.Float, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    product_count = db.Column(db.Integer, nullable=False, default=0)
+    low_stock_count = db.Column(db.Integer, nullable=False, default=0)
+    sale_count = db.Column(db.Integer, nullable=False, default=0)
+
+class StockAlert(db.Model):
+    # A product crossing its low stock threshold, downwards (low=True) or back up; the id is the feed cursor
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    low = db.Column(db.Boolean, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    threshold = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+#
+    product = db.relationship('Product')
+
+class InventoryMovement(db.Model):
+    # Append-only stock ledger: one row per change to a product's stock, numbered
+    # 1, 2, 3... per product. Rows are never updated or deleted (app/inventory_ledger.py)
+    __table_args__ = (
+        db.UniqueConstraint('product_id', 'sequence', name='uq_inventory_movement_sequence'),
+        db.Index('ix_inventory_movement_created_at', 'created_at'),
+        db.Index('ix_inventory_movement_product_totals', 'product_id', 'kind', 'created_at', 'quantity'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    sequence = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # opening, sale, restock, adjustment
+    quantity = db.Column(db.Integer, nullable=False)  # signed change in stock
+    unit_cost = db.Column(db.Float, nullable=True)  # cost price in effect when the stock moved
+    sale_id = db.Column(db.Integer, db.ForeignKey('sale.id'), nullable=True)
+    stock_addition_id = db.Column(db.Integer, db.ForeignKey('stock_addition.id'), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+#
+    product = db.relationship('Product')
+    sale = db.relationship('Sale')
+    stock_addition = db.relationship('StockAddition')
+
+class StockSnapshot(db.Model):
+    # A product's stock right after its sequence-th movement, taken every INVENTORY_SNAPSHOT_EVERY movements
+    __table_args__ = (
+        db.UniqueConstraint('product_id', 'sequence', name='uq_stock_snapshot_sequence'),
+        db.Index('ix_stock_snapshot_product_created_at', 'product_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    sequence = db.Column(db.Integer, nullable=False)
+    balance = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+class DailyStockLevel(db.Model):
+    # Each product's closing stock and cost price at the end of a day (UTC), written by `flask snapshot-stock`
+    __table_args__ = (
+        db.UniqueConstraint('date', 'product_id', name='uq_daily_stock_level_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    unit_cost = db.Column(db.Float, nullable=True)
+
+class SaleMargin(db.Model):
+    # Cost of goods for one sale, worked out in bulk by app/margins.py: at the cost
+    # price in effect when it was sold, and first-in first-out from the stock ledger
+    __table_args__ = (
+        db.Index('ix_sale_margin_date', 'date'),
+    )
+
+    sale_id = db.Column(db.Integer, db.ForeignKey('sale.id'), primary_key=True, autoincrement=False)
+    date = db.Column(db.Date, nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    employee_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    revenue = db.Column(db.Float, nullable=False)
+    cost = db.Column(db.Float, nullable=False)
+    fifo_cost = db.Column(db.Float, nullable=False)
+
+class ReportJob(db.Model):
+    # A PDF or Excel report built in the background; the file lives under instance/reports
+    id = db.Column(db.String(32), primary_key=True)
+    report_type = db.Column(db.String(20), nullable=False)
+    export_format = db.Column(db.String(10), nullable=False)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False)
+    requested_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, running, done, failed
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    filename = db.Column(db.String(120), nullable=False)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    # Last status or progress change; the liveness check for queued and running jobs
+    updated_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
+#
+    requester = db.relationship('User')
+
 from flask_login import AnonymousUserMixin, UserMixin
 
 class Anonymous(AnonymousUserMixin):
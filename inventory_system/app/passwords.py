@@ -0,0 +1,79 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Password hashing policy, and the small thread pool login checks run on. The
+# key derivation is deliberately slow; capping how many run at once keeps a
+# shift change's worth of logins from taking every core away from the tills.
+
+# Werkzeug's own defaults, used outside an app context
+DEFAULT_ITERATIONS = 600000
+SCRYPT_DEFAULT = 'scrypt:32768:8:1'
+
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+
+class LoginBusy(RuntimeError):
+    pass
+
+
+def hash_method():
+    """The Werkzeug method string for the configured policy, as it appears at the start of a hash."""
+    config = current_app.config if has_app_context() else {}
+    method = config.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+    parts = method.split(':')
+    if parts[0] == 'pbkdf2':
+        digest = parts[1] if len(parts) > 1 else 'sha256'
+        return f"pbkdf2:{digest}:{config.get('PASSWORD_HASH_ITERATIONS', DEFAULT_ITERATIONS)}"
+    if method == 'scrypt':
+        return SCRYPT_DEFAULT
+    return method
+
+
+def hash_password(password):
+    return generate_password_hash(password, hash_method())
+
+
+def needs_rehash(password_hash):
+    """True when ``password_hash`` was made under a different policy than the current one."""
+    return not password_hash or password_hash.split('$', 1)[0] != hash_method()
+
+
+def _pool():
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            workers = current_app.config.get('LOGIN_HASH_WORKERS', 2)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='login-hash')
+            _slots = threading.BoundedSemaphore(workers + current_app.config.get('LOGIN_MAX_PENDING', 20))
+    return _executor, _slots
+
+
+def _bounded(function, *args):
+    # Waits for the result, but never lets more than the pool's worth of hashes run
+    executor, slots = _pool()
+    if not slots.acquire(blocking=False):
+        raise LoginBusy()
+    try:
+        return executor.submit(function, *args).result()
+    finally:
+        slots.release()
+
+
+def verify_password(password_hash, password):
+    """Check ``password`` on the login pool; raises LoginBusy when too many logins are waiting."""
+    if not password_hash:
+        return False
+    return _bounded(check_password_hash, password_hash, password)
+
+
+def rehash_password(password):
+    """A hash of ``password`` under the current policy, or None if the pool is too busy right now."""
+    try:
+        return _bounded(generate_password_hash, password, hash_method())
+    except LoginBusy:
+        return None
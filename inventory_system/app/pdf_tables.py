@@ -0,0 +1,93 @@
+from reportlab.platypus import Flowable, Table, TableStyle
+
+# Long report tables for ReportLab. A plain Table that runs over many pages is
+# split one page at a time, and every split copies all the remaining rows and
+# style commands, so layout time grows with the square of the row count. A
+# PagedTable only ever builds a Table for the rows that fit on the current
+# page, keeping the work per page constant.
+
+
+class PagedTable(Flowable):
+    """A table of ``rows`` under ``header`` that is laid out page by page.
+
+    ``style`` is a list of TableStyle commands written as for a single table
+    (row 0 is the header). ``row_style(row)``, if given, returns extra commands
+    for one data row as ``(command, first_column, last_column, *values)``; they
+    are collected into the one TableStyle of each page. The header repeats at
+    the top of every page and alternating row backgrounds carry on across
+    page breaks.
+    """
+
+    def __init__(self, header, rows, colWidths, style, row_style=None, start=0):
+        Flowable.__init__(self)
+        self.header = header
+        self.rows = rows
+        self.colWidths = colWidths
+        self.style = style
+        self.row_style = row_style
+        self.start = start
+        self._table = None
+        self._heights = None
+
+    def _build(self, count):
+        first = self.start
+        data = [self.header] + self.rows[first:first + count]
+
+        commands = []
+        for command in self.style:
+            if command[0] == 'ROWBACKGROUNDS':
+                # Keep the stripes in step with the rows before this page
+                colors = list(command[3])
+                shift = first % len(colors)
+                command = command[:3] + (colors[shift:] + colors[:shift],) + command[4:]
+            commands.append(command)
+
+        if self.row_style:
+            for i, row in enumerate(data[1:], start=1):
+                for name, first_col, last_col, *values in self.row_style(row):
+                    commands.append((name, (first_col, i), (last_col, i), *values))
+
+        table = Table(data, colWidths=self.colWidths, repeatRows=1)
+        table.setStyle(TableStyle(commands))
+        return table
+
+    def _row_heights(self, availWidth):
+        # Header and tallest data row of a small sample; report rows are one line each
+        if self._heights is None:
+            sample = self._build(20)
+            sample.wrap(availWidth, 1 << 30)
+            self._heights = (sample._rowHeights[0], max(sample._rowHeights[1:] or [0]))
+        return self._heights
+
+    def _remaining(self):
+        return len(self.rows) - self.start
+
+    def wrap(self, availWidth, availHeight):
+        header_height, row_height = self._row_heights(availWidth)
+        estimate = header_height + row_height * self._remaining()
+        if estimate <= availHeight * 2:
+            # Small enough to build outright and measure exactly
+            self._table = self._build(self._remaining())
+            return self._table.wrap(availWidth, availHeight)
+        self._table = None
+        return availWidth, estimate
+
+    def split(self, availWidth, availHeight):
+        header_height, row_height = self._row_heights(availWidth)
+        count = min(int((availHeight - header_height) // row_height), self._remaining()) if row_height else 0
+        while count > 0:
+            table = self._build(count)
+            if table.wrap(availWidth, availHeight)[1] <= availHeight:
+                break
+            count -= 1
+        if count <= 0:
+            return []
+        if count == self._remaining():
+            return [table]
+
+        rest = PagedTable(self.header, self.rows, self.colWidths, self.style, self.row_style, self.start + count)
+        rest._heights = self._heights
+        return [table, rest]
+
+    def draw(self):
+        self._table.drawOn(self.canv, 0, 0)
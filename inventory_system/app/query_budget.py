@@ -0,0 +1,53 @@
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+def query_budget(limit):
+    """Set the maximum number of SQL statements a view may issue per request."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'query_count' in g:
+        g.query_count += 1
+
+
+def init_query_budget(app):
+    """Count statements per request in debug and testing mode.
+
+    When a view goes over its budget (``@query_budget`` or the
+    QUERY_BUDGET_DEFAULT setting) the overrun is logged, and under TESTING it
+    raises QueryBudgetExceeded so the offending page fails its test.
+    """
+    if not event.contains(Engine, 'before_cursor_execute', _count_statement):
+        event.listen(Engine, 'before_cursor_execute', _count_statement)
+
+    def enabled():
+        return app.debug or app.testing or app.config.get('QUERY_BUDGET_ENABLED', False)
+
+    @app.before_request
+    def start_query_count():
+        if enabled():
+            g.query_count = 0
+
+    @app.after_request
+    def check_query_count(response):
+        if 'query_count' not in g:
+            return response
+
+        view = app.view_functions.get(request.endpoint)
+        budget = getattr(view, 'query_budget', app.config.get('QUERY_BUDGET_DEFAULT', 20))
+        if g.query_count > budget:
+            message = f'{request.method} {request.path} ran {g.query_count} queries (budget {budget})'
+            app.logger.warning(message)
+            if app.testing:
+                raise QueryBudgetExceeded(message)
+        return response
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import shutil
+
+from flask import current_app
+from sqlalchemy import func
+
+from app import db
+from app.models import InventoryMovement, Sale, StockAddition
+from app.catalog import catalog_version
+from app.stock_valuation import closing_time
+
+# Generated report files, stored under instance/report_cache by a hash of what
+# went into them: report type, format, date range, the admin it was built for
+# (whose name is printed on it) and a watermark of the data it was built from.
+# A report whose data has not moved since that admin's last build is served
+# from here, still stamped with the time it was built. Least recently used
+# files are evicted once the directory grows past REPORT_CACHE_MAX_BYTES.
+
+# Bump when the report layout changes so old files stop matching
+LAYOUT_VERSION = 3
+
+EXTENSIONS = {'pdf': 'pdf', 'excel': 'xlsx'}
+
+
+def cache_dir():
+    path = os.path.join(current_app.instance_path, 'report_cache')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _watermark(report_type, start_date, end_date):
+    # Same period filter as the report builders. Sales are stamped when they are
+    # made, so a closed period's newest sale id never changes again. The stock
+    # report reads only additions and ledger movements from before the period
+    # closes, so it follows the newest of those and the catalog version, and a
+    # closed period's stock report survives later sales.
+    if report_type == 'sales':
+        last_sale = db.session.query(func.max(Sale.id)).filter(
+            Sale.timestamp >= start_date, Sale.timestamp <= end_date
+        ).scalar()
+        return f'sale={last_sale or 0}'
+
+    closes = closing_time(end_date)
+    last_addition = db.session.query(func.max(StockAddition.id)).filter(
+        StockAddition.date_added >= start_date, StockAddition.date_added < closes
+    ).scalar()
+    last_movement = db.session.query(func.max(InventoryMovement.id)).filter(
+        InventoryMovement.created_at < closes
+    ).scalar()
+    return f'addition={last_addition or 0};movement={last_movement or 0};catalog={catalog_version()}'
+
+
+def report_cache_key(report_type, export_format, start_date, end_date, user_id):
+    parts = [
+        str(LAYOUT_VERSION),
+        report_type,
+        export_format,
+        start_date.isoformat(),
+        end_date.isoformat(),
+        str(user_id),
+        _watermark(report_type, start_date, end_date),
+    ]
+    return hashlib.sha256('|'.join(parts).encode()).hexdigest()
+
+
+def _path(key, export_format):
+    return os.path.join(cache_dir(), f'{key}.{EXTENSIONS[export_format]}')
+
+
+def cached_report(key, export_format):
+    """Path of the cached file for ``key``, or None. A hit counts as a use for LRU eviction."""
+    path = _path(key, export_format)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def store_report(key, export_format, source):
+    """Add the finished report at ``source`` to the cache, then evict down to the size limit."""
+    path = _path(key, export_format)
+    partial = f'{path}.{os.getpid()}.part'
+    # A copy rather than a hard link: hits touch the cached file's mtime for
+    # LRU, which must not keep the job's own file from expiring
+    shutil.copyfile(source, partial)
+    os.replace(partial, path)
+    evict(current_app.config.get('REPORT_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+
+
+def evict(max_bytes):
+    entries = []
+    with os.scandir(cache_dir()) as scan:
+        for entry in scan:
+            if entry.is_file() and not entry.name.endswith('.part'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
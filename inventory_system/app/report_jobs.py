@@ -0,0 +1,202 @@
+import os
+import uuid
+from importlib import import_module
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func, update
+
+from app import db
+from app.models import ReportJob, User
+from app.report_cache import report_cache_key, store_report
+
+# Reports are built outside the request, in a small process pool owned by each
+# web worker. Job state lives in the report_job table, so whichever worker gets
+# the status poll or the download can answer it. Jobs whose worker went away
+# without a word are failed after REPORT_JOB_TIMEOUT, and finished jobs are
+# deleted with their files after REPORT_JOB_KEEP, by clean_report_jobs().
+
+PENDING = ('queued', 'running')
+
+MIMETYPES = {
+    'pdf': 'application/pdf',
+    'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Builder functions in app.reports, named rather than imported so the web
+# process never loads ReportLab or openpyxl just to queue a job
+REPORT_BUILDERS = {
+    ('sales', 'pdf'): 'generate_sales_report',
+    ('sales', 'excel'): 'generate_sales_excel',
+    ('stock', 'pdf'): 'generate_stock_report',
+    ('stock', 'excel'): 'generate_stock_excel',
+}
+
+_executor = None
+_worker_app = None
+
+
+def report_dir():
+    path = os.path.join(current_app.instance_path, 'reports')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def report_filename(report_type, export_format, start_date, end_date):
+    extension = 'xlsx' if export_format == 'excel' else 'pdf'
+    return f'{report_type}_report_{start_date.strftime("%Y%m%d")}_to_{end_date.strftime("%Y%m%d")}.{extension}'
+
+
+def job_path(job, directory=None):
+    extension = 'xlsx' if job.export_format == 'excel' else 'pdf'
+    return os.path.join(directory or report_dir(), f'{job.id}.{extension}')
+
+
+def _set_job(job_id, **values):
+    # Own short transaction, so progress shows up while the report's queries
+    # are still going through the session
+    with db.engine.begin() as conn:
+        conn.execute(update(ReportJob).where(ReportJob.id == job_id).values(updated_at=datetime.utcnow(), **values))
+
+
+def report_builder(report_type, export_format):
+    return getattr(import_module('app.reports'), REPORT_BUILDERS[(report_type, export_format)])
+
+
+def run_job(job_id, directory):
+    job = db.session.get(ReportJob, job_id)
+    username = db.session.query(User.username).filter(User.id == job.requested_by).scalar()
+    _set_job(job_id, status='running')
+    # Keyed on the data as it is just before the build reads it
+    cache_key = report_cache_key(job.report_type, job.export_format, job.start_date, job.end_date, job.requested_by)
+
+    def progress(fraction):
+        _set_job(job_id, progress=int(fraction * 100))
+
+    try:
+        builder = report_builder(job.report_type, job.export_format)
+        path = job_path(job, directory)
+        with open(path + '.part', 'wb') as out:
+            builder(job.start_date, job.end_date, username, out, progress)
+        os.replace(path + '.part', path)
+        store_report(cache_key, job.export_format, path)
+    except Exception as exc:
+        current_app.logger.exception('Report job %s failed', job_id)
+        db.session.rollback()
+        _set_job(job_id, status='failed', error=str(exc), finished_at=datetime.utcnow())
+        return
+
+    _set_job(job_id, status='done', progress=100, finished_at=datetime.utcnow())
+
+
+def _init_worker(database_uri, nice):
+    global _worker_app
+    from config import config_from_env
+    from app import create_app
+
+    if nice and hasattr(os, 'nice'):
+        os.nice(nice)
+    _worker_app = create_app(type('ReportWorkerConfig', (config_from_env(),), {'SQLALCHEMY_DATABASE_URI': database_uri}))
+
+
+def _run_in_worker(job_id, directory):
+    with _worker_app.app_context():
+        run_job(job_id, directory)
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=current_app.config.get('REPORT_JOB_WORKERS', 2),
+            initializer=_init_worker,
+            initargs=(current_app.config['SQLALCHEMY_DATABASE_URI'], current_app.config.get('REPORT_JOB_NICE', 0))
+        )
+    return _executor
+
+
+def clean_report_jobs():
+    """Fail stuck jobs and delete old ones with their files; returns (failed, deleted).
+
+    A queued or running job silent for REPORT_JOB_TIMEOUT lost its worker, so
+    it stops counting against REPORT_JOB_MAX_PENDING. Jobs that finished more
+    than REPORT_JOB_KEEP ago are deleted, and so is any file under
+    instance/reports that old, including the .part left by a dead worker.
+    """
+    now = datetime.utcnow()
+    stuck = ReportJob.query.filter(
+        ReportJob.status.in_(PENDING),
+        func.coalesce(ReportJob.updated_at, ReportJob.created_at) < now - current_app.config['REPORT_JOB_TIMEOUT']
+    ).update({
+        ReportJob.status: 'failed',
+        ReportJob.error: 'The report worker stopped responding.',
+        ReportJob.finished_at: now,
+        ReportJob.updated_at: now
+    }, synchronize_session=False)
+
+    cutoff = now - current_app.config['REPORT_JOB_KEEP']
+    deleted = ReportJob.query.filter(
+        ReportJob.status.notin_(PENDING), ReportJob.finished_at < cutoff
+    ).delete(synchronize_session=False)
+    db.session.commit()
+
+    directory = report_dir()
+    for entry in os.scandir(directory):
+        if entry.is_file() and datetime.utcfromtimestamp(entry.stat().st_mtime) < cutoff:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+    return stuck, deleted
+
+
+def submit_report(report_type, export_format, start_date, end_date, user_id):
+    """Queue a report build and return its ReportJob.
+
+    The job runs the REPORT_BUILDERS function for the type and format, which
+    is called as ``builder(start_date, end_date, generated_by, out, progress)``
+    and writes the file to the binary file object ``out``. Returns None when
+    REPORT_JOB_MAX_PENDING jobs are already queued or running.
+    """
+    clean_report_jobs()
+    pending = ReportJob.query.filter(ReportJob.status.in_(PENDING)).count()
+    if pending >= current_app.config.get('REPORT_JOB_MAX_PENDING', 10):
+        return None
+
+    job = ReportJob(
+        id=uuid.uuid4().hex,
+        report_type=report_type,
+        export_format=export_format,
+        start_date=start_date,
+        end_date=end_date,
+        requested_by=user_id,
+        filename=report_filename(report_type, export_format, start_date, end_date)
+    )
+    db.session.add(job)
+    db.session.commit()
+    job_id = job.id
+    directory = report_dir()
+
+    if current_app.testing or current_app.config.get('REPORT_JOBS_INLINE'):
+        run_job(job_id, directory)
+        db.session.refresh(job)
+        return job
+
+    global _executor
+    app = current_app._get_current_object()
+
+    def finished(future):
+        # A worker that died never reaches run_job's own error handling
+        error = future.exception()
+        if error is not None:
+            with app.app_context():
+                _set_job(job_id, status='failed', error=repr(error), finished_at=datetime.utcnow())
+
+    try:
+        _pool().submit(_run_in_worker, job_id, directory).add_done_callback(finished)
+    except RuntimeError as exc:
+        # A broken pool refuses new work; start a fresh one next time
+        _executor = None
+        _set_job(job_id, status='failed', error=repr(exc), finished_at=datetime.utcnow())
+    return job
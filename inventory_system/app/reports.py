@@ -0,0 +1,636 @@
+from datetime import datetime
+from sqlalchemy import func, and_
+from reportlab.lib.pagesizes import letter, landscape
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+from reportlab.pdfgen import canvas
+
+from app import db
+from app.models import Product, StockAddition, Sale, User
+from app.excel_export import ReportSheet, STATUS_STYLES, BATCH_ROWS
+from app.pdf_tables import PagedTable
+from app.stock_valuation import closing_time, stock_valuation
+
+# PDF and Excel report builders. ReportLab and openpyxl are only imported with
+# this module, which nothing loads until a report is built (see
+# app/report_jobs.py), so web workers and CLI scripts start without them.
+
+
+# Create a custom PageTemplate for footer
+class FooterPageTemplate(canvas.Canvas):
+    def __init__(self, *args, **kwargs):
+        canvas.Canvas.__init__(self, *args, **kwargs)
+        
+    def footer(self, doc):
+        # Save the state
+        self.saveState()
+        
+        # Footer
+        footer = Paragraph("© Copyright CKS Tech | Contact: +256 755261254 | Email: kephacheps55@gmail.com", 
+                          getSampleStyleSheet()['Normal'])
+        footer.wrap(doc.width, doc.bottomMargin)
+        footer.drawOn(self, doc.leftMargin, doc.bottomMargin)
+        
+        # Page number
+        self.setFont('Helvetica', 9)
+        self.setFillColor(colors.black)
+        self.drawRightString(doc.pagesize[0] - doc.rightMargin, 
+                            doc.bottomMargin, 
+                            f"Page {self.getPageNumber()}")
+        
+        # Restore the state
+        self.restoreState()
+
+# Custom DocTemplate with footer
+class DocTemplateWithFooter(SimpleDocTemplate):
+    def __init__(self, *args, **kwargs):
+        SimpleDocTemplate.__init__(self, *args, **kwargs)
+        
+    def afterPage(self):
+        # Add footer to each page
+        canvas = self.canv
+        canvas.saveState()
+        
+        # Footer line
+        canvas.setStrokeColorRGB(0.8, 0.8, 0.8)
+        canvas.setLineWidth(1)
+        canvas.line(self.leftMargin, self.bottomMargin + 0.5 * inch, 
+                   self.pagesize[0] - self.rightMargin, self.bottomMargin + 0.5 * inch)
+        
+        # Footer text
+        canvas.setFont('Helvetica', 9)
+        canvas.setFillColorRGB(0.4, 0.4, 0.4)
+        canvas.drawString(self.leftMargin, self.bottomMargin + 0.2 * inch, 
+                          "© Copyright CKS Tech | Contact: +256 755261254 | Email: kephacheps55@gmail.com")
+        
+        # Page number
+        canvas.drawRightString(self.pagesize[0] - self.rightMargin, 
+                              self.bottomMargin + 0.2 * inch, 
+                              f"Page {self.page}")
+        
+        canvas.restoreState()
+
+
+def generate_sales_report(start_date, end_date, generated_by, out, progress=lambda fraction: None):
+    # Query sales data
+    sales_data = db.session.query(
+        Sale.id,
+        Product.name.label('product_name'),
+        Product.sku,
+        Product.category,
+        Sale.quantity_sold,
+        Sale.price_per_unit,
+        Sale.total_amount,
+        Sale.timestamp,
+        User.username.label('employee')
+    ).join(Product).join(User).filter(
+        and_(Sale.timestamp >= start_date, Sale.timestamp <= end_date)
+    ).all()
+    progress(0.2)
+    
+    # Generate PDF
+    doc = DocTemplateWithFooter(
+        out, 
+        pagesize=landscape(letter),
+        leftMargin=0.75*inch,
+        rightMargin=0.75*inch,
+        topMargin=1*inch,
+        bottomMargin=1*inch
+    )
+    
+    # Container for the 'Flowable' objects
+    elements = []
+    
+    # Get styles
+    styles = getSampleStyleSheet()
+    
+    # Custom styles
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#2E4057')
+    )
+    
+    subtitle_style = ParagraphStyle(
+        'CustomSubtitle',
+        parent=styles['Heading2'],
+        fontSize=16,
+        spaceAfter=20,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#4A6572')
+    )
+    
+    # Company header
+    header_style = ParagraphStyle(
+        'Header',
+        parent=styles['Normal'],
+        fontSize=12,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#546E7A')
+    )
+    
+    # Add company header
+    elements.append(Paragraph("CKS BUSINESS MANAGEMENT SYSTEM", header_style))
+    elements.append(Spacer(1, 0.1*inch))
+    
+    # Add title
+    elements.append(Paragraph("SALES REPORT", title_style))
+    elements.append(Paragraph(f"Period: {start_date.strftime('%B %d, %Y')} to {end_date.strftime('%B %d, %Y')}", subtitle_style))
+    elements.append(Spacer(1, 0.2*inch))
+    
+    # Report generation info
+    report_info_style = ParagraphStyle(
+        'ReportInfo',
+        parent=styles['Normal'],
+        fontSize=10,
+        alignment=TA_RIGHT,
+        textColor=colors.HexColor('#546E7A')
+    )
+    
+    elements.append(Paragraph(f"Generated on: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}", report_info_style))
+    elements.append(Paragraph(f"Generated by: {generated_by}", report_info_style))
+    elements.append(Spacer(1, 0.3*inch))
+    
+    # Summary section
+    elements.append(Paragraph("REPORT SUMMARY", subtitle_style))
+    
+    # Calculate summary data from the same rows as the details below
+    total_sales = sum(sale.total_amount for sale in sales_data)
+    total_quantity = sum(sale.quantity_sold for sale in sales_data)
+    total_transactions = len(sales_data)
+    
+    # Create summary table
+    summary_data = [
+        ['Total Sales Amount', f'UGX {total_sales:,.2f}'],
+        ['Total Units Sold', f'{total_quantity:,} units'],
+        ['Number of Transactions', f'{total_transactions:,}'],
+        ['Average Transaction Value', f'UGX {total_sales/total_transactions if total_transactions > 0 else 0:,.2f}']
+    ]
+    
+    summary_table = Table(summary_data, colWidths=[3*inch, 2*inch])
+    summary_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#F5F5F5')),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#424242')),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#FAFAFA')),
+        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E0E0E0'))
+    ]))
+    
+    elements.append(summary_table)
+    elements.append(Spacer(1, 0.3*inch))
+    
+    # Sales details section
+    elements.append(Paragraph("SALES DETAILS", subtitle_style))
+    
+    if sales_data:
+        # Create sales data table
+        headers = ['ID', 'Product', 'SKU', 'Category', 'Qty', 'Price/Unit', 'Total', 'Date', 'Employee']
+        data = [headers]
+        
+        for sale in sales_data:
+            data.append([
+                str(sale.id),
+                sale.product_name,
+                sale.sku,
+                sale.category,
+                str(sale.quantity_sold),
+                f'UGX {sale.price_per_unit:,.2f}',
+                f'UGX {sale.total_amount:,.2f}',
+                sale.timestamp.strftime('%Y-%m-%d %H:%M'),
+                sale.employee
+            ])
+        
+        # Create table with alternating row colors
+        col_widths = [0.5*inch, 1.5*inch, 0.8*inch, 1*inch, 0.5*inch, 1*inch, 1*inch, 1.2*inch, 1*inch]
+        
+        # Style the table
+        row_colors = [colors.HexColor('#F5F5F5'), colors.white]
+        
+        table_style = [
+            # Header styling
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E4057')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            
+            # Data styling
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ('ALIGN', (0, 0), (0, -1), 'CENTER'),
+            ('ALIGN', (4, 0), (-1, -1), 'RIGHT'),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E0E0E0')),
+            
+            # Alternating row colors
+            *([('ROWBACKGROUNDS', (0, 1), (-1, -1), row_colors)])
+        ]
+        
+        # Laid out a page at a time, so long periods take time in proportion to their rows
+        elements.append(PagedTable(headers, data[1:], col_widths, table_style))
+    else:
+        elements.append(Paragraph("No sales data found for the selected period.", styles["Normal"]))
+    
+    # Build the PDF
+    progress(0.5)
+    doc.build(elements)
+
+def generate_stock_report(start_date, end_date, generated_by, out, progress=lambda fraction: None):
+    # Query stock additions
+    stock_data = db.session.query(
+        StockAddition.id,
+        Product.name.label('product_name'),
+        Product.sku,
+        Product.category,
+        StockAddition.quantity_added,
+        StockAddition.date_added,
+        User.username.label('added_by'),
+        StockAddition.old_cost_price,
+        StockAddition.new_cost_price,
+        StockAddition.old_selling_price,
+        StockAddition.new_selling_price,
+        StockAddition.price_change_reason
+    ).join(Product).join(User).filter(
+        and_(StockAddition.date_added >= start_date, StockAddition.date_added <= end_date)
+    ).all()
+    
+    # Stock levels at the close of the period
+    closing_stock = stock_valuation(min(closing_time(end_date), datetime.utcnow()))
+    progress(0.2)
+    
+    # Generate PDF
+    doc = DocTemplateWithFooter(
+        out, 
+        pagesize=landscape(letter),
+        leftMargin=0.75*inch,
+        rightMargin=0.75*inch,
+        topMargin=1*inch,
+        bottomMargin=1*inch
+    )
+    
+    # Container for the 'Flowable' objects
+    elements = []
+    
+    # Get styles
+    styles = getSampleStyleSheet()
+    
+    # Custom styles
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#2E4057')
+    )
+    
+    subtitle_style = ParagraphStyle(
+        'CustomSubtitle',
+        parent=styles['Heading2'],
+        fontSize=16,
+        spaceAfter=20,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#4A6572')
+    )
+    
+    # Company header
+    header_style = ParagraphStyle(
+        'Header',
+        parent=styles['Normal'],
+        fontSize=12,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#546E7A')
+    )
+    
+    # Add company header
+    elements.append(Paragraph("CKS BUSINESS MANAGEMENT SYSTEM", header_style))
+    elements.append(Spacer(1, 0.1*inch))
+    
+    # Add title
+    elements.append(Paragraph("STOCK MOVEMENT REPORT", title_style))
+    elements.append(Paragraph(f"Period: {start_date.strftime('%B %d, %Y')} to {end_date.strftime('%B %d, %Y')}", subtitle_style))
+    elements.append(Spacer(1, 0.2*inch))
+    
+    # Report generation info
+    report_info_style = ParagraphStyle(
+        'ReportInfo',
+        parent=styles['Normal'],
+        fontSize=10,
+        alignment=TA_RIGHT,
+        textColor=colors.HexColor('#546E7A')
+    )
+    
+    elements.append(Paragraph(f"Generated on: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}", report_info_style))
+    elements.append(Paragraph(f"Generated by: {generated_by}", report_info_style))
+    elements.append(Spacer(1, 0.3*inch))
+    
+    # Summary section
+    elements.append(Paragraph("REPORT SUMMARY", subtitle_style))
+    
+    # Calculate summary data
+    total_products = len(closing_stock)
+    total_stock_value = sum([quantity * unit_cost for _, quantity, unit_cost in closing_stock])
+    total_stock_units = sum([quantity for _, quantity, _ in closing_stock])
+    total_additions = len(stock_data)
+    total_added_units = sum([stock.quantity_added for stock in stock_data])
+    
+    # Create summary table
+    summary_data = [
+        ['Total Products', f'{total_products:,}'],
+        ['Total Stock Value', f'UGX {total_stock_value:,.2f}'],
+        ['Total Stock Units', f'{total_stock_units:,}'],
+        ['Total Stock Additions', f'{total_additions:,}'],
+        ['Total Units Added', f'{total_added_units:,}']
+    ]
+    
+    summary_table = Table(summary_data, colWidths=[3*inch, 2*inch])
+    summary_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#F5F5F5')),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#424242')),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#FAFAFA')),
+        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E0E0E0'))
+    ]))
+    
+    elements.append(summary_table)
+    elements.append(Spacer(1, 0.3*inch))
+    
+    # Stock additions section
+    elements.append(Paragraph("STOCK ADDITIONS", subtitle_style))
+    
+    if stock_data:
+        # Create stock additions table
+        headers = ['ID', 'Product', 'SKU', 'Category', 'Qty Added', 'Date', 'Added By', 'Price Changes']
+        data = [headers]
+        
+        for stock in stock_data:
+            price_changes = ""
+            if stock.old_cost_price != stock.new_cost_price and stock.new_cost_price is not None:
+                price_changes += f"Cost: UGX {stock.old_cost_price:.2f} → UGX {stock.new_cost_price:.2f}"
+            if stock.old_selling_price != stock.new_selling_price and stock.new_selling_price is not None:
+                if price_changes:
+                    price_changes += "<br/>"
+                price_changes += f"Sell: UGX {stock.old_selling_price:.2f} → UGX {stock.new_selling_price:.2f}"
+            
+            data.append([
+                str(stock.id),
+                stock.product_name,
+                stock.sku,
+                stock.category,
+                str(stock.quantity_added),
+                stock.date_added.strftime('%Y-%m-%d %H:%M'),
+                stock.added_by,
+                price_changes
+            ])
+        
+        # Create table with alternating row colors
+        col_widths = [0.5*inch, 1.5*inch, 0.8*inch, 1*inch, 0.8*inch, 1.2*inch, 1*inch, 1.5*inch]
+        
+        # Style the table
+        row_colors = [colors.HexColor('#F5F5F5'), colors.white]
+        
+        table_style = [
+            # Header styling
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E4057')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            
+            # Data styling
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ('ALIGN', (0, 0), (0, -1), 'CENTER'),
+            ('ALIGN', (4, 0), (4, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E0E0E0')),
+            
+            # Alternating row colors
+            *([('ROWBACKGROUNDS', (0, 1), (-1, -1), row_colors)])
+        ]
+        
+        # Laid out a page at a time, so long periods take time in proportion to their rows
+        elements.append(PagedTable(headers, data[1:], col_widths, table_style))
+        elements.append(Spacer(1, 0.3*inch))
+    
+    # Closing stock levels section
+    elements.append(Paragraph(f"CLOSING STOCK LEVELS ({end_date.strftime('%B %d, %Y')})", subtitle_style))
+    
+    # Create closing stock table
+    headers = ['Product', 'SKU', 'Category', 'Closing Stock', 'Cost Price', 'Selling Price', 'Total Value', 'Status']
+    data = [headers]
+    
+    status_colors = {}
+    for product, quantity, unit_cost in closing_stock:
+        # Determine stock status
+        if quantity == 0:
+            status = "Out of Stock"
+            status_color = colors.HexColor('#FF5252')
+        elif quantity <= product.low_stock_threshold:
+            status = "Low Stock"
+            status_color = colors.HexColor('#FFC107')
+        else:
+            status = "In Stock"
+            status_color = colors.HexColor('#4CAF50')
+        status_colors[status] = status_color
+        
+        data.append([
+            product.name,
+            product.sku,
+            product.category,
+            str(quantity),
+            f'UGX {unit_cost:,.2f}',
+            f'UGX {product.selling_price:,.2f}',
+            f'UGX {quantity * unit_cost:,.2f}',
+            status
+        ])
+    
+    # Create table with alternating row colors
+    col_widths = [1.5*inch, 0.8*inch, 1*inch, 1*inch, 0.8*inch, 0.8*inch, 1*inch, 0.8*inch]
+    
+    # Style the table
+    row_colors = [colors.HexColor('#F5F5F5'), colors.white]
+    
+    table_style = [
+        # Header styling
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E4057')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        
+        # Data styling
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 9),
+        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+        ('ALIGN', (3, 0), (-1, -1), 'RIGHT'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E0E0E0')),
+        
+        # Alternating row colors
+        *([('ROWBACKGROUNDS', (0, 1), (-1, -1), row_colors)])
+    ]
+    
+    # Conditional formatting for stock status, applied with the rest of each page's style
+    def status_style(row):
+        return [
+            ('TEXTCOLOR', 7, 7, status_colors[row[7]]),
+            ('FONTNAME', 7, 7, 'Helvetica-Bold')
+        ]
+    
+    elements.append(PagedTable(headers, data[1:], col_widths, table_style, row_style=status_style))
+    
+    # Build the PDF
+    progress(0.5)
+    doc.build(elements)
+
+def generate_sales_excel(start_date, end_date, generated_by, out, progress=lambda fraction: None):
+    # Query sales data; rows are streamed from the cursor in batches rather than loaded at once
+    in_period = and_(Sale.timestamp >= start_date, Sale.timestamp <= end_date)
+    sales_data = db.session.query(
+        Sale.id,
+        Product.name.label('product_name'),
+        Product.sku,
+        Product.category,
+        Sale.quantity_sold,
+        Sale.price_per_unit,
+        Sale.total_amount,
+        Sale.timestamp,
+        User.username.label('employee')
+    ).join(Product).join(User).filter(in_period).yield_per(BATCH_ROWS)
+    
+    # Create a write-only workbook laid out like the other reports
+    sheet = ReportSheet("Sales Report", [8, 20, 12, 15, 8, 12, 12, 18, 15])
+    sheet.header("SALES REPORT",
+                 f"Period: {start_date.strftime('%B %d, %Y')} to {end_date.strftime('%B %d, %Y')}",
+                 datetime.now().strftime('%B %d, %Y at %I:%M %p'),
+                 generated_by,
+                 info_column=7)
+    
+    # Calculate summary data in SQL over the same rows as the details, which are only streamed later
+    total_sales, total_quantity, total_transactions = db.session.query(
+        func.coalesce(func.sum(Sale.total_amount), 0),
+        func.coalesce(func.sum(Sale.quantity_sold), 0),
+        func.count(Sale.id)
+    ).select_from(Sale).join(Product).join(User).filter(in_period).one()
+    
+    # Create summary table
+    summary_data = [
+        ['Total Sales Amount', f'UGX {total_sales:,.2f}'],
+        ['Total Units Sold', f'{total_quantity:,} units'],
+        ['Number of Transactions', f'{total_transactions:,}'],
+        ['Average Transaction Value', f'UGX {total_sales/total_transactions if total_transactions > 0 else 0:,.2f}']
+    ]
+    sheet.summary(summary_data, at=7)
+    progress(0.2)
+    
+    # Add sales details section
+    headers = ['ID', 'Product', 'SKU', 'Category', 'Qty', 'Price/Unit', 'Total', 'Date', 'Employee']
+    sheet.table_header("SALES DETAILS", headers, at=13)
+    sheet.rows(
+        ((sale.id, sale.product_name, sale.sku, sale.category, sale.quantity_sold,
+          sale.price_per_unit, sale.total_amount, sale.timestamp, sale.employee) for sale in sales_data),
+        ['report_text', 'report_text', 'report_text', 'report_text', 'report_integer',
+         'report_currency', 'report_currency', 'report_date', 'report_text']
+    )
+    
+    # Save the workbook
+    progress(0.8)
+    sheet.save(out)
+
+def generate_stock_excel(start_date, end_date, generated_by, out, progress=lambda fraction: None):
+    # Query stock additions; rows are streamed from the cursor in batches rather than loaded at once
+    in_period = and_(StockAddition.date_added >= start_date, StockAddition.date_added <= end_date)
+    stock_data = db.session.query(
+        StockAddition.id,
+        Product.name.label('product_name'),
+        Product.sku,
+        Product.category,
+        StockAddition.quantity_added,
+        StockAddition.date_added,
+        User.username.label('added_by'),
+        StockAddition.old_cost_price,
+        StockAddition.new_cost_price,
+        StockAddition.old_selling_price,
+        StockAddition.new_selling_price,
+        StockAddition.price_change_reason
+    ).join(Product).join(User).filter(in_period).yield_per(BATCH_ROWS)
+    
+    # Stock levels at the close of the period
+    closing_stock = stock_valuation(min(closing_time(end_date), datetime.utcnow()))
+    
+    # Create a write-only workbook laid out like the other reports
+    sheet = ReportSheet("Stock Movement Report", [20, 12, 15, 12, 12, 12, 12, 15, 12, 12, 12, 20])
+    sheet.header("STOCK MOVEMENT REPORT",
+                 f"Period: {start_date.strftime('%B %d, %Y')} to {end_date.strftime('%B %d, %Y')}",
+                 datetime.now().strftime('%B %d, %Y at %I:%M %p'),
+                 generated_by,
+                 info_column=10)
+    
+    # Calculate summary data; the additions are counted in SQL since the rows are only streamed later
+    total_products = len(closing_stock)
+    total_stock_value = sum([quantity * unit_cost for _, quantity, unit_cost in closing_stock])
+    total_stock_units = sum([quantity for _, quantity, _ in closing_stock])
+    total_additions, total_added_units = db.session.query(
+        func.count(StockAddition.id),
+        func.coalesce(func.sum(StockAddition.quantity_added), 0)
+    ).select_from(StockAddition).join(Product).join(User).filter(in_period).one()
+    
+    # Create summary table
+    summary_data = [
+        ['Total Products', f'{total_products:,}'],
+        ['Total Stock Value', f'UGX {total_stock_value:,.2f}'],
+        ['Total Stock Units', f'{total_stock_units:,}'],
+        ['Total Stock Additions', f'{total_additions:,}'],
+        ['Total Units Added', f'{total_added_units:,}']
+    ]
+    sheet.summary(summary_data, at=7)
+    progress(0.2)
+    
+    # Add stock additions section
+    headers = ['ID', 'Product', 'SKU', 'Category', 'Qty Added', 'Date', 'Added By', 'Old Cost', 'New Cost', 'Old Sell', 'New Sell', 'Reason']
+    sheet.table_header("STOCK ADDITIONS", headers, at=14)
+    sheet.rows(
+        ((stock.id, stock.product_name, stock.sku, stock.category, stock.quantity_added, stock.date_added,
+          stock.added_by, stock.old_cost_price, stock.new_cost_price, stock.old_selling_price,
+          stock.new_selling_price, stock.price_change_reason) for stock in stock_data),
+        ['report_text', 'report_text', 'report_text', 'report_text', 'report_integer', 'report_date',
+         'report_text', 'report_currency', 'report_currency', 'report_currency', 'report_currency', 'report_text']
+    )
+    
+    # Add closing stock levels section
+    headers = ['Product', 'SKU', 'Category', 'Closing Stock', 'Cost Price', 'Selling Price', 'Total Value', 'Status']
+    sheet.table_header(f"CLOSING STOCK LEVELS ({end_date.strftime('%B %d, %Y')})", headers, at=sheet.row + 3)
+    for product, quantity, unit_cost in closing_stock:
+        # Determine stock status
+        if quantity == 0:
+            status = "Out of Stock"
+        elif quantity <= product.low_stock_threshold:
+            status = "Low Stock"
+        else:
+            status = "In Stock"
+        
+        sheet.rows(
+            [(product.name, product.sku, product.category, quantity, unit_cost,
+              product.selling_price, quantity * unit_cost, status)],
+            ['report_text', 'report_text', 'report_text', 'report_integer', 'report_currency',
+             'report_currency', 'report_currency', STATUS_STYLES[status]]
+        )
+    
+    # Save the workbook
+    progress(0.8)
+    sheet.save(out)
\ No newline at end of file
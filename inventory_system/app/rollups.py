@@ -0,0 +1,104 @@
+from datetime import datetime, date
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import DailySalesRollup, Product, Sale
+
+
+def _rollup_filter(day, product_id, employee_id):
+    return DailySalesRollup.query.filter_by(date=day, product_id=product_id, employee_id=employee_id)
+
+
+def record_sale(sale, cost_price):
+    """Fold a new sale into its (date, product, employee) rollup row.
+
+    Runs inside the caller's transaction, so the rollup and the sale commit or
+    roll back together. Totals are incremented in SQL rather than read and
+    written back, so concurrent tills do not lose updates.
+    """
+    if sale.timestamp is None:
+        sale.timestamp = datetime.utcnow()
+
+    day = sale.timestamp.date()
+    values = {
+        DailySalesRollup.sale_count: DailySalesRollup.sale_count + 1,
+        DailySalesRollup.quantity: DailySalesRollup.quantity + sale.quantity_sold,
+        DailySalesRollup.revenue: DailySalesRollup.revenue + sale.total_amount,
+        DailySalesRollup.cost: DailySalesRollup.cost + sale.quantity_sold * cost_price
+    }
+
+    if _rollup_filter(day, sale.product_id, sale.employee_id).update(values, synchronize_session=False):
+        return
+
+    # First sale of the day for this product/employee pair. Another till may
+    # insert the same key concurrently, in which case fall back to the update.
+    try:
+        with db.session.begin_nested():
+            db.session.add(DailySalesRollup(
+                date=day,
+                product_id=sale.product_id,
+                employee_id=sale.employee_id,
+                sale_count=1,
+                quantity=sale.quantity_sold,
+                revenue=sale.total_amount,
+                cost=sale.quantity_sold * cost_price
+            ))
+    except IntegrityError:
+        _rollup_filter(day, sale.product_id, sale.employee_id).update(values, synchronize_session=False)
+
+
+def rebuild_daily_rollups():
+    """Recompute every rollup row from the raw sales history.
+
+    Sales do not store the cost price in effect when they were made, so rebuilt
+    cost totals use each product's current cost price.
+    """
+    day = func.date(Sale.timestamp)
+    rows = db.session.query(
+        day.label('date'),
+        Sale.product_id,
+        Sale.employee_id,
+        func.count(Sale.id).label('sale_count'),
+        func.sum(Sale.quantity_sold).label('quantity'),
+        func.sum(Sale.total_amount).label('revenue'),
+        func.sum(Sale.quantity_sold * Product.cost_price).label('cost')
+    ).join(Product, Product.id == Sale.product_id) \
+     .group_by(day, Sale.product_id, Sale.employee_id).all()
+
+    DailySalesRollup.query.delete()
+    db.session.bulk_insert_mappings(DailySalesRollup, [{
+        'date': row.date if isinstance(row.date, date) else date.fromisoformat(row.date),
+        'product_id': row.product_id,
+        'employee_id': row.employee_id,
+        'sale_count': row.sale_count,
+        'quantity': row.quantity,
+        'revenue': row.revenue,
+        'cost': row.cost
+    } for row in rows])
+    db.session.commit()
+
+    return len(rows)
+
+
+def sales_totals(start_date=None, end_date=None, employee_id=None):
+    """Revenue, units and transaction count from the rollups.
+
+    Covers sales dated ``start_date`` up to (not including) ``end_date``; either
+    bound may be omitted. ``employee_id`` restricts the totals to one cashier.
+    """
+    query = db.session.query(
+        func.sum(DailySalesRollup.revenue),
+        func.sum(DailySalesRollup.quantity),
+        func.sum(DailySalesRollup.sale_count)
+    )
+    if start_date:
+        query = query.filter(DailySalesRollup.date >= start_date)
+    if end_date:
+        query = query.filter(DailySalesRollup.date < end_date)
+    if employee_id:
+        query = query.filter(DailySalesRollup.employee_id == employee_id)
+
+    revenue, quantity, count = query.one()
+    return revenue or 0, quantity or 0, count or 0
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from flask import current_app, request
+from sqlalchemy import or_, and_
+
+from app.loading import ledger_row
+from app.models import Sale
+
+
+def encode_cursor(sale):
+    return f"{sale.timestamp.isoformat()}_{sale.id}"
+
+
+def decode_cursor(value):
+    # Cursors look like "<timestamp>_<sale id>"; anything else starts from the top
+    timestamp, _, sale_id = (value or '').rpartition('_')
+    try:
+        return datetime.fromisoformat(timestamp), int(sale_id)
+    except ValueError:
+        return None
+
+
+def page_size_arg():
+    default = current_app.config['SALES_PAGE_SIZE']
+    per_page = request.args.get('per_page', default, type=int)
+    return max(1, min(per_page, current_app.config['SALES_MAX_PAGE_SIZE']))
+
+
+def sales_page(employee_id=None, cursor=None, page_size=50):
+    """One page of the sales ledger, newest first.
+
+    Pages are keyed on (timestamp, id) rather than offsets, so each page is an
+    index range scan no matter how deep into history it is. Returns the sales on
+    the page and the cursor of the next (older) page, or None on the last page.
+    """
+    query = Sale.query.options(*ledger_row())
+
+    if employee_id:
+        query = query.filter(Sale.employee_id == employee_id)
+
+    if cursor:
+        timestamp, sale_id = cursor
+        query = query.filter(or_(
+            Sale.timestamp < timestamp,
+            and_(Sale.timestamp == timestamp, Sale.id < sale_id)
+        ))
+
+    # Fetch one extra row to learn whether an older page exists
+    sales = query.order_by(Sale.timestamp.desc(), Sale.id.desc()).limit(page_size + 1).all()
+
+    next_cursor = encode_cursor(sales[page_size - 1]) if len(sales) > page_size else None
+    return sales[:page_size], next_cursor
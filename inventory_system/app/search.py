@@ -0,0 +1,153 @@
+import math
+import re
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from sqlalchemy import DDL, Column, Integer, MetaData, Table, and_, case, event, literal_column, or_, select, text
+
+from app import db
+from app.models import Product
+from app.catalog import cached_catalog
+
+# Full-text product search. On SQLite the product_fts FTS5 table is kept in sync
+# with product by triggers and queried with bm25 ranking; on any other database
+# (or an SQLite build without the table) an in-process inverted index is used.
+# Both match word prefixes; products whose SKU starts with the query as typed
+# are merged in after them, read off the unique SKU index.
+
+FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS product_fts USING fts5("
+    "name, sku, category, description, content='product', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS product_fts_insert AFTER INSERT ON product BEGIN "
+    "INSERT INTO product_fts(rowid, name, sku, category, description) "
+    "VALUES (new.id, new.name, new.sku, new.category, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS product_fts_delete AFTER DELETE ON product BEGIN "
+    "INSERT INTO product_fts(product_fts, rowid, name, sku, category, description) "
+    "VALUES ('delete', old.id, old.name, old.sku, old.category, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS product_fts_update AFTER UPDATE OF name, sku, category, description ON product BEGIN "
+    "INSERT INTO product_fts(product_fts, rowid, name, sku, category, description) "
+    "VALUES ('delete', old.id, old.name, old.sku, old.category, old.description); "
+    "INSERT INTO product_fts(rowid, name, sku, category, description) "
+    "VALUES (new.id, new.name, new.sku, new.category, new.description); END",
+]
+
+for statement in FTS_DDL:
+    event.listen(Product.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+
+# Column weights for name, sku, category and description
+WEIGHTS = (10.0, 10.0, 2.0, 1.0)
+
+product_fts = Table('product_fts', MetaData(), Column('rowid', Integer, primary_key=True))
+
+# A database found without the table is looked at again after this many
+# seconds, so creating it later does not need a restart
+FTS_RECHECK_SECONDS = 60
+
+# {database url: (enabled, monotonic time checked)}
+_fts_tables = {}
+
+
+def tokenize(value):
+    return re.findall(r'\w+', (value or '').lower())
+
+
+def fts_enabled():
+    url = str(db.engine.url)
+    enabled, checked = _fts_tables.get(url, (None, 0))
+    if enabled or (enabled is not None and time.monotonic() - checked < FTS_RECHECK_SECONDS):
+        return enabled
+
+    enabled = db.engine.dialect.name == 'sqlite' and db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'product_fts'")
+    ).first() is not None
+    _fts_tables[url] = (enabled, time.monotonic())
+    return enabled
+
+
+def rebuild_search_index():
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    for statement in FTS_DDL:
+        db.session.execute(text(statement))
+    db.session.execute(text("INSERT INTO product_fts(product_fts) VALUES ('rebuild')"))
+    db.session.commit()
+    _fts_tables.pop(str(db.engine.url), None)
+    return True
+
+
+class InvertedIndex:
+    """Token -> {product id: weighted term frequency}, with prefix expansion."""
+
+    def __init__(self, rows):
+        self.postings = defaultdict(lambda: defaultdict(float))
+        for row in rows:
+            for value, weight in zip((row.name, row.sku, row.category, row.description), WEIGHTS):
+                for token in tokenize(value):
+                    self.postings[token][row.id] += weight
+        self.tokens = sorted(self.postings)
+        self.size = max(len(rows), 1)
+
+    def search(self, terms):
+        scores = None
+        for term in terms:
+            matched = defaultdict(float)
+            for token in self.tokens[bisect_left(self.tokens, term):]:
+                if not token.startswith(term):
+                    break
+                postings = self.postings[token]
+                idf = math.log(1 + self.size / len(postings))
+                for product_id, weight in postings.items():
+                    matched[product_id] += weight * idf
+            # Every term has to match, as with FTS5
+            scores = matched if scores is None else {pid: scores[pid] + s for pid, s in matched.items() if pid in scores}
+        return sorted(scores, key=lambda pid: -scores[pid]) if scores else []
+
+
+def inverted_index():
+    def build():
+        return InvertedIndex(db.session.query(
+            Product.id, Product.name, Product.sku, Product.category, Product.description
+        ).all())
+    return cached_catalog('inverted_index', build)
+
+
+def sku_prefix(query):
+    # Ids of products whose SKU starts with ``query`` as typed or upper-cased,
+    # as ranges on the unique SKU index rather than a LIKE, which would scan
+    return select(Product.id).where(or_(*(
+        and_(Product.sku >= prefix, Product.sku < prefix + '\U0010ffff') for prefix in {query, query.upper()}
+    )))
+
+
+def search_products(query, base_query=None):
+    """Products matching every word of ``query``, most relevant first.
+
+    Each word matches as a prefix across name, SKU, category and description;
+    products whose SKU starts with the whole of ``query`` (say "LAPTOP-0")
+    follow the word matches. Returns a query, so callers can add their own
+    filters and options and still run a single statement.
+    """
+    base_query = base_query if base_query is not None else Product.query
+    query = (query or '').strip()
+    if not query:
+        return base_query.filter(db.false())
+
+    terms = tokenize(query)
+    if not terms:
+        return base_query.filter(Product.id.in_(sku_prefix(query)))
+
+    if fts_enabled():
+        match = ' '.join(f'"{term}"*' for term in terms)
+        matched = literal_column('product_fts').match(match)
+        rank = literal_column(f"bm25(product_fts, {', '.join(str(w) for w in WEIGHTS)})")
+        ranked = select(product_fts.c.rowid, rank.label('rank')).where(matched).subquery()
+        return base_query.filter(Product.id.in_(select(product_fts.c.rowid).where(matched).union(sku_prefix(query)))) \
+            .outerjoin(ranked, ranked.c.rowid == Product.id) \
+            .order_by(ranked.c.rank.is_(None), ranked.c.rank)
+
+    ids = inverted_index().search(terms)
+    if not ids:
+        return base_query.filter(Product.id.in_(sku_prefix(query)))
+    return base_query.filter(or_(Product.id.in_(ids), Product.id.in_(sku_prefix(query)))) \
+        .order_by(case({product_id: i for i, product_id in enumerate(ids)}, value=Product.id, else_=len(ids)))
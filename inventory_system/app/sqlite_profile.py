@@ -0,0 +1,50 @@
+from sqlalchemy import event
+
+from app import db
+
+# Connection settings for running the shop on a single SQLite file. WAL lets
+# report and dashboard reads go on while a till commits a sale, and the busy
+# timeout makes a writer wait for another writer instead of failing with
+# "database is locked". Each setting comes from Config and is skipped when None.
+
+
+def _pragmas(config):
+    pragmas = []
+    if config.get('SQLITE_SYNCHRONOUS'):
+        pragmas.append(f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}")
+    if config.get('SQLITE_BUSY_TIMEOUT_MS') is not None:
+        pragmas.append(f"PRAGMA busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT_MS'])}")
+    if config.get('SQLITE_MMAP_SIZE') is not None:
+        pragmas.append(f"PRAGMA mmap_size = {int(config['SQLITE_MMAP_SIZE'])}")
+    if config.get('SQLITE_CACHE_SIZE_KB') is not None:
+        # A negative cache_size is in KiB rather than pages
+        pragmas.append(f"PRAGMA cache_size = -{int(config['SQLITE_CACHE_SIZE_KB'])}")
+    return pragmas
+
+
+def init_sqlite_profile(app):
+    """Apply the SQLITE_* settings to every new connection of the app's SQLite engine."""
+    with app.app_context():
+        apply_sqlite_profile(db.engine, app.config)
+
+
+def apply_sqlite_profile(engine, config, read_only=False):
+    if engine.dialect.name != 'sqlite':
+        return
+
+    # A read-only connection cannot change the journal mode; it follows the file's
+    journal_mode = None if read_only else config.get('SQLITE_JOURNAL_MODE')
+    pragmas = _pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def configure(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            # The journal mode is stored in the database file; only switch it
+            # when it differs, since switching needs the file to itself
+            if journal_mode and cursor.execute('PRAGMA journal_mode').fetchone()[0].lower() != journal_mode.lower():
+                cursor.execute(f'PRAGMA journal_mode = {journal_mode}')
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
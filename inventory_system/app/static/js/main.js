@@ -66,4 +66,58 @@ document.addEventListener('DOMContentLoaded', function() {
             text.style.display = 'none';
         });
     }
-});
\ No newline at end of file
+});
+
+// Typeahead product lookup for selects marked with data-lookup-url.
+// Options are replaced with the matches as the cashier types; each option
+// carries the product details as JSON in data-product.
+function initProductLookup(select) {
+    const search = document.createElement('input');
+    search.type = 'search';
+    search.className = 'form-control mb-2';
+    search.placeholder = 'Type a SKU or product name...';
+    search.autocomplete = 'off';
+    select.parentNode.insertBefore(search, select);
+    
+    let timer = null;
+    let latest = 0;
+    
+    search.addEventListener('input', function() {
+        clearTimeout(timer);
+        timer = setTimeout(function() {
+            const query = search.value.trim();
+            if (!query) {
+                return;
+            }
+            
+            const requestId = ++latest;
+            fetch(select.dataset.lookupUrl + '?q=' + encodeURIComponent(query), {
+                headers: { 'Accept': 'application/json' }
+            })
+                .then(response => response.json())
+                .then(data => {
+                    // Ignore responses that arrive after a newer search
+                    if (requestId !== latest) {
+                        return;
+                    }
+                    select.innerHTML = '';
+                    data.products.forEach(function(product) {
+                        const option = new Option(product.label, product.id);
+                        option.dataset.product = JSON.stringify(product);
+                        select.add(option);
+                    });
+                    select.dispatchEvent(new Event('change'));
+                });
+        }, 200);
+    });
+}
+
+// Product details attached to the selected option by the typeahead lookup
+function selectedProduct(select) {
+    const option = select.selectedOptions[0];
+    return option && option.dataset.product ? JSON.parse(option.dataset.product) : null;
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('select[data-lookup-url]').forEach(initProductLookup);
+});
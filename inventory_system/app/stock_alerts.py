@@ -0,0 +1,57 @@
+from sqlalchemy import case, event
+
+from app import db
+from app.models import Product, StockAlert
+from app.inventory_stats import is_low, stock_state
+
+# The low stock set is the indexed Product.low_stock flag. It only changes when
+# a write takes a product across its own threshold, and each such crossing is
+# also appended to stock_alert, whose ids give pollers a cursor to read from.
+
+
+@event.listens_for(Product, 'before_insert')
+def _flag_new_product(mapper, connection, target):
+    # However a product is created its flag starts out right, matching the
+    # low_stock_count it adds to the dashboard counters
+    target.low_stock = is_low(stock_state(target))
+
+
+def track_low_stock(changes):
+    """Update low stock flags and log an alert for each product that crossed its threshold.
+
+    ``changes`` are ``(product_id, before, after)`` with stock_state tuples;
+    ``before`` is None for a new product. Runs inside the caller's transaction.
+    """
+    for product_id, before, after in changes:
+        low = is_low(after)
+        if (is_low(before) if before is not None else False) == low:
+            continue
+        Product.query.filter(Product.id == product_id).update({Product.low_stock: low}, synchronize_session=False)
+        db.session.add(StockAlert(product_id=product_id, low=low, quantity=after[0], threshold=after[2]))
+
+
+def low_stock_query(query=None):
+    return (query or Product.query).filter(Product.low_stock.is_(True))
+
+
+def alerts_since(cursor, limit):
+    return db.session.query(StockAlert, Product.name, Product.sku).join(Product) \
+        .filter(StockAlert.id > cursor).order_by(StockAlert.id).limit(limit).all()
+
+
+def alert_cursor():
+    return db.session.query(db.func.max(StockAlert.id)).scalar() or 0
+
+
+def reconcile_low_stock(dry_run=False):
+    """Reset flags that disagree with the stock levels; returns how many did.
+
+    Products fixed here get no alert, there is no knowing when they crossed.
+    """
+    should_be_low = case((Product.quantity_in_stock <= Product.low_stock_threshold, True), else_=False)
+    stale = Product.query.filter(Product.low_stock != should_be_low)
+    if dry_run:
+        return stale.count()
+    count = stale.update({Product.low_stock: should_be_low}, synchronize_session=False)
+    db.session.commit()
+    return count
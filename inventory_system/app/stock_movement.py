@@ -0,0 +1,64 @@
+from sqlalchemy import func, case
+
+from app import db
+from app.models import Product, InventoryMovement
+from app.loading import product_card
+from app.inventory_ledger import level_at
+
+
+def compute_stock_movement(start_date=None, end_date=None, category=None):
+    """Opening stock, additions, sales and balance for every product, from the inventory ledger.
+
+    ``start_date`` and ``end_date`` bound a half-open window ``[start_date, end_date)``.
+    The opening stock is the stock at ``start_date`` (a snapshot lookup and a
+    short replay per product), or with no start the product's opening balance.
+    Everything in the window that is not a sale counts as added: restocks,
+    adjustments and the opening stock of products created during it. So the
+    balance always equals the ledger's stock at the end of the window.
+    """
+    quantity = InventoryMovement.quantity
+    is_sale = InventoryMovement.kind == 'sale'
+    is_opening = InventoryMovement.kind == 'opening'
+
+    if start_date:
+        added = case((is_sale, 0), else_=quantity)
+    else:
+        added = case((is_sale, 0), (is_opening, 0), else_=quantity)
+    totals = db.session.query(
+        InventoryMovement.product_id.label('product_id'),
+        func.sum(case((is_opening, quantity), else_=0)).label('opening'),
+        func.sum(added).label('added'),
+        func.sum(case((is_sale, -quantity), else_=0)).label('sold')
+    )
+    if start_date:
+        totals = totals.filter(InventoryMovement.created_at >= start_date)
+    if end_date:
+        totals = totals.filter(InventoryMovement.created_at < end_date)
+    totals = totals.group_by(InventoryMovement.product_id).subquery()
+
+    opening_stock = level_at(start_date) if start_date else func.coalesce(totals.c.opening, 0)
+    total_added = func.coalesce(totals.c.added, 0)
+    total_sold = func.coalesce(totals.c.sold, 0)
+
+    query = db.session.query(
+        Product,
+        opening_stock.label('opening_stock'),
+        total_added.label('total_added'),
+        total_sold.label('total_sold')
+    ).outerjoin(totals, totals.c.product_id == Product.id) \
+     .options(*product_card())
+
+    if category:
+        query = query.filter(Product.category == category)
+
+    stock_data = []
+    for product, opening, added, sold in query.order_by(Product.id).all():
+        stock_data.append({
+            'product': product,
+            'opening_stock': int(opening),
+            'total_added': int(added),
+            'total_sold': int(sold),
+            'current_balance': int(opening) + int(added) - int(sold)
+        })
+
+    return stock_data
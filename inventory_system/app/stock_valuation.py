@@ -0,0 +1,99 @@
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import func, insert, literal, or_, select
+
+from app import db
+from app.models import DailyStockLevel, InventoryMovement, Product
+from app.loading import product_card
+
+# Stock and its value at any past moment. `flask snapshot-stock` writes every
+# product's closing quantity and cost price at the end of each day into
+# daily_stock_level; a valuation starts from the newest day closed by then
+# and adds the inventory ledger movements since, so it reads one day of
+# snapshot rows and at most a day or so of movements however old the date is.
+
+
+def closing_time(day):
+    """The moment ``day`` closes (midnight UTC at the start of the next day)."""
+    return datetime.combine(day + timedelta(days=1), time.min)
+
+
+def latest_snapshot_day(when):
+    # Newest day that had closed by ``when``
+    return db.session.query(func.max(DailyStockLevel.date)).filter(DailyStockLevel.date < when.date()).scalar()
+
+
+def stock_levels(when):
+    """Select of (product_id, quantity, unit_cost) just before ``when``, for every product that existed then.
+
+    ``unit_cost`` is the cost price in effect at that moment. Without any
+    daily snapshot before ``when`` the whole ledger up to it is summed.
+    """
+    day = latest_snapshot_day(when)
+
+    movements = select(
+        InventoryMovement.product_id,
+        func.sum(InventoryMovement.quantity).label('quantity'),
+        func.max(InventoryMovement.sequence).label('last_sequence')
+    ).where(InventoryMovement.created_at < when)
+    if day is not None:
+        movements = movements.where(InventoryMovement.created_at >= closing_time(day))
+    movements = movements.group_by(InventoryMovement.product_id).subquery()
+
+    # Cost recorded on the product's latest movement in that stretch
+    last_cost = select(InventoryMovement.unit_cost).where(
+        InventoryMovement.product_id == movements.c.product_id,
+        InventoryMovement.sequence == movements.c.last_sequence
+    ).scalar_subquery()
+
+    base = select(DailyStockLevel.product_id, DailyStockLevel.quantity, DailyStockLevel.unit_cost) \
+        .where(DailyStockLevel.date == day).subquery()
+
+    return select(
+        Product.id.label('product_id'),
+        (func.coalesce(base.c.quantity, 0) + func.coalesce(movements.c.quantity, 0)).label('quantity'),
+        func.coalesce(last_cost, base.c.unit_cost, Product.cost_price).label('unit_cost')
+    ).select_from(Product) \
+     .outerjoin(base, base.c.product_id == Product.id) \
+     .outerjoin(movements, movements.c.product_id == Product.id) \
+     .where(or_(base.c.product_id.isnot(None), movements.c.product_id.isnot(None)))
+
+
+def stock_valuation(when, category=None):
+    """(product, quantity, unit_cost) for every product just before ``when``, in product order."""
+    levels = stock_levels(when).subquery()
+    query = db.session.query(Product, levels.c.quantity, levels.c.unit_cost) \
+        .join(levels, levels.c.product_id == Product.id).options(*product_card())
+    if category:
+        query = query.filter(Product.category == category)
+    return query.order_by(Product.id).all()
+
+
+def snapshot_stock_levels(through=None):
+    """Write closing stock for each day after the last one snapshotted, up to ``through``.
+
+    ``through`` defaults to yesterday, the last day that has fully closed.
+    Each day is built from the day before plus its own movements and
+    committed on its own. Returns the number of days written.
+    """
+    through = through or datetime.utcnow().date() - timedelta(days=1)
+    last = db.session.query(func.max(DailyStockLevel.date)).scalar()
+    if last is None:
+        first = db.session.query(func.min(InventoryMovement.created_at)).scalar()
+        if first is None:
+            return 0
+        day = first.date()
+    else:
+        day = last + timedelta(days=1)
+
+    written = 0
+    while day <= through:
+        levels = stock_levels(closing_time(day)).subquery()
+        db.session.execute(insert(DailyStockLevel).from_select(
+            ['date', 'product_id', 'quantity', 'unit_cost'],
+            select(literal(day, DailyStockLevel.date.type), levels.c.product_id, levels.c.quantity, levels.c.unit_cost)
+        ))
+        db.session.commit()
+        written += 1
+        day += timedelta(days=1)
+    return written
@@ -0,0 +1,64 @@
+# Measures the cold start of create_app() with `python -X importtime` in a fresh
+# interpreter: total import time, peak memory, and the slowest top-level
+# imports. Fails if any of the report-only libraries got imported, since
+# those are meant to load on the first report build and not before.
+#
+#   python bench_import_time.py [runs] [top]
+
+import os
+import re
+import subprocess
+import sys
+
+REPORT_ONLY = ('pandas', 'reportlab', 'openpyxl', 'pyarrow')
+
+CHILD = '''
+import resource, sys, time
+began = time.perf_counter()
+from app import create_app
+create_app()
+elapsed = time.perf_counter() - began
+print(f'{elapsed:.4f} {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}')
+'''
+
+LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+
+def run_once():
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD],
+                            capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    elapsed, max_rss = result.stdout.split()[-2:]
+
+    imports = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            imports.append((name, int(cumulative_us), len(indent) // 2))
+    return float(elapsed), int(max_rss), imports
+
+
+def main(runs=5, top=15):
+    results = [run_once() for _ in range(runs)]
+    # The fastest run is the least disturbed by whatever else the machine is doing
+    elapsed, max_rss, imports = min(results, key=lambda result: result[0])
+
+    top_level = sorted((item for item in imports if item[2] == 0), key=lambda item: -item[1])
+    print(f'create_app() cold start: {elapsed * 1000:.0f} ms (best of {runs}), '
+          f'peak RSS {max_rss / 1024:.1f} MiB, {len(imports)} modules imported')
+    print('slowest top-level imports:')
+    for name, cumulative_us, _ in top_level[:top]:
+        print(f'  {cumulative_us / 1000:8.1f} ms  {name}')
+
+    loaded = sorted({name.split('.')[0] for name, _, _ in imports} & set(REPORT_ONLY))
+    if loaded:
+        print(f'FAILED: create_app() imports report-only libraries: {", ".join(loaded)}')
+        return 1
+    print('No report-only libraries imported.')
+    return 0
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:3]]
+    sys.exit(main(*args))
@@ -0,0 +1,101 @@
+# Logs cashiers in from many threads at once, as at a shift change, and reports
+# login throughput per core for a few password hashing costs. Each run also
+# times a cheap page fetched while the burst is going on, to show what the
+# tills see while the logins are being checked.
+#
+#   python bench_login.py [iterations ...]
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from config import Config
+from app import create_app, db
+from app.models import User
+from app.passwords import hash_password
+
+CASHIERS = 32
+LOGINS_PER_CASHIER = 2
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    WTF_CSRF_ENABLED = False
+    LOGIN_MAX_PENDING = CASHIERS
+
+
+def run(app, iterations):
+    app.config['PASSWORD_HASH_ITERATIONS'] = iterations
+    with app.app_context():
+        # Hash under the policy being measured, so no login stops to rehash
+        password_hash = hash_password('till')
+        User.query.filter(User.role == 'employee').update({User.password_hash: password_hash})
+        db.session.commit()
+
+    errors = []
+    page_times = []
+    done = threading.Event()
+    start = threading.Barrier(CASHIERS + 2)
+
+    def cashier(i):
+        client = app.test_client()
+        start.wait()
+        for _ in range(LOGINS_PER_CASHIER):
+            response = client.post('/auth/login', data={'username': f'cashier{i}', 'password': 'till'})
+            if response.status_code != 302:
+                errors.append(response.status_code)
+            client.get('/auth/logout')
+
+    def till():
+        client = app.test_client()
+        client.post('/auth/login', data={'username': 'till', 'password': 'till'})
+        start.wait()
+        while not done.is_set():
+            began = time.perf_counter()
+            client.get('/employee/product_lookup?q=a')
+            page_times.append(time.perf_counter() - began)
+
+    threads = [threading.Thread(target=cashier, args=(i,)) for i in range(CASHIERS)]
+    page = threading.Thread(target=till)
+    page.start()
+    for thread in threads:
+        thread.start()
+    began = time.perf_counter()
+    start.wait()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+    done.set()
+    page.join()
+
+    logins = CASHIERS * LOGINS_PER_CASHIER
+    cores = os.cpu_count() or 1
+    page_times.sort()
+    p95 = page_times[int(len(page_times) * 0.95)] * 1000 if page_times else 0
+    print(f'{iterations:8} iterations: {logins} logins in {elapsed:.2f}s, '
+          f'{logins / elapsed / cores:.1f} logins/s per core ({cores} cores), '
+          f'till page p95 {p95:.0f} ms, errors {len(errors)}')
+    return not errors
+
+
+def main(sizes):
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        till = User(username='till', email='till@example.com', role='employee')
+        till.set_password('till')
+        db.session.add(till)
+        for i in range(CASHIERS):
+            db.session.add(User(username=f'cashier{i}', email=f'cashier{i}@example.com', role='employee'))
+        db.session.commit()
+
+    print(f'LOGIN_HASH_WORKERS={app.config["LOGIN_HASH_WORKERS"]}, {CASHIERS} cashiers logging in together')
+    ok = all([run(app, iterations) for iterations in sizes])
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sizes = [int(a) for a in sys.argv[1:]] or [600000, 260000, 100000]
+    sys.exit(main(sizes))
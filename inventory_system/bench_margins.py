@@ -0,0 +1,89 @@
+# Cost of goods for a scratch database with a year of sales and price changes:
+# the first refresh costs the whole history, later ones only the sales made
+# since. Prints how long each takes and how long the margin summaries read,
+# and fails if a small refresh is not much cheaper than the first one.
+#
+#   python bench_margins.py [products] [sales]
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from random import Random
+
+from config import Config
+from app import create_app, db
+from app.models import User, Product, Sale, StockAddition, InventoryMovement
+from app.margins import margin_summary, refresh_sale_margins
+
+NEW_SALES = 200
+
+
+def setup(app, products, sales):
+    rng = Random(3)
+    start = datetime.utcnow() - timedelta(days=365)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='till', email='till@example.com', role='employee'))
+        for i in range(products):
+            db.session.add(Product(name=f'Product {i}', sku=f'BENCH{i}', cost_price=10, selling_price=15,
+                                   quantity_in_stock=sales, category=f'Category {i % 10}', date_added=start))
+        db.session.commit()
+
+        additions, movements = [], []
+        for product_id in range(1, products + 1):
+            cost = 10.0
+            for month in range(12):
+                new_cost = round(cost * rng.uniform(0.9, 1.2), 2)
+                when = start + timedelta(days=30 * month + rng.randint(0, 29))
+                additions.append(dict(product_id=product_id, quantity_added=100, date_added=when, added_by=1,
+                                      old_cost_price=cost, new_cost_price=new_cost))
+                movements.append(dict(product_id=product_id, sequence=month + 2, kind='restock', quantity=100,
+                                      unit_cost=new_cost, created_at=when))
+                cost = new_cost
+        db.session.execute(StockAddition.__table__.insert(), additions)
+        db.session.execute(InventoryMovement.__table__.insert(), movements)
+        db.session.execute(Sale.__table__.insert(), [dict(
+            product_id=rng.randint(1, products), quantity_sold=rng.randint(1, 3), price_per_unit=15.0,
+            total_amount=15.0, employee_id=1, timestamp=start + timedelta(seconds=i * 365 * 86400 // sales)
+        ) for i in range(sales)])
+        db.session.commit()
+
+
+def main(products=200, sales=100000):
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = create_app(type('BenchConfig', (Config,), {'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path}))
+    setup(app, products, sales)
+    print(f'{products} products, {sales} sales, {products * 12} price changes')
+
+    with app.app_context():
+        began = time.perf_counter()
+        refresh_sale_margins()
+        first = time.perf_counter() - began
+        print(f'first refresh:       {first * 1000:8.1f} ms ({sales / first:,.0f} sales/s)')
+
+        now = datetime.utcnow()
+        db.session.execute(Sale.__table__.insert(), [dict(
+            product_id=i % products + 1, quantity_sold=1, price_per_unit=15.0, total_amount=15.0,
+            employee_id=1, timestamp=now) for i in range(NEW_SALES)])
+        db.session.commit()
+        began = time.perf_counter()
+        refresh_sale_margins()
+        later = time.perf_counter() - began
+        print(f'refresh of {NEW_SALES} sales: {later * 1000:8.1f} ms')
+
+        for by in ('product', 'category', 'employee'):
+            began = time.perf_counter()
+            margin_summary(by, 'fifo')
+            print(f'{by + " summary:":21}{(time.perf_counter() - began) * 1000:8.1f} ms')
+
+    if later * 10 > first:
+        print('FAILED: refreshing a few new sales costs too much of a full recompute')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:3]]
+    sys.exit(main(*args))
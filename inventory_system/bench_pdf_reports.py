@@ -0,0 +1,81 @@
+# Times the PDF sales and stock reports at growing row counts. Layout cost
+# should stay the same per row however long the report gets; a per-row time
+# that climbs with the row count means page splitting has gone quadratic again.
+#
+#   python bench_pdf_reports.py [rows ...]
+
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from config import Config
+from app import create_app, db
+from app.models import User, Product, Sale, StockAddition
+from app.reports import generate_sales_report, generate_stock_report
+
+# Per-row time at the largest size may be this much above the smallest
+TOLERANCE = 1.5
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+
+def fill(model, rows, make):
+    db.session.execute(model.__table__.insert(), [make(i) for i in rows])
+    db.session.commit()
+
+
+def time_report(builder):
+    out = io.BytesIO()
+    began = time.perf_counter()
+    builder(date(2025, 1, 1), date(2027, 1, 1), 'bench', out)
+    return time.perf_counter() - began, len(out.getvalue())
+
+
+def main(sizes):
+    app = create_app(BenchConfig)
+    first_day = datetime(2026, 1, 1)
+    results = {'sales': [], 'stock': []}
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='bench', email='bench@example.com', role='admin'))
+        db.session.add(Product(name='Bench product', sku='BENCH', category='Electronics',
+                               cost_price=1, selling_price=2, quantity_in_stock=10))
+        db.session.commit()
+
+        done = 0
+        for size in sizes:
+            fill(Sale, range(done, size), lambda i: dict(
+                product_id=1, quantity_sold=1, price_per_unit=2.0, total_amount=2.0, employee_id=1,
+                timestamp=first_day + timedelta(seconds=i)))
+            fill(StockAddition, range(done, size), lambda i: dict(
+                product_id=1, quantity_added=1, added_by=1,
+                date_added=first_day + timedelta(seconds=i)))
+            done = size
+
+            for name, builder in (('sales', generate_sales_report), ('stock', generate_stock_report)):
+                elapsed, size_bytes = time_report(builder)
+                results[name].append(elapsed / size)
+                print(f'{name:5} {size:7} rows  {elapsed:6.2f}s  {elapsed / size * 1000:.3f} ms/row  '
+                      f'{size_bytes // 1024} KiB')
+
+    failed = False
+    for name, per_row in results.items():
+        growth = per_row[-1] / per_row[0]
+        print(f'{name}: per-row time x{growth:.2f} from {sizes[0]} to {sizes[-1]} rows')
+        failed = failed or growth > TOLERANCE
+    if failed:
+        print('FAILED: report time grows faster than the row count')
+        return 1
+    print('Linear.')
+    return 0
+
+
+if __name__ == '__main__':
+    sizes = sorted(int(a) for a in sys.argv[1:]) or [1000, 2000, 4000, 8000]
+    sys.exit(main(sizes))
@@ -0,0 +1,116 @@
+# Mixed read/write load against a scratch SQLite database, once with SQLite's
+# defaults and once with the production profile from config.py: tills selling
+# from several threads while report-style readers stream the sales table.
+# Prints sales and report reads per second and how many sales were refused
+# because the database stayed locked.
+#
+#   python bench_sqlite_profile.py [seconds] [tills] [readers]
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from random import Random
+
+from sqlalchemy.exc import OperationalError
+
+from config import Config
+from app import create_app, db
+from app.models import User, Product, Sale
+from app.checkout import sell_product
+
+PRODUCTS = 50
+HISTORY = 50000
+
+
+class ProfileConfig(Config):
+    SALE_RETRY_ATTEMPTS = 3
+
+
+class DefaultsConfig(ProfileConfig):
+    SQLITE_JOURNAL_MODE = None
+    SQLITE_SYNCHRONOUS = None
+    SQLITE_BUSY_TIMEOUT_MS = None
+    SQLITE_MMAP_SIZE = None
+    SQLITE_CACHE_SIZE_KB = None
+
+
+def setup(app):
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='till', email='till@example.com', role='employee'))
+        for i in range(PRODUCTS):
+            db.session.add(Product(name=f'Product {i}', sku=f'BENCH{i}', cost_price=1, selling_price=2,
+                                   quantity_in_stock=10 ** 6))
+        db.session.commit()
+        start = datetime.utcnow() - timedelta(days=365)
+        db.session.execute(Sale.__table__.insert(), [dict(
+            product_id=i % PRODUCTS + 1, quantity_sold=1, price_per_unit=2.0, total_amount=2.0, employee_id=1,
+            timestamp=start + timedelta(minutes=i)) for i in range(HISTORY)])
+        db.session.commit()
+
+
+def run(name, config_class, seconds, tills, readers):
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = create_app(type(name, (config_class,), {'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path}))
+    setup(app)
+
+    sales = []
+    refused = []
+    reads = []
+    stop = time.perf_counter() + seconds
+
+    def till(seed):
+        rng = Random(seed)
+        ok = failed = 0
+        with app.app_context():
+            while time.perf_counter() < stop:
+                try:
+                    sell_product(rng.randint(1, PRODUCTS), 1, 1)
+                    ok += 1
+                except OperationalError:
+                    failed += 1
+            db.session.remove()
+        sales.append(ok)
+        refused.append(failed)
+
+    def reader():
+        # Streams the sales table the way the report builders do
+        count = 0
+        with app.app_context():
+            while time.perf_counter() < stop:
+                total = 0
+                for row in db.session.query(Sale.total_amount).yield_per(1000):
+                    total += row.total_amount
+                db.session.rollback()
+                count += 1
+            db.session.remove()
+        reads.append(count)
+
+    threads = [threading.Thread(target=till, args=(i,)) for i in range(tills)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        journal = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+    print(f'{name:9} ({journal:6}): {sum(sales) / seconds:7.1f} sales/s  {sum(reads) / seconds:5.2f} report reads/s  '
+          f'{sum(refused)} sales refused as locked')
+    return sum(sales), sum(reads)
+
+
+def main(seconds=10, tills=4, readers=2):
+    print(f'{tills} tills and {readers} report readers for {seconds}s each, {HISTORY} sales on file')
+    before = run('defaults', DefaultsConfig, seconds, tills, readers)
+    after = run('profile', ProfileConfig, seconds, tills, readers)
+    print(f'sales x{after[0] / max(before[0], 1):.1f}, report reads x{after[1] / max(before[1], 1):.1f}')
+    return 0
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:4]]
+    sys.exit(main(*args))
@@ -0,0 +1,95 @@
+# Closing stock at past dates against a scratch database with a year of ledger
+# history: first summing the whole ledger up to each date, then from the daily
+# snapshots written by `flask snapshot-stock`. Prints milliseconds per
+# valuation and fails if the snapshots do not make it faster.
+#
+#   python bench_stock_valuation.py [products] [days] [movements per product per day]
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from random import Random
+
+from config import Config
+from app import create_app, db
+from app.models import InventoryMovement, Product
+from app.stock_valuation import closing_time, snapshot_stock_levels, stock_valuation
+
+PROBES = 20
+
+
+def setup(app, products, days, per_day):
+    rng = Random(7)
+    start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+    with app.app_context():
+        db.create_all()
+        for i in range(products):
+            db.session.add(Product(name=f'Product {i}', sku=f'BENCH{i}', cost_price=1, selling_price=2,
+                                   quantity_in_stock=1000, date_added=start))
+        db.session.commit()
+
+        sequence = {i: 1 for i in range(1, products + 1)}
+        balance = {i: 1000 for i in range(1, products + 1)}
+        for day in range(days):
+            rows = []
+            for product_id in sequence:
+                for n in range(per_day):
+                    quantity = rng.randint(5, 20) if n == 0 else -rng.randint(1, 5)
+                    sequence[product_id] += 1
+                    balance[product_id] += quantity
+                    rows.append(dict(product_id=product_id, sequence=sequence[product_id],
+                                     kind='restock' if quantity > 0 else 'sale', quantity=quantity,
+                                     unit_cost=1 + day // 30,
+                                     created_at=start + timedelta(days=day, minutes=n * 90 + product_id % 60)))
+            db.session.execute(InventoryMovement.__table__.insert(), rows)
+        for product_id in sequence:
+            Product.query.filter(Product.id == product_id).update(
+                {Product.quantity_in_stock: balance[product_id], Product.ledger_sequence: sequence[product_id]})
+        db.session.commit()
+    return start
+
+
+def time_valuations(app, dates):
+    with app.app_context():
+        began = time.perf_counter()
+        results = [[(product.id, quantity, unit_cost) for product, quantity, unit_cost in stock_valuation(when)]
+                   for when in dates]
+        elapsed = time.perf_counter() - began
+        db.session.remove()
+    return elapsed / len(dates) * 1000, results
+
+
+def main(products=100, days=365, per_day=4):
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = create_app(type('BenchConfig', (Config,), {'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path}))
+    start = setup(app, products, days, per_day)
+    print(f'{products} products, {products * days * per_day} ledger movements over {days} days')
+
+    rng = Random(11)
+    dates = [closing_time((start + timedelta(days=rng.randint(1, days - 2))).date()) for _ in range(PROBES)]
+
+    full_ms, full = time_valuations(app, dates)
+    print(f'summing the ledger: {full_ms:8.1f} ms per closing stock valuation')
+
+    with app.app_context():
+        began = time.perf_counter()
+        written = snapshot_stock_levels()
+        print(f'snapshot job: {written} days in {time.perf_counter() - began:.1f}s')
+
+    snap_ms, snapped = time_valuations(app, dates)
+    print(f'from snapshots:     {snap_ms:8.1f} ms per closing stock valuation (x{full_ms / snap_ms:.0f})')
+
+    if snapped != full:
+        print('FAILED: snapshot valuations disagree with the ledger')
+        return 1
+    if snap_ms >= full_ms:
+        print('FAILED: snapshots did not speed up valuations')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:4]]
+    sys.exit(main(*args))
@@ -0,0 +1,147 @@
+# Runs the hot admin/employee pages against a scratch SQLite database, captures
+# every SELECT they issue and checks its EXPLAIN QUERY PLAN. A plan that walks
+# the sale or stock_addition tables without an index fails the check, as does a
+# page that goes over its @query_budget.
+#
+#   python check_query_plans.py [-v]
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, date
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import Config
+from app import create_app, db
+from app.models import User, Product, StockAddition, Sale
+from app.query_budget import QueryBudgetExceeded
+
+# Tables that grow with trading volume; products and users are small enough to scan
+LARGE_TABLES = ('sale', 'stock_addition', 'inventory_movement')
+
+ROUTES = [
+    ('employee', 'GET', '/employee/dashboard'),
+    ('employee', 'GET', '/employee/sales'),
+    ('admin', 'GET', '/admin/dashboard'),
+    ('admin', 'GET', '/admin/stock_movement'),
+    ('admin', 'GET', '/admin/stock_movement?start_date=2024-01-01&end_date=2024-01-31'),
+    ('admin', 'GET', '/admin/stock_history/1'),
+    ('admin', 'GET', '/admin/sales'),
+    ('admin', 'GET', '/admin/stock_alerts'),
+    ('admin', 'GET', '/admin/stock_alerts?since=0'),
+    ('admin', 'GET', '/admin/stock_valuation'),
+    ('admin', 'GET', '/admin/stock_valuation?date=2024-01-15'),
+    ('admin', 'GET', '/admin/margins?by=category&method=fifo&start_date=2024-01-01'),
+    ('admin', 'POST', '/admin/generate_report/sales'),
+    ('admin', 'POST', '/admin/generate_report/stock'),
+    ('admin', 'GET', '/admin/export/sales?start_date=2024-01-01&end_date=2024-01-31'),
+    ('admin', 'GET', '/admin/export/stock_additions?format=csv'),
+]
+
+
+class PlanCheckConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'plans.db')
+    WTF_CSRF_ENABLED = False
+    TESTING = True
+
+
+def seed():
+    admin = User(username='admin', email='admin@example.com', role='admin')
+    admin.set_password('admin')
+    employee = User(username='employee', email='employee@example.com', role='employee')
+    employee.set_password('employee')
+    db.session.add_all([admin, employee])
+    db.session.flush()
+
+    now = datetime.utcnow()
+    for i in range(20):
+        product = Product(name=f'Product {i}', sku=f'SKU{i:04d}', cost_price=10, selling_price=15, quantity_in_stock=100)
+        db.session.add(product)
+        db.session.flush()
+        for j in range(20):
+            db.session.add(Sale(product_id=product.id, quantity_sold=1, price_per_unit=15,
+                                employee_id=employee.id, timestamp=now - timedelta(days=j)))
+            db.session.add(StockAddition(product_id=product.id, quantity_added=5, added_by=admin.id,
+                                         date_added=now - timedelta(days=j)))
+    db.session.commit()
+
+
+def bad_plan_lines(plan):
+    bad = []
+    for detail in plan:
+        words = detail.split()
+        # "SCAN sale" is a full table scan; "SCAN sale USING INDEX ..." is an ordered index walk
+        if len(words) >= 2 and words[0] == 'SCAN' and words[1] in LARGE_TABLES and 'USING' not in words:
+            bad.append(detail)
+    return bad
+
+
+def main(verbose=False):
+    app = create_app(PlanCheckConfig)
+    statements = []
+
+    with app.app_context():
+        db.create_all()
+        seed()
+
+        # Both the primary and the read engine
+        @event.listens_for(Engine, 'before_cursor_execute')
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith('SELECT'):
+                statements.append((statement, parameters))
+
+    failures = 0
+    report_dates = {'start_date': (date.today() - timedelta(days=30)).isoformat(),
+                    'end_date': date.today().isoformat()}
+
+    for role, method, url in ROUTES:
+        statements.clear()
+        with app.test_client() as client:
+            client.post('/auth/login', data={'username': role, 'password': role})
+            try:
+                if method == 'POST':
+                    response = client.post(url, data=report_dates)
+                else:
+                    response = client.get(url)
+                # Streamed exports only query as the body is read
+                response.get_data()
+                status = response.status_code
+            except QueryBudgetExceeded as exc:
+                failures += 1
+                status = 'OVER BUDGET'
+                print(f'OVER BUDGET  {exc}')
+
+        with app.app_context():
+            connection = db.engine.raw_connection()
+            try:
+                cursor = connection.cursor()
+                for statement, parameters in statements:
+                    plan = [row[-1] for row in cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)]
+                    bad = bad_plan_lines(plan)
+                    if bad:
+                        failures += 1
+                        print(f'FULL SCAN  {method} {url}')
+                        print('    ' + ' '.join(statement.split()))
+                        for line in bad:
+                            print('    -> ' + line)
+                    elif verbose:
+                        print(f'ok         {method} {url}')
+                        print('    ' + ' '.join(statement.split()))
+                        for line in plan:
+                            print('    -> ' + line)
+            finally:
+                connection.close()
+
+        print(f'{status}  {method} {url}  ({len(statements)} queries)')
+
+    if failures:
+        print(f'\n{failures} problems: full scans of a large table or pages over their query budget.')
+        return 1
+    print('\nAll sale, stock_addition and inventory_movement lookups use an index and every page is within budget.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(verbose='-v' in sys.argv))
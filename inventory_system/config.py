@@ -9,4 +9,112 @@ class Config:
     
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or f'sqlite:///{os.path.join(instance_path, "inventory.db")}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    PERMANENT_SESSION_LIFETIME = timedelta(hours=2)
\ No newline at end of file
+    PERMANENT_SESSION_LIFETIME = timedelta(hours=2)
+    
+    # Settings applied to every new SQLite connection (app/sqlite_profile.py); None
+    # leaves SQLite's own default. WAL keeps report reads from blocking sale commits.
+    SQLITE_JOURNAL_MODE = 'WAL'
+    SQLITE_SYNCHRONOUS = 'NORMAL'
+    SQLITE_BUSY_TIMEOUT_MS = 5000
+    SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KB = 64 * 1024
+    
+    # Read-only admin and employee pages query a separate read engine: this URL, or when
+    # unset a read-only connection to the same SQLite file. False keeps everything on one engine.
+    DB_READ_REPLICA = os.environ.get('DB_READ_REPLICA', '1') == '1'
+    SQLALCHEMY_REPLICA_URI = os.environ.get('REPLICA_DATABASE_URL')
+    
+    # Connection pool; subclasses below size it for where the app runs
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_pre_ping': False,
+    }
+    
+    # Sales ledger pagination
+    SALES_PAGE_SIZE = int(os.environ.get('SALES_PAGE_SIZE', 50))
+    SALES_MAX_PAGE_SIZE = 500
+    
+    # Per-request SQL statement budget, checked in debug and testing mode
+    QUERY_BUDGET_DEFAULT = 20
+    
+    # Retries when a sale commit finds the SQLite database busy
+    SALE_RETRY_ATTEMPTS = 5
+    SALE_RETRY_BACKOFF = 0.05
+    BASKET_MAX_LINES = 200
+    
+    # Background report builds: worker processes per web worker, how many jobs may
+    # be queued or running at once, and how far the workers are niced below sales.
+    # Under TESTING (or with REPORT_JOBS_INLINE) jobs run inside the request.
+    REPORT_JOB_WORKERS = int(os.environ.get('REPORT_JOB_WORKERS', 2))
+    REPORT_JOB_MAX_PENDING = 10
+    REPORT_JOB_NICE = 10
+    REPORT_JOBS_INLINE = False
+    
+    # A queued or running job that has not reported progress for this long is
+    # marked failed, and finished jobs are deleted with their files after a week
+    REPORT_JOB_TIMEOUT = timedelta(minutes=30)
+    REPORT_JOB_KEEP = timedelta(days=7)
+    
+    # Generated reports kept under instance/report_cache, least recently used evicted first
+    REPORT_CACHE_MAX_BYTES = int(os.environ.get('REPORT_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+    
+    # Rows per query when streaming raw CSV/Parquet exports
+    EXPORT_CHUNK_ROWS = 5000
+    
+    # Logged-in users' id, username and role cached per worker for this many seconds
+    # (at most IDENTITY_CACHE_SIZE of them); IDENTITY_CACHE_STRICT=1 loads the user
+    # from the database on every request instead
+    IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL', 30))
+    IDENTITY_CACHE_SIZE = 1024
+    IDENTITY_CACHE_STRICT = os.environ.get('IDENTITY_CACHE_STRICT') == '1'
+    
+    # Password hashing policy; older hashes are upgraded when their user next logs in.
+    # PASSWORD_HASH_ITERATIONS applies to pbkdf2, scrypt takes its cost in the method
+    # (e.g. scrypt:32768:8:1)
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+    PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 600000))
+    
+    # Threads per worker that check login passwords, and how many logins may wait for
+    # one before the rest are asked to retry
+    LOGIN_HASH_WORKERS = int(os.environ.get('LOGIN_HASH_WORKERS', 2))
+    LOGIN_MAX_PENDING = 20
+    
+    # Most sales a margins page view costs before answering; a bigger backlog is
+    # left to `flask refresh-margins` and reported as uncosted
+    MARGIN_REFRESH_MAX_SALES = 5000
+    
+    # Inventory ledger: a product's running balance is snapshotted every this many
+    # of its movements, so stock at a past date replays at most that many rows
+    INVENTORY_SNAPSHOT_EVERY = 100
+
+class DevelopmentConfig(Config):
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 2,
+        'max_overflow': 2,
+        'pool_pre_ping': False,
+    }
+
+class ProductionConfig(Config):
+    # One connection per web thread plus the report and login pools; pre-ping
+    # drops connections a server-side database closed while they sat idle
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 5)),
+        'pool_timeout': 10,
+        'pool_recycle': 3600,
+        'pool_pre_ping': True,
+    }
+
+# Chosen by the APP_CONFIG environment variable (development or production);
+# the plain Config when it is unset
+CONFIGS = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+}
+
+def config_from_env():
+    name = os.environ.get('APP_CONFIG', '').strip().lower()
+    if not name:
+        return Config
+    if name not in CONFIGS:
+        raise ValueError(f"Unknown APP_CONFIG {name!r}; use one of {', '.join(CONFIGS)}")
+    return CONFIGS[name]
@@ -0,0 +1,49 @@
+"""Add daily sales rollup table
+
+Revision ID: 5c1f7e2b9a43
+Revises: 2a99e98fdd50
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1f7e2b9a43'
+down_revision = '2a99e98fdd50'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_sales_rollup',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('sale_count', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('cost', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['employee_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('date', 'product_id', 'employee_id', name='uq_daily_sales_rollup_key')
+    )
+
+    # Backfill from existing sales; cost uses the product's current cost price.
+    # Undated sales count on the day their product was added.
+    op.execute("""
+        INSERT INTO daily_sales_rollup (date, product_id, employee_id, sale_count, quantity, revenue, cost)
+        SELECT date(COALESCE(sale.timestamp, product.date_added, CURRENT_TIMESTAMP)) AS day,
+               sale.product_id, sale.employee_id,
+               count(sale.id), sum(sale.quantity_sold), sum(sale.total_amount),
+               sum(sale.quantity_sold * product.cost_price)
+        FROM sale JOIN product ON product.id = sale.product_id
+        GROUP BY day, sale.product_id, sale.employee_id
+    """)
+
+
+def downgrade():
+    op.drop_table('daily_sales_rollup')
@@ -0,0 +1,42 @@
+"""Add inventory stats counters
+
+Revision ID: 7a2d5e9c1b38
+Revises: 3f8c2a6d9b14
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a2d5e9c1b38'
+down_revision = '3f8c2a6d9b14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('inventory_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('stock_value', sa.Float(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('product_count', sa.Integer(), nullable=False),
+    sa.Column('low_stock_count', sa.Integer(), nullable=False),
+    sa.Column('sale_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Seed the counters from the existing data
+    op.execute("""
+        INSERT INTO inventory_stats (id, stock_value, revenue, product_count, low_stock_count, sale_count)
+        SELECT 1,
+               (SELECT COALESCE(SUM(quantity_in_stock * cost_price), 0) FROM product),
+               (SELECT COALESCE(SUM(total_amount), 0) FROM sale),
+               (SELECT COUNT(*) FROM product),
+               (SELECT COUNT(*) FROM product WHERE quantity_in_stock <= low_stock_threshold),
+               (SELECT COUNT(*) FROM sale)
+    """)
+
+
+def downgrade():
+    op.drop_table('inventory_stats')
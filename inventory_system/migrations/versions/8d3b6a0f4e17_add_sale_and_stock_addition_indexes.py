@@ -0,0 +1,38 @@
+"""Add indexes for sale and stock addition access paths
+
+Revision ID: 8d3b6a0f4e17
+Revises: 5c1f7e2b9a43
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d3b6a0f4e17'
+down_revision = '5c1f7e2b9a43'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('sale', schema=None) as batch_op:
+        batch_op.create_index('ix_sale_employee_timestamp', ['employee_id', 'timestamp'], unique=False)
+        batch_op.create_index('ix_sale_product_timestamp', ['product_id', 'timestamp'], unique=False)
+        batch_op.create_index('ix_sale_timestamp', ['timestamp'], unique=False)
+
+    with op.batch_alter_table('stock_addition', schema=None) as batch_op:
+        batch_op.create_index('ix_stock_addition_product_date', ['product_id', 'date_added'], unique=False)
+        batch_op.create_index('ix_stock_addition_date_added', ['date_added'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('stock_addition', schema=None) as batch_op:
+        batch_op.drop_index('ix_stock_addition_date_added')
+        batch_op.drop_index('ix_stock_addition_product_date')
+
+    with op.batch_alter_table('sale', schema=None) as batch_op:
+        batch_op.drop_index('ix_sale_timestamp')
+        batch_op.drop_index('ix_sale_product_timestamp')
+        batch_op.drop_index('ix_sale_employee_timestamp')
@@ -0,0 +1,120 @@
+"""Add inventory movement ledger and stock snapshots
+
+Revision ID: 9b6d4f1e2a57
+Revises: c5e8a1d4f273
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b6d4f1e2a57'
+down_revision = 'c5e8a1d4f273'
+branch_labels = None
+depends_on = None
+
+# Matches the INVENTORY_SNAPSHOT_EVERY default; any spacing is correct, this only sets replay length
+SNAPSHOT_EVERY = 100
+
+# The existing history as ledger rows. Each product opens, when it was added,
+# with whatever stock its current level implies before every recorded restock
+# and sale. Sales carry the cost price of the latest restock before them.
+HISTORY = """
+SELECT p.id AS product_id, 'opening' AS kind, 0 AS ordering, p.id AS ref,
+       COALESCE(p.quantity_in_stock, 0)
+         - COALESCE((SELECT SUM(a.quantity_added) FROM stock_addition a WHERE a.product_id = p.id), 0)
+         + COALESCE((SELECT SUM(s.quantity_sold) FROM sale s WHERE s.product_id = p.id), 0) AS quantity,
+       COALESCE((SELECT a.old_cost_price FROM stock_addition a WHERE a.product_id = p.id
+                 ORDER BY a.date_added, a.id LIMIT 1), p.cost_price) AS unit_cost,
+       NULL AS sale_id, NULL AS stock_addition_id,
+       COALESCE(p.date_added, CURRENT_TIMESTAMP) AS created_at
+FROM product p
+UNION ALL
+SELECT a.product_id, 'restock', 1, a.id, a.quantity_added,
+       COALESCE(a.new_cost_price, a.old_cost_price, p.cost_price),
+       NULL, a.id,
+       COALESCE(a.date_added, p.date_added, CURRENT_TIMESTAMP)
+FROM stock_addition a JOIN product p ON p.id = a.product_id
+UNION ALL
+SELECT s.product_id, 'sale', 2, s.id, -s.quantity_sold,
+       COALESCE((SELECT COALESCE(a.new_cost_price, a.old_cost_price) FROM stock_addition a
+                 WHERE a.product_id = s.product_id AND a.date_added <= s.timestamp
+                 ORDER BY a.date_added DESC, a.id DESC LIMIT 1),
+                (SELECT a.old_cost_price FROM stock_addition a WHERE a.product_id = s.product_id
+                 ORDER BY a.date_added, a.id LIMIT 1),
+                p.cost_price),
+       s.id, NULL,
+       COALESCE(s.timestamp, p.date_added, CURRENT_TIMESTAMP)
+FROM sale s JOIN product p ON p.id = s.product_id
+"""
+
+
+def upgrade():
+    # Plain ADD COLUMN rather than a batch rebuild, which would drop the
+    # full-text index triggers on product
+    op.add_column('product', sa.Column('ledger_sequence', sa.Integer(), server_default='0', nullable=False))
+
+    op.create_table('inventory_movement',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('sequence', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('unit_cost', sa.Float(), nullable=True),
+    sa.Column('sale_id', sa.Integer(), nullable=True),
+    sa.Column('stock_addition_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.ForeignKeyConstraint(['sale_id'], ['sale.id'], ),
+    sa.ForeignKeyConstraint(['stock_addition_id'], ['stock_addition.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('product_id', 'sequence', name='uq_inventory_movement_sequence')
+    )
+    op.create_index('ix_inventory_movement_created_at', 'inventory_movement', ['created_at'], unique=False)
+    op.create_index('ix_inventory_movement_product_totals', 'inventory_movement',
+                    ['product_id', 'kind', 'created_at', 'quantity'], unique=False)
+
+    op.create_table('stock_snapshot',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('sequence', sa.Integer(), nullable=False),
+    sa.Column('balance', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('product_id', 'sequence', name='uq_stock_snapshot_sequence')
+    )
+    op.create_index('ix_stock_snapshot_product_created_at', 'stock_snapshot', ['product_id', 'created_at'], unique=False)
+
+    op.execute(f"""
+        INSERT INTO inventory_movement
+            (product_id, sequence, kind, quantity, unit_cost, sale_id, stock_addition_id, created_at)
+        SELECT product_id,
+               ROW_NUMBER() OVER (PARTITION BY product_id ORDER BY created_at, ordering, ref),
+               kind, quantity, unit_cost, sale_id, stock_addition_id, created_at
+        FROM ({HISTORY}) AS history
+    """)
+    op.execute(f"""
+        INSERT INTO stock_snapshot (product_id, sequence, balance, created_at)
+        SELECT product_id, sequence, balance, created_at FROM (
+            SELECT product_id, sequence, created_at,
+                   SUM(quantity) OVER (PARTITION BY product_id ORDER BY sequence) AS balance
+            FROM inventory_movement
+        ) AS running
+        WHERE sequence % {SNAPSHOT_EVERY} = 0
+    """)
+    op.execute("""
+        UPDATE product SET ledger_sequence = COALESCE(
+            (SELECT MAX(m.sequence) FROM inventory_movement m WHERE m.product_id = product.id), 0)
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_stock_snapshot_product_created_at', table_name='stock_snapshot')
+    op.drop_table('stock_snapshot')
+    op.drop_index('ix_inventory_movement_product_totals', table_name='inventory_movement')
+    op.drop_index('ix_inventory_movement_created_at', table_name='inventory_movement')
+    op.drop_table('inventory_movement')
+    op.drop_column('product', 'ledger_sequence')
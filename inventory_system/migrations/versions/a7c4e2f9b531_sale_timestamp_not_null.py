@@ -0,0 +1,34 @@
+"""Make sale timestamps required
+
+Revision ID: a7c4e2f9b531
+Revises: f1c3b8e5d726
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c4e2f9b531'
+down_revision = 'f1c3b8e5d726'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The sales ledger pages on (timestamp, id), which has no place for a
+    # sale without a time. Undated sales take the time the inventory ledger
+    # already gave them when it was built from the history.
+    op.execute("""
+        UPDATE sale SET timestamp = COALESCE(
+            (SELECT m.created_at FROM inventory_movement m WHERE m.sale_id = sale.id), CURRENT_TIMESTAMP)
+        WHERE timestamp IS NULL
+    """)
+    with op.batch_alter_table('sale', schema=None) as batch_op:
+        batch_op.alter_column('timestamp', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('sale', schema=None) as batch_op:
+        batch_op.alter_column('timestamp', existing_type=sa.DateTime(), nullable=True)
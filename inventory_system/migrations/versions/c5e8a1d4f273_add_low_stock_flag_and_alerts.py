@@ -0,0 +1,41 @@
+"""Add product low stock flag and stock alert feed
+
+Revision ID: c5e8a1d4f273
+Revises: 7a2d5e9c1b38
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e8a1d4f273'
+down_revision = '7a2d5e9c1b38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Plain ADD COLUMN rather than a batch rebuild, which would drop the
+    # full-text index triggers on product
+    op.add_column('product', sa.Column('low_stock', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.execute('UPDATE product SET low_stock = 1 WHERE quantity_in_stock <= low_stock_threshold')
+    op.create_index(op.f('ix_product_low_stock'), 'product', ['low_stock'], unique=False)
+
+    op.create_table('stock_alert',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('low', sa.Boolean(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('threshold', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('stock_alert')
+    op.drop_index(op.f('ix_product_low_stock'), table_name='product')
+    op.drop_column('product', 'low_stock')
@@ -0,0 +1,26 @@
+"""Track when report jobs last changed
+
+Revision ID: c8e2d5a1f934
+Revises: a7c4e2f9b531
+Create Date: 2026-10-18 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8e2d5a1f934'
+down_revision = 'a7c4e2f9b531'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing jobs fall back to created_at in the stuck job check
+    op.add_column('report_job', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('report_job', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,34 @@
+"""Add daily closing stock snapshots
+
+Revision ID: d2f7a9c4e618
+Revises: 9b6d4f1e2a57
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f7a9c4e618'
+down_revision = '9b6d4f1e2a57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Left empty here; `flask snapshot-stock` fills in every day since the first ledger movement
+    op.create_table('daily_stock_level',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('unit_cost', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('date', 'product_id', name='uq_daily_stock_level_key')
+    )
+
+
+def downgrade():
+    op.drop_table('daily_stock_level')
@@ -0,0 +1,51 @@
+"""Add product full-text search index
+
+Revision ID: e6a1f3c8d920
+Revises: b4e9c2d71a05
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6a1f3c8d920'
+down_revision = 'b4e9c2d71a05'
+branch_labels = None
+depends_on = None
+
+# The full-text index as of this revision; app.search.FTS_DDL may move on
+FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS product_fts USING fts5("
+    "name, sku, category, description, content='product', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS product_fts_insert AFTER INSERT ON product BEGIN "
+    "INSERT INTO product_fts(rowid, name, sku, category, description) "
+    "VALUES (new.id, new.name, new.sku, new.category, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS product_fts_delete AFTER DELETE ON product BEGIN "
+    "INSERT INTO product_fts(product_fts, rowid, name, sku, category, description) "
+    "VALUES ('delete', old.id, old.name, old.sku, old.category, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS product_fts_update AFTER UPDATE OF name, sku, category, description ON product BEGIN "
+    "INSERT INTO product_fts(product_fts, rowid, name, sku, category, description) "
+    "VALUES ('delete', old.id, old.name, old.sku, old.category, old.description); "
+    "INSERT INTO product_fts(rowid, name, sku, category, description) "
+    "VALUES (new.id, new.name, new.sku, new.category, new.description); END",
+]
+
+
+def upgrade():
+    # FTS5 is SQLite-only; other databases use the in-process search index
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for statement in FTS_DDL:
+        op.execute(statement)
+    op.execute("INSERT INTO product_fts(product_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute('DROP TRIGGER IF EXISTS product_fts_update')
+    op.execute('DROP TRIGGER IF EXISTS product_fts_delete')
+    op.execute('DROP TRIGGER IF EXISTS product_fts_insert')
+    op.execute('DROP TABLE IF EXISTS product_fts')
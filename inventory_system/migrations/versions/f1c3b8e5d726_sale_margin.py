@@ -0,0 +1,40 @@
+"""Add per-sale cost of goods table
+
+Revision ID: f1c3b8e5d726
+Revises: d2f7a9c4e618
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c3b8e5d726'
+down_revision = 'd2f7a9c4e618'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled in by `flask refresh-margins` or the first visit to the margins page
+    op.create_table('sale_margin',
+    sa.Column('sale_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('cost', sa.Float(), nullable=False),
+    sa.Column('fifo_cost', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['employee_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.ForeignKeyConstraint(['sale_id'], ['sale.id'], ),
+    sa.PrimaryKeyConstraint('sale_id')
+    )
+    op.create_index('ix_sale_margin_date', 'sale_margin', ['date'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_sale_margin_date', table_name='sale_margin')
+    op.drop_table('sale_margin')
@@ -2,6 +2,7 @@ from app import create_app, db
 from app.models import User, Product, StockAddition, Sale
 import os
 
+# APP_CONFIG=production (or development) picks the matching class from config.py
 app = create_app()
 
 with app.app_context():
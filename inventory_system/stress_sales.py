@@ -0,0 +1,99 @@
+# Hammers the sale path from many threads at once, as if every till in the shop
+# were selling the same few products, and checks that stock never goes negative
+# and every unit sold is accounted for exactly once.
+#
+#   python stress_sales.py [threads] [attempts_per_thread]
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from random import Random
+
+from config import Config
+from app import create_app, db
+from app.models import User, Product, Sale
+from app.checkout import sell_product, InsufficientStock
+from app.inventory_ledger import ledger_drift
+
+PRODUCTS = 5
+UNITS_PER_PRODUCT = 200
+
+
+class StressConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'stress.db')
+    SALE_RETRY_ATTEMPTS = 10
+
+
+def main(threads=16, attempts=250):
+    app = create_app(StressConfig)
+
+    with app.app_context():
+        db.create_all()
+        cashier = User(username='cashier', email='cashier@example.com', role='employee')
+        db.session.add(cashier)
+        for i in range(PRODUCTS):
+            db.session.add(Product(name=f'Product {i}', sku=f'STRESS{i}', cost_price=1, selling_price=2,
+                                   quantity_in_stock=UNITS_PER_PRODUCT))
+        db.session.commit()
+        cashier_id = cashier.id
+        product_ids = [p.id for p in Product.query.all()]
+
+    sold = []
+    rejected = []
+    errors = []
+    start = threading.Barrier(threads)
+
+    def till(seed):
+        rng = Random(seed)
+        ok = refused = 0
+        with app.app_context():
+            start.wait()
+            for _ in range(attempts):
+                try:
+                    sell_product(rng.choice(product_ids), rng.randint(1, 3), cashier_id)
+                    ok += 1
+                except InsufficientStock:
+                    refused += 1
+                except Exception as exc:
+                    errors.append(repr(exc))
+            db.session.remove()
+        sold.append(ok)
+        rejected.append(refused)
+
+    workers = [threading.Thread(target=till, args=(i,)) for i in range(threads)]
+    began = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - began
+
+    with app.app_context():
+        negative = Product.query.filter(Product.quantity_in_stock < 0).count()
+        remaining = db.session.query(db.func.sum(Product.quantity_in_stock)).scalar()
+        units_sold = db.session.query(db.func.sum(Sale.quantity_sold)).scalar() or 0
+        sale_rows = Sale.query.count()
+        drift = ledger_drift()
+
+    total_attempts = threads * attempts
+    print(f'{total_attempts} sale attempts from {threads} threads in {elapsed:.2f}s '
+          f'({total_attempts / elapsed:.0f} attempts/s)')
+    print(f'accepted: {sum(sold)}  refused for stock: {sum(rejected)}  errors: {len(errors)}')
+    print(f'units sold: {units_sold}  units left: {remaining}  products below zero: {negative}')
+    print(f'products whose stock disagrees with the inventory ledger: {len(drift)}')
+
+    oversold = units_sold + remaining != PRODUCTS * UNITS_PER_PRODUCT
+    if negative or oversold or drift or errors or sale_rows != sum(sold):
+        for error in errors[:5]:
+            print('  ' + error)
+        print('FAILED')
+        return 1
+    print('No oversells.')
+    return 0
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:3]]
+    sys.exit(main(*args))
@@ -0,0 +1,47 @@
+import pytest
+
+from config import Config
+from app import create_app, db
+from app.models import Product, User
+
+
+@pytest.fixture
+def app(tmp_path):
+    # A fresh SQLite file per test, with TESTING on so over-budget pages raise
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        TESTING = True
+        WTF_CSRF_ENABLED = False
+        PASSWORD_HASH_ITERATIONS = 1000
+        IDENTITY_CACHE_STRICT = True
+
+    app = create_app(TestConfig)
+    app.instance_path = str(tmp_path)
+    with app.app_context():
+        db.create_all()
+        admin = User(username='admin', email='admin@example.com', role='admin')
+        employee = User(username='till', email='till@example.com', role='employee')
+        admin.set_password('pw')
+        employee.set_password('pw')
+        db.session.add_all([admin, employee])
+        for i in range(1, 6):
+            db.session.add(Product(name=f'Product {i}', sku=f'SKU{i:03d}', cost_price=10.0, selling_price=15.0,
+                                   quantity_in_stock=20, category='General', low_stock_threshold=5))
+        db.session.commit()
+
+    yield app
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def login(client, username):
+    response = client.post('/auth/login', data={'username': username, 'password': 'pw'})
+    assert response.status_code == 302
+    return client
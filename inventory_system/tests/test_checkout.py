@@ -0,0 +1,88 @@
+import threading
+
+import pytest
+
+from app import db
+from app.checkout import InsufficientStock, checkout_basket, sell_product
+from app.inventory_ledger import ledger_drift, reconcile_ledger
+from app.inventory_stats import compute_stats, inventory_stats, reconcile_stats
+from app.models import InventoryMovement, Product, Sale
+
+
+def test_sale_decrements_stock_and_writes_the_ledger(app):
+    with app.app_context():
+        sale = sell_product(1, 3, employee_id=2)
+        assert db.session.get(Product, 1).quantity_in_stock == 17
+        assert sale.total_amount == 45.0
+        movement = InventoryMovement.query.filter_by(sale_id=sale.id).one()
+        assert (movement.kind, movement.quantity) == ('sale', -3)
+        assert ledger_drift() == {}
+
+
+def test_sale_beyond_stock_is_refused_and_changes_nothing(app):
+    with app.app_context():
+        with pytest.raises(InsufficientStock):
+            sell_product(1, 21, employee_id=2)
+        db.session.rollback()
+        assert db.session.get(Product, 1).quantity_in_stock == 20
+        assert Sale.query.count() == 0
+        assert InventoryMovement.query.filter_by(kind='sale').count() == 0
+
+
+def test_basket_is_sold_whole_or_not_at_all(app):
+    with app.app_context():
+        with pytest.raises(InsufficientStock) as refused:
+            checkout_basket([(1, 5), (2, 25)], employee_id=2)
+        assert refused.value.args[0] == [{'product_id': 2, 'requested': 25, 'available': 20}]
+        db.session.rollback()
+        assert Sale.query.count() == 0
+        assert db.session.get(Product, 1).quantity_in_stock == 20
+
+        receipt = checkout_basket([(1, 5), (2, 4), (1, 1)], employee_id=2)
+        assert receipt['total_quantity'] == 10
+        assert receipt['total_amount'] == 150.0
+        assert db.session.get(Product, 1).quantity_in_stock == 14
+        assert db.session.get(Product, 2).quantity_in_stock == 16
+
+
+def test_basket_records_the_price_in_effect_when_it_is_sold(app):
+    with app.app_context():
+        Product.query.filter_by(id=3).update({Product.selling_price: 18.0, Product.cost_price: 12.0})
+        db.session.commit()
+        receipt = checkout_basket([(3, 2)], employee_id=2)
+        sale = db.session.get(Sale, receipt['sale_ids'][0])
+        assert sale.price_per_unit == 18.0
+        assert InventoryMovement.query.filter_by(sale_id=sale.id).one().unit_cost == 12.0
+
+
+def test_concurrent_tills_never_oversell(app):
+    with app.app_context():
+        Product.query.filter_by(id=4).update({Product.quantity_in_stock: 5})
+        db.session.commit()
+        # The out-of-band edit above is adopted so the ledger starts level
+        reconcile_ledger(adopt_cache=True)
+        reconcile_stats()
+
+    sold, refused = [], []
+
+    def till():
+        with app.app_context():
+            for _ in range(3):
+                try:
+                    sold.append(sell_product(4, 1, employee_id=2).id)
+                except InsufficientStock:
+                    db.session.rollback()
+                    refused.append(1)
+
+    threads = [threading.Thread(target=till) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(sold) == 5 and len(refused) == 13
+    with app.app_context():
+        assert db.session.get(Product, 4).quantity_in_stock == 0
+        assert ledger_drift() == {}
+        stats = inventory_stats()
+        assert stats.sale_count == compute_stats()['sale_count'] == 5
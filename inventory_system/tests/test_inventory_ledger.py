@@ -0,0 +1,54 @@
+from app import db
+from app.checkout import sell_product
+from app.inventory_ledger import ledger_drift, reconcile_ledger
+from app.models import InventoryMovement, Product
+from app.stock_alerts import reconcile_low_stock
+
+
+def _edit_behind_the_apps_back(product_id, quantity):
+    Product.query.filter_by(id=product_id).update({Product.quantity_in_stock: quantity})
+    db.session.commit()
+
+
+def test_every_product_opens_the_ledger_with_its_stock(app):
+    with app.app_context():
+        openings = InventoryMovement.query.filter_by(kind='opening').all()
+        assert sorted((m.product_id, m.quantity) for m in openings) == [(i, 20) for i in range(1, 6)]
+        assert ledger_drift() == {}
+
+
+def test_dry_run_reports_drift_and_changes_nothing(app):
+    with app.app_context():
+        sell_product(1, 2, employee_id=2)
+        _edit_behind_the_apps_back(1, 30)
+        assert reconcile_ledger(dry_run=True) == {1: (30, 18)}
+        assert db.session.get(Product, 1).quantity_in_stock == 30
+
+
+def test_reconcile_resets_the_cache_to_the_ledger(app):
+    with app.app_context():
+        _edit_behind_the_apps_back(2, 7)
+        assert reconcile_ledger() == {2: (7, 20)}
+        db.session.expire_all()
+        assert db.session.get(Product, 2).quantity_in_stock == 20
+        assert ledger_drift() == {}
+
+
+def test_adopting_the_cache_records_an_adjustment(app):
+    with app.app_context():
+        _edit_behind_the_apps_back(3, 26)
+        assert reconcile_ledger(adopt_cache=True) == {3: (26, 20)}
+        db.session.expire_all()
+        assert db.session.get(Product, 3).quantity_in_stock == 26
+        adjustment = InventoryMovement.query.filter_by(product_id=3, kind='adjustment').one()
+        assert adjustment.quantity == 6
+        assert ledger_drift() == {}
+
+
+def test_new_products_start_with_the_right_low_stock_flag(app):
+    with app.app_context():
+        db.session.add(Product(name='Scarce', sku='SCARCE', cost_price=1, selling_price=2,
+                               quantity_in_stock=2, low_stock_threshold=5))
+        db.session.commit()
+        assert Product.query.filter_by(sku='SCARCE').one().low_stock is True
+        assert reconcile_low_stock(dry_run=True) == 0
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app import db, margins
+from app.checkout import sell_product
+from app.margins import MarginError, check_summary, margin_summary, refresh_sale_margins, uncosted_sales
+from app.models import Product, Sale, SaleMargin
+from conftest import login
+
+
+def _sell(times, product_id=1):
+    return [sell_product(product_id, 1, employee_id=2).id for _ in range(times)]
+
+
+def test_refresh_costs_each_sale_exactly_once(app):
+    with app.app_context():
+        _sell(7)
+        assert refresh_sale_margins(chunk_size=3) == 7
+        assert refresh_sale_margins() == 0
+        assert SaleMargin.query.count() == Sale.query.count() == 7
+        assert uncosted_sales() == 0
+
+
+def test_fifo_uses_up_the_oldest_layers_first(app, client):
+    with app.app_context():
+        product = Product(name='Fifo', sku='FIFO', cost_price=4, selling_price=10, quantity_in_stock=10,
+                          date_added=datetime.utcnow() - timedelta(days=3))
+        db.session.add(product)
+        db.session.commit()
+        product_id = product.id
+        first = sell_product(product_id, 8, employee_id=2).id
+
+    login(client, 'admin')
+    client.post('/admin/add_stock', data={'product_id': product_id, 'quantity': 5, 'cost_price': 6})
+
+    with app.app_context():
+        second = sell_product(product_id, 4, employee_id=2).id
+        third = sell_product(product_id, 3, employee_id=2).id
+        refresh_sale_margins()
+        costs = {m.sale_id: (m.cost, m.fifo_cost) for m in SaleMargin.query.filter_by(product_id=product_id)}
+        assert costs[first] == (32, 32)
+        assert costs[second] == (24, 2 * 4 + 2 * 6)
+        assert costs[third] == (18, 18)
+
+        row = [r for r in margin_summary('product', 'fifo') if r['product_id'] == product_id][0]
+        assert (row['revenue'], row['cost'], row['margin']) == (150, 70, 80)
+
+
+def test_refresh_stops_after_max_sales(app):
+    with app.app_context():
+        _sell(5)
+        assert refresh_sale_margins(max_sales=3) == 3
+        assert uncosted_sales() == 2
+        assert refresh_sale_margins(max_sales=3) == 2
+        assert uncosted_sales() == 0
+
+
+def test_concurrent_refresh_keeps_the_rows_committed_first(app, monkeypatch):
+    with app.app_context():
+        _sell(4)
+        real = margins._fifo_cost
+
+        def commit_first_elsewhere(sales, product_ids):
+            # Another worker's refresh commits the same sales while this one computes
+            costed = real(sales, product_ids)
+            with db.engine.begin() as conn:
+                conn.execute(SaleMargin.__table__.insert(), costed.assign(
+                    cost=costed.quantity * costed.unit_cost, date=costed.timestamp.dt.date
+                )[['sale_id', 'date', 'product_id', 'employee_id', 'quantity', 'revenue', 'cost', 'fifo_cost']]
+                    .to_dict('records'))
+            monkeypatch.setattr(margins, '_fifo_cost', real)
+            return costed
+
+        monkeypatch.setattr(margins, '_fifo_cost', commit_first_elsewhere)
+        assert refresh_sale_margins() == 0
+        assert SaleMargin.query.count() == 4
+
+
+def test_refresh_still_raises_integrity_errors_it_cannot_explain(app, monkeypatch):
+    with app.app_context():
+        _sell(1)
+
+        def broken_insert(*args, **kwargs):
+            raise IntegrityError('INSERT', {}, Exception('NOT NULL constraint failed'))
+
+        monkeypatch.setattr(db.session, 'execute', broken_insert, raising=False)
+        with pytest.raises(IntegrityError):
+            refresh_sale_margins()
+
+
+def test_bad_parameters_are_refused_before_any_refresh(app, client):
+    with app.app_context():
+        _sell(2)
+        with pytest.raises(MarginError):
+            check_summary('colour', 'cost')
+        with pytest.raises(MarginError):
+            check_summary('product', 'lifo')
+
+    login(client, 'admin')
+    assert client.get('/admin/margins?by=colour').status_code == 400
+    assert client.get('/admin/margins?method=lifo').status_code == 400
+    with app.app_context():
+        assert SaleMargin.query.count() == 0
+
+    assert client.get('/admin/margins').get_json()['uncosted_sales'] == 0
+    with app.app_context():
+        assert SaleMargin.query.count() == 2
@@ -0,0 +1,45 @@
+import pytest
+
+from app import db
+from app.models import Product
+from app.query_budget import QueryBudgetExceeded, query_budget
+from conftest import login
+
+
+def _count_products(times):
+    for _ in range(times):
+        db.session.query(Product.id).count()
+    return 'ok'
+
+
+def test_page_over_its_budget_fails_under_testing(app, client):
+    app.add_url_rule('/chatty', 'chatty', query_budget(2)(lambda: _count_products(3)))
+    with pytest.raises(QueryBudgetExceeded, match='ran 3 queries'):
+        client.get('/chatty')
+
+
+def test_page_within_its_budget_passes(app, client):
+    app.add_url_rule('/quiet', 'quiet', query_budget(2)(lambda: _count_products(2)))
+    assert client.get('/quiet').status_code == 200
+
+
+def test_default_budget_applies_to_undecorated_pages(app, client):
+    app.config['QUERY_BUDGET_DEFAULT'] = 1
+    app.add_url_rule('/undecorated', 'undecorated', lambda: _count_products(2))
+    with pytest.raises(QueryBudgetExceeded):
+        client.get('/undecorated')
+
+
+@pytest.mark.parametrize('username, url', [
+    ('admin', '/admin/dashboard'),
+    ('admin', '/admin/products'),
+    ('admin', '/admin/sales'),
+    ('admin', '/admin/stock_alerts'),
+    ('admin', '/admin/stock_valuation'),
+    ('till', '/employee/dashboard'),
+    ('till', '/employee/products'),
+    ('till', '/employee/sales'),
+])
+def test_pages_stay_within_budget(client, username, url):
+    login(client, username)
+    assert client.get(url).status_code == 200
@@ -0,0 +1,63 @@
+import os
+from datetime import date, datetime, timedelta
+
+from app import db
+from app.checkout import sell_product
+from app.models import Sale
+from app.report_cache import cached_report, report_cache_key, store_report
+
+TODAY = date.today()
+CLOSED = (TODAY - timedelta(days=40), TODAY - timedelta(days=20))
+OPEN = (TODAY - timedelta(days=5), TODAY)
+
+
+def _backdated_sale(days_ago):
+    db.session.add(Sale(product_id=1, quantity_sold=1, price_per_unit=15.0, employee_id=2,
+                        timestamp=datetime.utcnow() - timedelta(days=days_ago)))
+    db.session.commit()
+
+
+def test_key_is_stable_and_specific_to_the_requesting_admin(app):
+    with app.app_context():
+        key = report_cache_key('sales', 'pdf', *CLOSED, 1)
+        assert key == report_cache_key('sales', 'pdf', *CLOSED, 1)
+        assert key != report_cache_key('sales', 'pdf', *CLOSED, 3)
+        assert key != report_cache_key('sales', 'excel', *CLOSED, 1)
+        assert key != report_cache_key('stock', 'pdf', *CLOSED, 1)
+
+
+def test_sales_key_moves_only_with_sales_in_the_period(app):
+    with app.app_context():
+        closed = report_cache_key('sales', 'pdf', *CLOSED, 1)
+        sell_product(1, 1, employee_id=2)
+        assert report_cache_key('sales', 'pdf', *CLOSED, 1) == closed
+        _backdated_sale(30)
+        assert report_cache_key('sales', 'pdf', *CLOSED, 1) != closed
+
+
+def test_stock_key_survives_sales_after_the_period_closes(app):
+    with app.app_context():
+        closed = report_cache_key('stock', 'pdf', *CLOSED, 1)
+        still_open = report_cache_key('stock', 'pdf', *OPEN, 1)
+        sell_product(2, 1, employee_id=2)
+        assert report_cache_key('stock', 'pdf', *CLOSED, 1) == closed
+        assert report_cache_key('stock', 'pdf', *OPEN, 1) != still_open
+
+
+def test_stored_report_is_an_independent_copy(app, tmp_path):
+    with app.app_context():
+        key = report_cache_key('stock', 'pdf', *CLOSED, 1)
+        assert cached_report(key, 'pdf') is None
+
+        source = tmp_path / 'job.pdf'
+        source.write_bytes(b'%PDF-1.4 report')
+        old = datetime(2020, 1, 1).timestamp()
+        os.utime(source, (old, old))
+        store_report(key, 'pdf', str(source))
+
+        path = cached_report(key, 'pdf')
+        with open(path, 'rb') as cached:
+            assert cached.read() == b'%PDF-1.4 report'
+        # A hit marks the cache entry as used, never the job's own file
+        assert os.stat(path).st_nlink == 1
+        assert source.stat().st_mtime == old